@@ -0,0 +1,21 @@
+"""
+ASGI config for flutter_backend project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flutter_backend.settings')
+# Persistent connections don't suit ASGI, where each request's sync ORM
+# calls run on a new thread and would each keep a connection open, so the
+# CONN_MAX_AGE setting is deliberately turned off here (see settings.py).
+# Set before the settings load, whichever server imports this module.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Worksite
+
+
+@admin.register(Worksite)
+class WorksiteAdmin(admin.ModelAdmin):
+    # The bounding box is derived from the polygon or center on save
+    list_display = ("name", "company", "is_active", "radius_m")
+    list_filter = ("is_active", "company")
+    search_fields = ("name",)
+    fields = ("company", "name", "is_active", "center_latitude", "center_longitude", "radius_m", "polygon")
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class AuthappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'flutter_backend.authapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import leave_calendar, summaries, thumbnails  # noqa: F401 (register their job handlers)
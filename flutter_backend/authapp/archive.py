@@ -0,0 +1,104 @@
+# authapp/archive.py
+import heapq
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .blobstore import store_image_payload
+from .models import ArchivedTimeEntry, TimeEntry
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = (
+    "id", "user_id", "time_in", "time_out", "image_key", "thumbnail_key",
+    "location", "latitude", "longitude", "worksite_id",
+)
+
+
+def archive_cutoff(today, months=None):
+    """
+    First day of the month ``months`` calendar months before today's.
+    Closed entries timed in before it belong in the archive, so whole
+    months move together.
+    """
+    if months is None:
+        months = getattr(settings, "TIME_ENTRY_RETENTION_MONTHS", 12)
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_batch(cutoff, after_pk=0, batch_size=1000):
+    """
+    Move the next batch_size closed entries timed in before ``cutoff``
+    (with pk > after_pk) to the archive in one transaction. Inline base64
+    photos go to the blob store first; an entry whose photo can't be
+    stored stays behind. Returns (last_pk, moved, skipped), or None when
+    nothing is left.
+    """
+    batch = list(
+        TimeEntry.objects.filter(pk__gt=after_pk, time_in__lt=cutoff, time_out__isnull=False)
+        .order_by("pk")
+        .values_list("id", "image", "image_key")[:batch_size]
+    )
+    if not batch:
+        return None
+
+    # Photos are stored outside the transaction; the blob store dedupes, so a wasted store is harmless
+    stored = {}
+    for pk, image, image_key in batch:
+        if image and not image_key:
+            try:
+                # None for device file paths and other text there is nothing to keep of
+                stored[pk] = (image, store_image_payload(image))
+            except (ValueError, OSError) as e:
+                logger.error(f"Not archiving time entry {pk}: {e}")
+
+    archived = []
+    with transaction.atomic():
+        # Copy the rows as they are under lock, so an edit since the read above isn't lost
+        rows = (
+            TimeEntry.objects.select_for_update()
+            .filter(pk__in=[pk for pk, _, _ in batch], time_in__lt=cutoff, time_out__isnull=False)
+            .order_by("pk")
+            .values(*ARCHIVE_FIELDS, "image")
+        )
+        for row in rows:
+            image = row.pop("image")
+            if image and not row["image_key"]:
+                photo = stored.get(row["id"])
+                if photo is None or photo[0] != image:
+                    continue  # Not stored, or replaced since; the next run tries again
+                row["image_key"] = photo[1]
+            archived.append(ArchivedTimeEntry(**row))
+        ArchivedTimeEntry.objects.bulk_create(archived)
+        # Also nulls the SyncEvent links; the archive keeps the same ids
+        TimeEntry.objects.filter(pk__in=[entry.pk for entry in archived]).delete()
+    return batch[-1][0], len(archived), len(batch) - len(archived)
+
+
+def archived_until():
+    """Newest time_in in the archive, or None while it is empty."""
+    return ArchivedTimeEntry.objects.aggregate(until=Max("time_in"))["until"]
+
+
+def time_entry_sources(start=None):
+    """
+    Querysets holding the entries timed in from ``start`` on: the hot
+    table, plus the archive when it reaches that far forward. Readers apply
+    the same filters to each; both tables share the field names they use.
+    The hot table is always included, since open entries and late offline
+    syncs can be older than the archive's newest row.
+    """
+    sources = [TimeEntry.objects.all()]
+    until = archived_until()
+    if until is not None and (start is None or start <= until):
+        sources.append(ArchivedTimeEntry.objects.all())
+    return sources
+
+
+def merge_by_time_in(streams):
+    """Merge per-source streams of entries, each ordered by (time_in, id)."""
+    return heapq.merge(*streams, key=lambda entry: (entry.time_in, entry.pk))
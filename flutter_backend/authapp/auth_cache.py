@@ -0,0 +1,69 @@
+# authapp/auth_cache.py
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import CustomerUser
+
+# Everything login_view needs, nothing more
+CREDENTIAL_FIELDS = ("id", "employee_id", "first_name", "surname", "pin", "is_active")
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "AUTH_CACHE_TIMEOUT", 0)
+
+
+def credentials_cache_key(employee_id):
+    return f"auth:credentials:{employee_id}"
+
+
+def get_login_user(employee_id):
+    """
+    Return a CustomerUser with only CREDENTIAL_FIELDS loaded, or None if the
+    employee ID does not exist. Served from the cache when AUTH_CACHE_TIMEOUT
+    is set, otherwise from a single query.
+    """
+    key = credentials_cache_key(employee_id)
+    values = _cache().get(key) if _timeout() else None
+    if values is None:
+        values = (
+            CustomerUser.objects.filter(employee_id=employee_id)
+            .values_list(*CREDENTIAL_FIELDS)
+            .first()
+        )
+        if values is None:
+            return None
+        if _timeout():
+            _cache().set(key, values, _timeout())
+    # from_db leaves the other fields deferred, so a later save() won't clobber them
+    return CustomerUser.from_db(DEFAULT_DB_ALIAS, CREDENTIAL_FIELDS, values)
+
+
+async def aget_login_user(employee_id):
+    """Async version of get_login_user, for the async login view."""
+    key = credentials_cache_key(employee_id)
+    values = await _cache().aget(key) if _timeout() else None
+    if values is None:
+        values = await (
+            CustomerUser.objects.filter(employee_id=employee_id)
+            .values_list(*CREDENTIAL_FIELDS)
+            .afirst()
+        )
+        if values is None:
+            return None
+        if _timeout():
+            await _cache().aset(key, values, _timeout())
+    return CustomerUser.from_db(DEFAULT_DB_ALIAS, CREDENTIAL_FIELDS, values)
+
+
+def invalidate_credentials(*employee_ids):
+    """
+    Drop cached credentials. Saves and deletes do this through signals;
+    bulk writes (QuerySet.update, bulk_create with update_conflicts) skip
+    those, so whatever changes credential fields that way must call it.
+    """
+    _cache().delete_many([credentials_cache_key(employee_id) for employee_id in employee_ids])
@@ -0,0 +1,415 @@
+# authapp/benchmarks.py
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import django
+from django.db import connection
+from django.http import JsonResponse
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .hours import compute_hours, naive_hours, np
+from .models import Company, CustomerUser, LeaveRequest, Position, TimeEntry
+from .serializers import attendance_row, json_response, leave_row, orjson
+from .summaries import rebuild_daily_attendance
+from .utils import day_range
+
+# Seeded employee IDs are "9" plus a zero-padded number (locustfile.py relies on this)
+EMPLOYEE_PREFIX = "9"
+PIN = "1234"
+POSITIONS = ("Farm Hand", "Supervisor", "Driver", "Packer", "Clerk")
+LEAVE_TYPES = ("Vacation Leave", "Sick Leave", "Emergency Leave")
+STATUSES = ("Pending", "Approved", "Rejected")
+JSON = "application/json"
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def employee_id(n):
+    return f"{EMPLOYEE_PREFIX}{n:05d}"
+
+
+def seed_data(companies=5, users_per_company=200, days=30, leaves_per_user=2, seed=0, batch_size=2000):
+    """
+    Fill the database with a reproducible workload: companies, positions,
+    users, one time entry per user per past day and some leave requests.
+    The same arguments always produce the same rows.
+    """
+    rng = random.Random(seed)
+    company_ids = [Company.objects.create(name=f"Benchmark Company {i + 1}").pk for i in range(companies)]
+    position_ids = [Position.objects.create(title=title).pk for title in POSITIONS]
+
+    total_users = companies * users_per_company
+    if total_users >= 100000:
+        raise BenchmarkError("At most 99999 benchmark users")
+    CustomerUser.objects.bulk_create([
+        CustomerUser(
+            employee_id=employee_id(n),
+            first_name=f"Bench{n}",
+            surname=rng.choice(("Cruz", "Santos", "Reyes", "Garcia", "Bautista")),
+            company_id=company_ids[n % companies],
+            position_id=rng.choice(position_ids),
+            pin=PIN,
+        )
+        for n in range(total_users)
+    ], batch_size=batch_size)
+    # Backends without RETURNING leave bulk-created pks unset, so read them back
+    user_ids = list(
+        CustomerUser.objects.filter(employee_id__startswith=EMPLOYEE_PREFIX)
+        .order_by("employee_id").values_list("id", flat=True)
+    )
+
+    today = timezone.now().date()
+    first_day = today - timedelta(days=days)
+    entries = []
+    for day_offset in range(days):
+        day = first_day + timedelta(days=day_offset)
+        for user_id in user_ids:
+            time_in = datetime.combine(day, datetime.min.time()) + timedelta(
+                hours=7, minutes=rng.randint(0, 90), seconds=rng.randint(0, 59)
+            )
+            entries.append(TimeEntry(
+                user_id=user_id,
+                time_in=time_in,
+                time_out=time_in + timedelta(hours=9, minutes=rng.randint(0, 60)),
+                location=f"{14 + rng.random():.6f}, {121 + rng.random():.6f}",
+            ))
+        if len(entries) >= batch_size:
+            TimeEntry.objects.bulk_create(entries, batch_size=batch_size)
+            entries = []
+    TimeEntry.objects.bulk_create(entries, batch_size=batch_size)
+    if days:
+        for _ in rebuild_daily_attendance(first_day, today - timedelta(days=1)):
+            pass
+
+    leaves = []
+    for user_id in user_ids:
+        for _ in range(leaves_per_user):
+            start = today + timedelta(days=rng.randint(-90, 60))
+            length = rng.randint(1, 3)
+            leaves.append(LeaveRequest(
+                user_id=user_id,
+                leave_type=rng.choice(LEAVE_TYPES),
+                start_date=start,
+                end_date=start + timedelta(days=length - 1),
+                leave_days=length,
+                reason="Benchmark",
+                status=rng.choice(STATUSES),
+            ))
+    LeaveRequest.objects.bulk_create(leaves, batch_size=batch_size)
+
+    return {
+        "companies": companies,
+        "users": total_users,
+        "time_entries": total_users * days,
+        "leave_requests": len(leaves),
+    }
+
+
+def _request(client, method, path, **kwargs):
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - start
+    if response.status_code != 200 or (
+        response.get("Content-Type", "").startswith(JSON) and not response.json().get("success")
+    ):
+        raise BenchmarkError(f"{method.upper()} {path} failed: {response.status_code} {response.content[:200]!r}")
+    return response, elapsed, len(ctx.captured_queries)
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def _summary(timings, queries):
+    ms = [t * 1000 for t in timings]
+    return {
+        "runs": len(ms),
+        "queries": max(queries),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(_percentile(ms, 0.95), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def endpoint_scenarios(employee_ids):
+    """(name, request factory) pairs; time_out closes the entries time_in opened."""
+    today = timezone.now().date()
+    # A weekday past every seeded leave, so submit_leave times the success path
+    leave_day = today + timedelta(days=90)
+    while leave_day.weekday() >= 5:
+        leave_day += timedelta(days=1)
+    leave_day = leave_day.isoformat()
+    return [
+        ("login", lambda i: ("post", "/api/login/", {
+            "data": {"username": employee_ids[i], "password": PIN}, "content_type": JSON,
+        })),
+        ("time_in", lambda i: ("post", "/api/time-in/", {
+            "data": {"employee_id": employee_ids[i], "location": "14.5, 121.0"}, "content_type": JSON,
+        })),
+        ("time_out", lambda i: ("post", "/api/time-out/", {
+            "data": {"employee_id": employee_ids[i]}, "content_type": JSON,
+        })),
+        ("attendance", lambda i: ("get", "/api/attendance/", {})),
+        ("attendance_page", lambda i: ("get", "/api/attendance/", {"data": {"page_size": 50}})),
+        ("submit_leave", lambda i: ("post", "/api/submit-leave/", {
+            "data": {
+                "employee_id": employee_ids[i], "leaveType": "Vacation Leave",
+                "startDate": leave_day, "endDate": leave_day, "leaveDays": 1, "reason": "Benchmark",
+            },
+            "content_type": JSON,
+        })),
+        ("leave_requests", lambda i: ("get", "/api/leave-requests/", {
+            "data": {"employee_id": employee_ids[i]},
+        })),
+        ("leave_requests_page", lambda i: ("get", "/api/leave-requests/", {"data": {"page_size": 50}})),
+    ]
+
+
+def run_endpoints(employee_ids, repeat=20):
+    """Time each endpoint ``repeat`` times, each run as a different user."""
+    if len(employee_ids) < repeat:
+        raise BenchmarkError(f"Need at least {repeat} users, have {len(employee_ids)}")
+    client = Client()
+    results = {}
+    for name, make_request in endpoint_scenarios(employee_ids):
+        timings, queries = [], []
+        for i in range(repeat):
+            method, path, kwargs = make_request(i)
+            _, elapsed, count = _request(client, method, path, **kwargs)
+            timings.append(elapsed)
+            queries.append(count)
+        results[name] = _summary(timings, queries)
+    return results
+
+
+def _clock_in(employee_id):
+    # One device at the gate: log in, then clock in with the token
+    client = Client(raise_request_exception=False)
+    try:
+        start = time.perf_counter()
+        response = client.post("/api/login/", {"username": employee_id, "password": PIN}, content_type=JSON)
+        token = response.json().get("token")
+        if not token:
+            return time.perf_counter() - start, False
+        response = client.post(
+            "/api/time-in/", {"location": "14.5, 121.0"}, content_type=JSON,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return time.perf_counter() - start, response.status_code == 200 and response.json().get("success")
+    except Exception:
+        return time.perf_counter() - start, False
+    finally:
+        connection.close()
+
+
+def morning_rush(employee_ids, concurrency=20):
+    """
+    Everyone clocks in at once: ``concurrency`` threads each play devices
+    that log in and time in, like the queue at the gate before shift start.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(_clock_in, employee_ids))
+    elapsed = time.perf_counter() - start
+    ms = [t * 1000 for t, _ in outcomes]
+    return {
+        "users": len(employee_ids),
+        "concurrency": concurrency,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "elapsed_s": round(elapsed, 3),
+        "clock_ins_per_s": round(len(employee_ids) / elapsed, 2) if elapsed else None,
+        "median_ms": round(statistics.median(ms), 3) if ms else None,
+        "p95_ms": round(_percentile(ms, 0.95), 3) if ms else None,
+    }
+
+
+def _timed_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def bench_hours(start_date, end_date):
+    """
+    Time compute_hours (NumPy and plain Python) against the naive per-row
+    ORM loop over the same range, and check all three agree.
+    """
+    naive, naive_s = _timed_call(naive_hours, start_date, end_date)
+    expected = {
+        (employee, day.isoformat()): (
+            round(worked / 3600, 2), round(overtime / 3600, 2), round(night / 3600, 2), missing
+        )
+        for (employee, day), (worked, overtime, night, missing) in naive.items()
+    }
+    start, _ = day_range(start_date)
+    _, end = day_range(end_date)
+    results = {
+        "entries": TimeEntry.objects.filter(time_in__gte=start, time_in__lt=end).count(),
+        "naive_orm_s": naive_s,
+    }
+    variants = [("python", False)] + ([("numpy", True)] if np is not None else [])
+    for name, use_numpy in variants:
+        computed, seconds = _timed_call(compute_hours, start_date, end_date, use_numpy=use_numpy)
+        got = {
+            (row["employee_id"], row["date"]): (
+                row["worked_hours"], row["overtime_hours"], row["night_hours"], row["missing_time_outs"]
+            )
+            for row in computed["days"]
+        }
+        if got != expected:
+            raise BenchmarkError(f"compute_hours ({name}) disagrees with the naive loop")
+        results[f"{name}_s"] = seconds
+        results[f"{name}_speedup"] = round(naive_s / seconds, 1) if seconds else None
+    return results
+
+
+def _strftime_attendance(entries):
+    # The attendance_list_view loop before serializers.py, kept as the baseline
+    data = []
+    for entry in entries:
+        data.append({
+            "id": entry.pk,
+            "name": f"{entry.user.first_name} {entry.user.surname}",
+            "time_in": entry.time_in.strftime("%Y-%m-%d %I:%M:%S %p"),
+            "time_out": entry.time_out.strftime("%Y-%m-%d %I:%M:%S %p") if entry.time_out else "Not Yet Out",
+            "location": entry.location if entry.location else "N/A",
+        })
+    return JsonResponse({"success": True, "attendance": data}).content
+
+
+def _strftime_leaves(leaves):
+    data = []
+    for leave in leaves:
+        data.append({
+            "id": leave.id,
+            "leaveType": leave.leave_type,
+            "startDate": leave.start_date.strftime("%Y-%m-%d"),
+            "endDate": leave.end_date.strftime("%Y-%m-%d"),
+            "leaveDays": leave.leave_days,
+            "reason": leave.reason,
+            "status": leave.status,
+        })
+    return JsonResponse({"success": True, "leaveRequests": data}).content
+
+
+def bench_serializers(rows=20000, repeat=5, seed=0):
+    """
+    Rows per second serializing in-memory attendance and leave lists the
+    old way (strftime per field, stdlib JsonResponse) and through
+    serializers.py. No database is involved; checks both give the same JSON.
+    """
+    rng = random.Random(seed)
+    user = CustomerUser(employee_id=employee_id(0), first_name="Juan", surname="Dela Cruz")
+    start = datetime(2025, 3, 3, 6)
+    entries, leaves = [], []
+    for n in range(rows):
+        time_in = start + timedelta(seconds=rng.randint(0, 4 * 3600))
+        entry = TimeEntry(id=n + 1, user=user, time_in=time_in, location="14.599500, 120.984200")
+        if n % 4:
+            entry.time_out = time_in + timedelta(hours=9, seconds=rng.randint(0, 3600))
+        entries.append(entry)
+        day = start.date() + timedelta(days=rng.randint(0, 60))
+        leaves.append(LeaveRequest(
+            id=n + 1, user=user, leave_type=rng.choice(LEAVE_TYPES), start_date=day,
+            end_date=day + timedelta(days=2), leave_days=3, reason="Family matter", status=rng.choice(STATUSES),
+        ))
+
+    cases = {
+        "attendance": (
+            entries,
+            _strftime_attendance,
+            lambda items: json_response(
+                {"success": True, "attendance": [attendance_row(entry, entry.user) for entry in items]}
+            ).content,
+        ),
+        "leave_requests": (
+            leaves,
+            _strftime_leaves,
+            lambda items: json_response({"success": True, "leaveRequests": [leave_row(leave) for leave in items]}).content,
+        ),
+    }
+    results = {"rows": rows, "backend": "orjson" if orjson is not None else "json"}
+    for name, (items, before, after) in cases.items():
+        if json.loads(before(items)) != json.loads(after(items)):
+            raise BenchmarkError(f"serializers.py output differs for {name}")
+        result = {}
+        for label, func in (("before", before), ("after", after)):
+            best = min(_timed_call(func, items)[1] for _ in range(repeat))
+            result[f"{label}_rows_per_s"] = round(rows / best) if best else None
+        if result["before_rows_per_s"] and result["after_rows_per_s"]:
+            result["speedup"] = round(result["after_rows_per_s"] / result["before_rows_per_s"], 1)
+        results[name] = result
+    return results
+
+
+def run_benchmarks(seed_options, repeat=20, rush_users=200, concurrency=20, hours=False):
+    """Seed, then run the endpoint and rush benchmarks; returns the results document."""
+    seeded = seed_data(**seed_options)
+    employee_ids = [employee_id(n) for n in range(seeded["users"])]
+    results = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "seed": seed_options,
+            "seeded": seeded,
+            "repeat": repeat,
+        },
+        "endpoints": run_endpoints(employee_ids, repeat),
+    }
+    if hours:
+        # The seeded history, before today's benchmark clock-ins
+        today = timezone.now().date()
+        results["hours"] = bench_hours(today - timedelta(days=seed_options.get("days", 30)), today)
+    if rush_users:
+        results["rush"] = morning_rush(employee_ids[repeat:repeat + rush_users], concurrency)
+    return results
+
+
+def compare_results(baseline, current, tolerance=0.25, min_delta_ms=5.0):
+    """
+    Return a description of every regression from ``baseline`` to
+    ``current``: any extra query, a median latency more than ``tolerance``
+    (and ``min_delta_ms``) slower, rush throughput down by more than
+    ``tolerance``, or new rush errors.
+    """
+    regressions = []
+    for name, old in baseline.get("endpoints", {}).items():
+        new = current.get("endpoints", {}).get(name)
+        if new is None:
+            regressions.append(f"{name}: missing from current results")
+            continue
+        if new["queries"] > old["queries"]:
+            regressions.append(f"{name}: {old['queries']} -> {new['queries']} queries")
+        if (new["median_ms"] > old["median_ms"] * (1 + tolerance)
+                and new["median_ms"] - old["median_ms"] >= min_delta_ms):
+            regressions.append(f"{name}: median {old['median_ms']}ms -> {new['median_ms']}ms")
+
+    old_hours, new_hours = baseline.get("hours"), current.get("hours")
+    if old_hours and new_hours:
+        for key in ("numpy_s", "python_s"):
+            old, new = old_hours.get(key), new_hours.get(key)
+            if (old is not None and new is not None
+                    and new > old * (1 + tolerance) and (new - old) * 1000 >= min_delta_ms):
+                regressions.append(f"hours: {key} {old}s -> {new}s")
+
+    old_rush, new_rush = baseline.get("rush"), current.get("rush")
+    if old_rush and new_rush:
+        if new_rush["errors"] > old_rush["errors"]:
+            regressions.append(f"rush: {old_rush['errors']} -> {new_rush['errors']} errors")
+        if (old_rush["clock_ins_per_s"] and new_rush["clock_ins_per_s"]
+                and new_rush["clock_ins_per_s"] < old_rush["clock_ins_per_s"] * (1 - tolerance)):
+            regressions.append(
+                f"rush: {old_rush['clock_ins_per_s']} -> {new_rush['clock_ins_per_s']} clock-ins/s"
+            )
+    return regressions
@@ -0,0 +1,169 @@
+# authapp/blobstore.py
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def is_valid_key(key):
+    return bool(key and KEY_RE.match(key))
+
+
+def sniff_content_type(head):
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+
+def iter_base64_chunks(payload, chunk_size=CHUNK_SIZE):
+    """
+    Decode a base64 string (optionally a data: URI) piece by piece so the
+    decoded image never has to exist as one bytes object.
+    """
+    if payload.startswith("data:"):
+        payload = payload.split(",", 1)[1]
+    payload = "".join(payload.split())
+    # Keep each slice a multiple of 4 characters so it decodes on its own
+    step = chunk_size - chunk_size % 4
+    for start in range(0, len(payload), step):
+        yield base64.b64decode(payload[start:start + step], validate=True)
+
+
+def decode_image_payload(value):
+    """
+    Return a chunk iterator if ``value`` is a base64 encoded image, or None
+    for anything else (device file paths, empty strings, plain text).
+    """
+    if not value:
+        return None
+    if value.startswith("data:"):
+        value = value.split(",", 1)[-1]
+    try:
+        head = base64.b64decode(value[:64], validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if sniff_content_type(head) == "application/octet-stream":
+        return None
+    return iter_base64_chunks(value)
+
+
+class BlobStore:
+    """
+    Content-addressed storage: a blob's key is the SHA-256 of its bytes, so
+    storing the same photo twice keeps a single copy.
+    """
+
+    def save(self, chunks):
+        raise NotImplementedError
+
+    def open(self, key):
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class FileSystemBlobStore(BlobStore):
+    def __init__(self, root):
+        self.root = os.fspath(root)
+
+    def path(self, key):
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def save(self, chunks):
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            key = digest.hexdigest()
+            final_path = self.path(key)
+            if os.path.exists(final_path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            return key
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open(self, key):
+        return open(self.path(key), "rb")
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    config = getattr(settings, "BLOB_STORE", {})
+    backend = import_string(config.get("BACKEND", "flutter_backend.authapp.blobstore.FileSystemBlobStore"))
+    options = config.get("OPTIONS", {"root": settings.BASE_DIR / "blobs"})
+    return backend(**options)
+
+
+def iter_file_range(blob, start, length, chunk_size=CHUNK_SIZE):
+    """Yield ``length`` bytes of an open blob from ``start``, a chunk at a time, then close it."""
+    try:
+        blob.seek(start)
+        while length > 0:
+            chunk = blob.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        blob.close()
+
+
+def store_image_payload(value):
+    """
+    Store a base64 image payload and return its key, or None if it isn't
+    one. Malformed base64 past the sniffed header raises ValueError
+    (binascii.Error for bad padding), a failing store OSError.
+    """
+    chunks = decode_image_payload(value)
+    if chunks is None:
+        return None
+    return get_blob_store().save(chunks)
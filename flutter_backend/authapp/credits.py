@@ -0,0 +1,96 @@
+# authapp/credits.py
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from .models import CustomerUser, LeaveCreditEntry
+
+BALANCE_FIELDS = {
+    "leave": "leave_credits",
+    "sick": "sick_leave_credits",
+}
+
+
+class InsufficientCredits(Exception):
+    def __init__(self, credit_type):
+        super().__init__(f"Insufficient {credit_type} credits")
+        self.credit_type = credit_type
+
+
+def credit_type_for(leave_type):
+    return "sick" if leave_type.lower() == "sick leave" else "leave"
+
+
+def adjust_credits(user_id, credit_type, amount, kind, leave_request=None, note=None):
+    """
+    Move a user's balance by ``amount`` and append the matching ledger row.
+
+    A deduction is a single conditional UPDATE (balance >= amount), so two
+    concurrent requests can never both spend the last credit; the loser
+    sees zero rows updated and gets InsufficientCredits. Must be called
+    inside transaction.atomic together with whatever the movement is for.
+    """
+    field = BALANCE_FIELDS[credit_type]
+    users = CustomerUser.objects.filter(pk=user_id)
+    if amount < 0:
+        users = users.filter(**{f"{field}__gte": -amount})
+    if not users.update(**{field: F(field) + amount}):
+        raise InsufficientCredits(credit_type)
+    return LeaveCreditEntry.objects.create(
+        user_id=user_id,
+        credit_type=credit_type,
+        kind=kind,
+        amount=amount,
+        leave_request=leave_request,
+        note=note,
+    )
+
+
+def grant_credits(user_id, credit_type, amount, note=None):
+    with transaction.atomic():
+        return adjust_credits(user_id, credit_type, amount, "grant", note=note)
+
+
+def refund_leave_requests(leave_requests):
+    """
+    Give back the credits spent on each (id, user_id, leave_type) in
+    ``leave_requests``. Amounts come from the ledger; requests filed before
+    the ledger existed get the flat 1 credit they were charged. Balances
+    move with one UPDATE per credit type, however many users are involved.
+    """
+    if not leave_requests:
+        return []
+    net = {}
+    for request_id, credit_type, amount in LeaveCreditEntry.objects.filter(
+        leave_request_id__in=[request_id for request_id, _, _ in leave_requests]
+    ).values_list("leave_request_id", "credit_type", "amount"):
+        net[request_id, credit_type] = net.get((request_id, credit_type), 0) + amount
+    charged = {request_id for request_id, _ in net}
+
+    refunds = []
+    for request_id, user_id, leave_type in leave_requests:
+        if request_id not in charged:
+            net[request_id, credit_type_for(leave_type)] = -1
+        for credit_type in BALANCE_FIELDS:
+            spent = -net.get((request_id, credit_type), 0)
+            if spent > 0:
+                refunds.append(LeaveCreditEntry(
+                    user_id=user_id,
+                    credit_type=credit_type,
+                    kind="refund",
+                    amount=spent,
+                    leave_request_id=request_id,
+                ))
+
+    for credit_type, field in BALANCE_FIELDS.items():
+        per_user = {}
+        for refund in refunds:
+            if refund.credit_type == credit_type:
+                per_user[refund.user_id] = per_user.get(refund.user_id, 0) + refund.amount
+        if per_user:
+            CustomerUser.objects.filter(pk__in=per_user).update(**{
+                field: F(field) + Case(
+                    *[When(pk=user_id, then=Value(amount)) for user_id, amount in per_user.items()],
+                    default=Value(0),
+                )
+            })
+    return LeaveCreditEntry.objects.bulk_create(refunds)
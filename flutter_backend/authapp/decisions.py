@@ -0,0 +1,49 @@
+# authapp/decisions.py
+from django.db import transaction
+from django.utils import timezone
+
+from .credits import refund_leave_requests
+from .models import LeaveDay, LeaveRequest
+
+MAX_DECISIONS = 1000
+DECISIONS = {
+    "approve": "Approved",
+    "approved": "Approved",
+    "reject": "Rejected",
+    "rejected": "Rejected",
+}
+
+
+def decide_leave_requests(ids, status):
+    """
+    Move every Pending request in ``ids`` to ``status`` with one UPDATE and,
+    for rejections, refund their credits in the same transaction. Returns
+    one outcome per id: updated, skipped (no longer Pending) or not_found.
+    """
+    with transaction.atomic():
+        # Lock the Pending rows so the refund set is exactly the updated set
+        pending = list(
+            LeaveRequest.objects.select_for_update()
+            .filter(id__in=ids, status="Pending")
+            .values_list("id", "user_id", "leave_type")
+        )
+        pending_ids = [request_id for request_id, _, _ in pending]
+        LeaveRequest.objects.filter(id__in=pending_ids).update(status=status, updated_at=timezone.now())
+        if status == "Rejected":
+            refund_leave_requests(pending)
+            # Frees the dates for the calendar and for new requests
+            LeaveDay.objects.filter(leave_request_id__in=pending_ids).delete()
+
+    decided = set(pending_ids)
+    current = dict(
+        LeaveRequest.objects.filter(id__in=set(ids) - decided).values_list("id", "status")
+    )
+    results = []
+    for request_id in ids:
+        if request_id in decided:
+            results.append({"id": request_id, "outcome": "updated", "status": status})
+        elif request_id in current:
+            results.append({"id": request_id, "outcome": "skipped", "status": current[request_id]})
+        else:
+            results.append({"id": request_id, "outcome": "not_found"})
+    return results
@@ -0,0 +1,85 @@
+# authapp/events.py
+import asyncio
+import threading
+from collections import deque
+
+from django.db import transaction
+
+from .serializers import dumps
+
+HISTORY_SIZE = 1000
+QUEUE_SIZE = 500
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class AttendanceBroker:
+    """
+    In-process pub/sub for attendance changes. Views publish from any
+    thread; SSE streams consume on the ASGI event loop. A bounded history
+    lets a reconnecting client resume from its Last-Event-ID.
+
+    Events only reach subscribers in the same process, so run the stream
+    under a single ASGI worker (or put a shared broker behind this API).
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._next_id = 1
+        self._subscribers = set()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = (self._next_id, event_type, data)
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:  # Loop already closed
+                self.unsubscribe(subscription)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register the calling coroutine's loop. Returns the subscription, the
+        buffered events after ``last_event_id`` and whether the client
+        missed events that are no longer buffered.
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            backlog, gap = [], False
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._next_id
+                gap = last_event_id + 1 < oldest or last_event_id >= self._next_id
+                backlog = [event for event in self._history if event[0] > last_event_id]
+            self._subscribers.add(subscription)
+        return subscription, backlog, gap
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+broker = AttendanceBroker()
+
+
+def format_event(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {dumps(data).decode()}\n\n"
+
+
+def publish_on_commit(event_type, data):
+    transaction.on_commit(lambda: broker.publish(event_type, data))
@@ -0,0 +1,113 @@
+# authapp/exports.py
+import csv
+import zlib
+
+from .archive import merge_by_time_in, time_entry_sources
+from .models import LeaveRequest
+from .pagination import keyset_chunks
+from .utils import day_range
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Spreadsheets read a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def safe_cell(value):
+    # Names and leave reasons are typed by users; quote anything a
+    # spreadsheet would evaluate so it opens as plain text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow([safe_cell(value) for value in row])
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _user_columns(user):
+    return [
+        user.employee_id,
+        f"{user.first_name or ''} {user.surname or ''}".strip(),
+        user.company.name if user.company else "",
+        user.position.title if user.position else "",
+    ]
+
+
+def attendance_rows(start_date, end_date, company_id=None, chunk_size=2000):
+    start, _ = day_range(start_date)
+    _, end = day_range(end_date)
+    streams = []
+    for source in time_entry_sources(start):
+        entries = (
+            source.filter(time_in__gte=start, time_in__lt=end)
+            .select_related("user__company", "user__position")
+            .only(
+                "time_in", "time_out", "location",
+                "user__employee_id", "user__first_name", "user__surname",
+                "user__company__name", "user__position__title",
+            )
+        )
+        if company_id:
+            entries = entries.filter(user__company_id=company_id)
+        streams.append(keyset_chunks(entries, "time_in", chunk_size))
+
+    yield ["employee_id", "name", "company", "position", "date", "time_in", "time_out", "hours", "location"]
+    for entry in merge_by_time_in(streams):
+        hours = round((entry.time_out - entry.time_in).total_seconds() / 3600, 2) if entry.time_out else ""
+        yield _user_columns(entry.user) + [
+            entry.time_in.strftime("%Y-%m-%d"),
+            entry.time_in.strftime(DATETIME_FORMAT),
+            entry.time_out.strftime(DATETIME_FORMAT) if entry.time_out else "",
+            hours,
+            entry.location or "",
+        ]
+
+
+def leave_rows(start_date, end_date, company_id=None, chunk_size=2000):
+    # Every request overlapping the period, not just those starting in it
+    leaves = (
+        LeaveRequest.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+        .select_related("user__company", "user__position")
+        .only(
+            "leave_type", "start_date", "end_date", "leave_days", "reason", "status",
+            "payment_option", "submitted_at",
+            "user__employee_id", "user__first_name", "user__surname",
+            "user__company__name", "user__position__title",
+        )
+    )
+    if company_id:
+        leaves = leaves.filter(user__company_id=company_id)
+
+    yield [
+        "employee_id", "name", "company", "position", "leave_type", "start_date", "end_date",
+        "leave_days", "payment_option", "status", "submitted_at", "reason",
+    ]
+    for leave in keyset_chunks(leaves, "start_date", chunk_size):
+        yield _user_columns(leave.user) + [
+            leave.leave_type,
+            leave.start_date.strftime("%Y-%m-%d"),
+            leave.end_date.strftime("%Y-%m-%d"),
+            leave.leave_days,
+            leave.payment_option,
+            leave.status,
+            leave.submitted_at.strftime(DATETIME_FORMAT),
+            leave.reason or "",
+        ]
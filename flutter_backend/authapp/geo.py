@@ -0,0 +1,71 @@
+# authapp/geo.py
+import math
+import re
+from decimal import Decimal
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = 111320  # Of latitude, and of longitude at the equator
+COORDINATE_PLACES = Decimal("0.000001")
+
+# "lat, lon" as getCurrentLocation() in lib/maindash.dart sends it
+LOCATION_RE = re.compile(r"^\s*(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+
+
+def parse_location(text):
+    """
+    Return (latitude, longitude) as 6-place Decimals, or None for anything
+    that isn't a valid "lat, lon" pair (e.g. "Location services disabled").
+    """
+    match = LOCATION_RE.match(text or "")
+    if not match:
+        return None
+    latitude, longitude = (Decimal(value).quantize(COORDINATE_PLACES) for value in match.groups())
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def is_coordinate(latitude, longitude):
+    """Whether both are real numbers (not bools or strings) within latitude ±90 and longitude ±180."""
+    return all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+        for value in (latitude, longitude)
+    ) and -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def radius_bounds(latitude, longitude, radius_m):
+    """(min_lat, max_lat, min_lon, max_lon) of the box around a circle."""
+    dlat = radius_m / METERS_PER_DEGREE
+    # Longitude degrees shrink towards the poles; clamp so the box stays finite
+    dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - dlat, latitude + dlat, longitude - dlon, longitude + dlon
+
+
+def polygon_bounds(polygon):
+    lats = [point[0] for point in polygon]
+    lons = [point[1] for point in polygon]
+    return min(lats), max(lats), min(lons), max(lons)
+
+
+def point_in_polygon(latitude, longitude, polygon):
+    """Even-odd ray casting over [[lat, lon], ...]; fine at worksite scale."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lon_i > longitude) != (lon_j > longitude):
+            crossing = lat_i + (longitude - lon_i) * (lat_j - lat_i) / (lon_j - lon_i)
+            if latitude < crossing:
+                inside = not inside
+        j = i
+    return inside
@@ -0,0 +1,75 @@
+# authapp/geofence.py
+from django.conf import settings
+from django.core.cache import caches
+
+from .geo import distance_m, parse_location, point_in_polygon
+from .models import Worksite
+
+FENCE_FIELDS = (
+    "id", "min_latitude", "max_latitude", "min_longitude", "max_longitude",
+    "center_latitude", "center_longitude", "radius_m", "polygon",
+)
+
+
+class OutsideGeofence(Exception):
+    pass
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def worksites_cache_key(company_id):
+    return f"geofence:worksites:{company_id}"
+
+
+def company_worksites(company_id):
+    """A company's active geofences as FENCE_FIELDS tuples, cached until a Worksite changes."""
+    key = worksites_cache_key(company_id)
+    fences = _cache().get(key)
+    if fences is None:
+        fences = list(
+            Worksite.objects.filter(company_id=company_id, is_active=True).values_list(*FENCE_FIELDS)
+        )
+        _cache().set(key, fences, getattr(settings, "GEOFENCE_CACHE_TIMEOUT", 300))
+    return fences
+
+
+def invalidate_worksites(company_id):
+    _cache().delete(worksites_cache_key(company_id))
+
+
+def find_worksite(fences, latitude, longitude):
+    """
+    Return the id of the first fence containing the point, or None. The
+    bounding box comparison rejects most fences before any trigonometry
+    or polygon walk.
+    """
+    lat, lon = float(latitude), float(longitude)
+    for pk, min_lat, max_lat, min_lon, max_lon, center_lat, center_lon, radius_m, polygon in fences:
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            continue
+        if polygon:
+            if point_in_polygon(lat, lon, polygon):
+                return pk
+        elif distance_m(lat, lon, center_lat, center_lon) <= radius_m:
+            return pk
+    return None
+
+
+def locate_time_in(company_id, location):
+    """
+    Return (latitude, longitude, worksite_id) for a time-in reported at
+    ``location``. Companies without worksites accept any location. For
+    the others, GEOFENCE_ENFORCE rejects a time-in outside every worksite,
+    or one without a usable fix, with OutsideGeofence.
+    """
+    point = parse_location(location)
+    fences = company_worksites(company_id) if company_id else []
+    worksite_id = find_worksite(fences, *point) if point and fences else None
+    if fences and worksite_id is None and getattr(settings, "GEOFENCE_ENFORCE", True):
+        if point is None:
+            raise OutsideGeofence("A location fix is required to time in")
+        raise OutsideGeofence("You are outside your worksite")
+    latitude, longitude = point or (None, None)
+    return latitude, longitude, worksite_id
@@ -0,0 +1,276 @@
+# authapp/hours.py
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BigIntegerField, Func
+from django.db.models.functions import Coalesce
+
+from .archive import time_entry_sources
+from .models import CustomerUser
+from .utils import day_range
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; compute_hours falls back to plain Python
+    np = None
+
+DAY = 24 * 3600
+EPOCH = datetime(1970, 1, 1)
+MISSING = -1  # time_out placeholder in the int64 arrays
+CHUNK_ROWS = 10000  # Rows per int64 array while loading a range
+
+
+class EpochSeconds(Func):
+    """
+    Whole seconds from 1970-01-01 00:00 to a naive datetime column, computed
+    by the database, so loading a range skips building datetime objects.
+    Fractions of a second are dropped, as _epoch_seconds does.
+    """
+
+    output_field = BigIntegerField()
+    vendors = ("mysql", "sqlite", "postgresql")
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', %(expressions)s)",
+            **extra_context,
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # substr() cuts the stored text to whole seconds; strftime alone rounds
+        # to milliseconds. %%%%s survives the template and the placeholder pass.
+        return self.as_sql(
+            compiler, connection, template="CAST(strftime('%%%%s', substr(%(expressions)s, 1, 19)) AS INTEGER)",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="FLOOR(EXTRACT(EPOCH FROM %(expressions)s))::bigint", **extra_context,
+        )
+
+
+def _clock_seconds(value):
+    hours, minutes = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _night_window():
+    start = _clock_seconds(getattr(settings, "PAYROLL_NIGHT_START", "22:00"))
+    end = _clock_seconds(getattr(settings, "PAYROLL_NIGHT_END", "06:00"))
+    return start, end
+
+
+def night_seconds_before(t, start, end):
+    """
+    Night seconds between the epoch and ``t`` (local epoch seconds). The
+    night overlap of a shift is night_seconds_before(out) minus
+    night_seconds_before(in), however many midnights it crosses.
+    """
+    days, second = divmod(t, DAY)
+    if end <= start:  # Window wraps midnight, e.g. 22:00-06:00
+        return days * (DAY - start + end) + min(second, end) + max(second - start, 0)
+    return days * (end - start) + min(max(second - start, 0), end - start)
+
+
+def _night_seconds_before_array(t, start, end):
+    days, second = np.divmod(t, DAY)
+    if end <= start:
+        return days * (DAY - start + end) + np.minimum(second, end) + np.maximum(second - start, 0)
+    return days * (end - start) + np.clip(second - start, 0, end - start)
+
+
+def _epoch_seconds(value):
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def _entries(start_date, end_date, company_id=None, employee_id=None, columns=("user_id", "time_in", "time_out")):
+    start, _ = day_range(start_date)
+    _, end = day_range(end_date)
+    sources = time_entry_sources(start)
+    if company_id:
+        sources = [entries.filter(user__company_id=company_id) for entries in sources]
+    if employee_id:
+        sources = [entries.filter(user__employee_id=employee_id) for entries in sources]
+    # One range query per source, streamed; the aggregation buckets rows by day
+    for entries in sources:
+        yield entries.filter(time_in__gte=start, time_in__lt=end).values_list(*columns).iterator(chunk_size=CHUNK_ROWS)
+
+
+def _epoch_rows(rows):
+    # What EpochSeconds does in SQL, for databases it has no template for
+    return [
+        (user_id, _epoch_seconds(time_in), _epoch_seconds(time_out) if time_out else MISSING)
+        for user_id, time_in, time_out in rows
+    ]
+
+
+def load_arrays(start_date, end_date, company_id=None, employee_id=None):
+    """
+    The range's entries as int64 arrays (user_id, time_in, time_out), times
+    in local epoch seconds and MISSING for an absent time out.
+    """
+    in_db = connection.vendor in EpochSeconds.vendors
+    if in_db:
+        columns = ("user_id", EpochSeconds("time_in"), Coalesce(EpochSeconds("time_out"), MISSING))
+    else:
+        columns = ("user_id", "time_in", "time_out")
+    chunks = []
+    for rows in _entries(start_date, end_date, company_id, employee_id, columns):
+        for batch in iter(lambda: list(islice(rows, CHUNK_ROWS)), []):
+            chunks.append(np.array(batch if in_db else _epoch_rows(batch), dtype=np.int64))
+    if not chunks:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+    data = np.concatenate(chunks)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def _aggregate_numpy(user_ids, tin, tout):
+    """Per (user, day) sums, fully vectorized. Returns parallel arrays."""
+    start, end = _night_window()
+    missing = tout == MISSING
+    tout = np.maximum(np.where(missing, tin, tout), tin)  # A time out before the time in counts as zero
+    worked = tout - tin
+    night = _night_seconds_before_array(tout, start, end) - _night_seconds_before_array(tin, start, end)
+
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    day = tin // DAY
+    first_day = day.min() if len(day) else 0
+    span = int(day.max() - first_day + 1) if len(day) else 1
+    keys, group = np.unique(user_index * span + (day - first_day), return_inverse=True)
+    return (
+        users[keys // span],
+        keys % span + first_day,
+        np.bincount(group),
+        np.bincount(group, weights=worked).astype(np.int64),
+        np.bincount(group, weights=night).astype(np.int64),
+        np.bincount(group, weights=missing).astype(np.int64),
+    )
+
+
+def _aggregate_python(rows_by_source):
+    start, end = _night_window()
+    sums = defaultdict(lambda: [0, 0, 0, 0])
+    for rows in rows_by_source:
+        for user_id, time_in, time_out in rows:
+            tin = _epoch_seconds(time_in)
+            totals = sums[user_id, tin // DAY]
+            totals[0] += 1
+            if time_out is None:
+                totals[3] += 1
+                continue
+            tout = max(_epoch_seconds(time_out), tin)
+            totals[1] += tout - tin
+            totals[2] += night_seconds_before(tout, start, end) - night_seconds_before(tin, start, end)
+    keys = sorted(sums)
+    return (
+        [user_id for user_id, _ in keys],
+        [day for _, day in keys],
+        *([sums[key][i] for key in keys] for i in range(4)),
+    )
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2)
+
+
+def compute_hours(start_date, end_date, company_id=None, employee_id=None, use_numpy=None):
+    """
+    Payable hours per user per day for entries timed in from start_date to
+    end_date inclusive, plus per-user totals. A day's hours beyond
+    PAYROLL_REGULAR_HOURS are overtime; night hours are those inside the
+    PAYROLL_NIGHT_START-PAYROLL_NIGHT_END window; entries without a time
+    out add nothing and are counted as missing_time_outs. Each entry
+    belongs to the day it was timed in.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        columns = _aggregate_numpy(*load_arrays(start_date, end_date, company_id, employee_id))
+        columns = [column.tolist() for column in columns]
+    else:
+        columns = _aggregate_python(_entries(start_date, end_date, company_id, employee_id))
+
+    regular_limit = int(getattr(settings, "PAYROLL_REGULAR_HOURS", 8) * 3600)
+    people = {
+        pk: (employee_id, f"{first_name or ''} {surname or ''}".strip())
+        for pk, employee_id, first_name, surname in CustomerUser.objects.filter(
+            pk__in=set(columns[0])
+        ).values_list("id", "employee_id", "first_name", "surname")
+    }
+
+    days, totals = [], {}
+    for user_id, day, entries, worked, night, missing in zip(*columns):
+        overtime = max(worked - regular_limit, 0)
+        employee, name = people.get(user_id, ("", ""))
+        row = {
+            "employee_id": employee,
+            "name": name,
+            "date": (date(1970, 1, 1) + timedelta(days=day)).isoformat(),
+            "entries": entries,
+            "worked_hours": _hours(worked),
+            "regular_hours": _hours(worked - overtime),
+            "overtime_hours": _hours(overtime),
+            "night_hours": _hours(night),
+            "missing_time_outs": missing,
+        }
+        days.append(row)
+        total = totals.setdefault(user_id, {
+            "employee_id": employee, "name": name, "days": 0, "worked_seconds": 0,
+            "overtime_seconds": 0, "night_seconds": 0, "missing_time_outs": 0,
+        })
+        total["days"] += 1
+        total["worked_seconds"] += worked
+        total["overtime_seconds"] += overtime
+        total["night_seconds"] += night
+        total["missing_time_outs"] += missing
+
+    summary = []
+    for total in totals.values():
+        summary.append({
+            "employee_id": total["employee_id"],
+            "name": total["name"],
+            "days": total["days"],
+            "worked_hours": _hours(total["worked_seconds"]),
+            "regular_hours": _hours(total["worked_seconds"] - total["overtime_seconds"]),
+            "overtime_hours": _hours(total["overtime_seconds"]),
+            "night_hours": _hours(total["night_seconds"]),
+            "missing_time_outs": total["missing_time_outs"],
+        })
+    days.sort(key=lambda row: (row["employee_id"], row["date"]))
+    summary.sort(key=lambda row: row["employee_id"])
+    return {"days": days, "totals": summary}
+
+
+def naive_hours(start_date, end_date):
+    """
+    The per-row ORM loop compute_hours replaces, kept as the benchmark
+    baseline. Returns {(employee_id, date): (worked, overtime, night, missing)} seconds.
+    """
+    start, _ = day_range(start_date)
+    _, end = day_range(end_date)
+    night_start, night_end = _night_window()
+    regular_limit = int(getattr(settings, "PAYROLL_REGULAR_HOURS", 8) * 3600)
+    sums = defaultdict(lambda: [0, 0, 0])
+    entries = chain.from_iterable(
+        source.filter(time_in__gte=start, time_in__lt=end).select_related("user") for source in time_entry_sources(start)
+    )
+    for entry in entries:
+        totals = sums[entry.user.employee_id, entry.time_in.date()]
+        if entry.time_out is None:
+            totals[2] += 1
+            continue
+        tin = _epoch_seconds(entry.time_in)
+        tout = max(_epoch_seconds(entry.time_out), tin)
+        totals[0] += tout - tin
+        totals[1] += (
+            night_seconds_before(tout, night_start, night_end) - night_seconds_before(tin, night_start, night_end)
+        )
+    return {
+        key: (worked, max(worked - regular_limit, 0), night, missing)
+        for key, (worked, night, missing) in sums.items()
+    }
@@ -0,0 +1,130 @@
+# authapp/jobs.py
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+MAX_RETRY_DELAY = 3600
+
+
+def register(name):
+    """Run the decorated function for jobs called ``name``, with the payload as keyword arguments."""
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, dedupe_key=None, delay=0):
+    """
+    Queue a job. It is written in the caller's transaction, so workers see
+    it once that commits and never if it rolls back. While a job with the
+    same dedupe_key is still waiting to start, this adds nothing.
+    """
+    job = Job(
+        name=name,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=getattr(settings, "JOB_MAX_ATTEMPTS", 5),
+    )
+    if dedupe_key:
+        # INSERT ... IGNORE / ON CONFLICT DO NOTHING, so a duplicate doesn't break the caller's transaction
+        Job.objects.bulk_create([job], ignore_conflicts=True)
+    else:
+        job.save()
+
+
+def claim(worker, limit=1):
+    """
+    Lock up to ``limit`` due jobs for ``worker``. They stay invisible to
+    other workers for JOB_VISIBILITY_TIMEOUT seconds; a job whose worker
+    died in that time is claimed again afterwards.
+    """
+    now = timezone.now()
+    visible_at = now + timedelta(seconds=getattr(settings, "JOB_VISIBILITY_TIMEOUT", 300))
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .filter(status__in=(Job.QUEUED, Job.RUNNING), run_at__lte=now)
+            .order_by("run_at")[:limit]
+        )
+        abandoned = [job.pk for job in jobs if job.attempts >= job.max_attempts]
+        if abandoned:
+            # Their last attempt timed out
+            Job.objects.filter(pk__in=abandoned).update(
+                status=Job.FAILED, locked_by=None, last_error="Visibility timeout expired"
+            )
+        jobs = [job for job in jobs if job.pk not in abandoned]
+        # Clearing dedupe_key lets new work for the same key queue up behind a running job
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, run_at=visible_at, attempts=F("attempts") + 1, locked_by=worker, dedupe_key=None
+        )
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker
+    return jobs
+
+
+def retry_delay(attempts):
+    """Exponential backoff from JOB_RETRY_BACKOFF seconds, with jitter so failures don't retry in step."""
+    delay = min(getattr(settings, "JOB_RETRY_BACKOFF", 10) * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def run_job(job):
+    """Run a claimed job, then delete it, or schedule its retry, or mark it failed."""
+    # Only touch the row while this claim still holds it
+    owned = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts)
+    try:
+        handler = HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job.name!r}")
+        handler(**job.payload)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if job.attempts >= job.max_attempts:
+            logger.error(f"Job {job} failed after {job.attempts} attempts: {error}")
+            owned.update(status=Job.FAILED, locked_by=None, last_error=error)
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(f"Job {job} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+            owned.update(
+                status=Job.QUEUED, locked_by=None, last_error=error, run_at=timezone.now() + timedelta(seconds=delay)
+            )
+        return False
+    owned.delete()
+    return True
+
+
+def work(worker, stop, poll_interval=1.0, once=False):
+    """
+    Claim and run jobs one at a time until ``stop`` (a threading.Event) is
+    set, or with ``once`` until none are due. Returns (succeeded, failed).
+    """
+    succeeded = failed = 0
+    while not stop.is_set():
+        jobs = claim(worker)
+        if not jobs:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+        for job in jobs:
+            if run_job(job):
+                succeeded += 1
+            else:
+                failed += 1
+            # Like the end of a request: drop a broken or expired connection
+            close_old_connections()
+    return succeeded, failed
@@ -0,0 +1,189 @@
+# authapp/leave_calendar.py
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .jobs import enqueue, register
+from .models import Holiday, LeaveDay, LeaveRequest
+from .serializers import format_date
+
+HOLIDAYS_CACHE_KEY = "leave:holidays"
+# Requests that hold their days: overlap checks and the calendar ignore rejected ones
+ACTIVE_STATUSES = ("Pending", "Approved")
+
+
+class InvalidLeave(Exception):
+    pass
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def all_holidays():
+    """{company_id or None: set of dates}, cached until a Holiday changes."""
+    holidays = _cache().get(HOLIDAYS_CACHE_KEY)
+    if holidays is None:
+        holidays = defaultdict(set)
+        for day, company_id in Holiday.objects.values_list("date", "company_id"):
+            holidays[company_id].add(day)
+        holidays = dict(holidays)
+        _cache().set(HOLIDAYS_CACHE_KEY, holidays, getattr(settings, "HOLIDAY_CACHE_TIMEOUT", 3600))
+    return holidays
+
+
+def invalidate_holidays():
+    _cache().delete(HOLIDAYS_CACHE_KEY)
+
+
+def company_holidays(company_id):
+    """Dates off for a company: its own holidays plus those without a company."""
+    holidays = all_holidays()
+    return holidays.get(None, set()) | holidays.get(company_id, set())
+
+
+def dates_between(start, end):
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+def working_days(start, end, company_id=None):
+    """Dates from start to end inclusive, less LEAVE_NON_WORKING_WEEKDAYS and the company's holidays."""
+    weekend = set(getattr(settings, "LEAVE_NON_WORKING_WEEKDAYS", (5, 6)))
+    holidays = company_holidays(company_id)
+    return [day for day in dates_between(start, end) if day.weekday() not in weekend and day not in holidays]
+
+
+def find_overlap(user_id, start, end):
+    """The user's first Pending or Approved request sharing a date with start..end, or None."""
+    return (
+        LeaveRequest.objects.filter(
+            user_id=user_id, start_date__lte=end, end_date__gte=start, status__in=ACTIVE_STATUSES
+        )
+        .order_by("start_date")
+        .first()
+    )
+
+
+def check_leave(user_id, company_id, start, end):
+    """
+    Return the working days a new request from start to end takes, or raise
+    InvalidLeave. Call it in the filing transaction with the user's row
+    locked, so two submissions can't both pass the overlap check.
+    """
+    if end < start:
+        raise InvalidLeave("End date must not be before start date")
+    overlap = find_overlap(user_id, start, end)
+    if overlap is not None:
+        raise InvalidLeave(
+            f"Overlaps your {overlap.status.lower()} {overlap.leave_type} "
+            f"from {format_date(overlap.start_date)} to {format_date(overlap.end_date)}"
+        )
+    days = working_days(start, end, company_id)
+    if not days:
+        raise InvalidLeave("No working days between those dates")
+    return days
+
+
+def record_leave_days(leave_request, company_id, days):
+    LeaveDay.objects.bulk_create(
+        LeaveDay(leave_request=leave_request, user_id=leave_request.user_id, company_id=company_id, date=day)
+        for day in days
+    )
+
+
+def calendar_days(company_id, start, end, statuses=ACTIVE_STATUSES):
+    """
+    One entry per date from start to end: whether it is a working day and
+    who in the company is on leave. A single range scan over LeaveDay.
+    """
+    on_leave = defaultdict(list)
+    rows = (
+        LeaveDay.objects.filter(
+            company_id=company_id, date__gte=start, date__lte=end, leave_request__status__in=statuses
+        )
+        .order_by("date", "user__employee_id")
+        .values_list(
+            "date", "user__employee_id", "user__first_name", "user__surname",
+            "leave_request_id", "leave_request__leave_type", "leave_request__status",
+        )
+    )
+    for day, employee_id, first_name, surname, request_id, leave_type, status in rows:
+        on_leave[day].append({
+            "employee_id": employee_id,
+            "name": f"{first_name} {surname}",
+            "leaveRequestId": request_id,
+            "leaveType": leave_type,
+            "status": status,
+        })
+
+    working = set(working_days(start, end, company_id))
+    return [
+        {
+            "date": format_date(day),
+            "workingDay": day in working,
+            "count": len(on_leave[day]),
+            "onLeave": on_leave[day],
+        }
+        for day in dates_between(start, end)
+    ]
+
+
+def rebuild_batch(after_pk=0, batch_size=500, day=None, company_id=None):
+    """
+    Rewrite the LeaveDay rows and leave_days count of the next batch_size
+    Pending or Approved requests with pk > after_pk, from the current
+    holidays and each user's current company. Given a day, only requests
+    spanning it, and given a company_id too, only its users' requests.
+    Returns (last_pk, days written), or None when done.
+    """
+    requests = LeaveRequest.objects.filter(pk__gt=after_pk, status__in=ACTIVE_STATUSES)
+    if day is not None:
+        requests = requests.filter(start_date__lte=day, end_date__gte=day)
+    if company_id is not None:
+        requests = requests.filter(user__company_id=company_id)
+    batch = list(
+        requests
+        .select_related("user")
+        .only("id", "user_id", "start_date", "end_date", "leave_days", "user__company_id")
+        .order_by("pk")[:batch_size]
+    )
+    if not batch:
+        return None
+    days, changed = [], []
+    for leave in batch:
+        dates = working_days(leave.start_date, leave.end_date, leave.user.company_id)
+        days.extend(
+            LeaveDay(leave_request=leave, user_id=leave.user_id, company_id=leave.user.company_id, date=day)
+            for day in dates
+        )
+        # The count the list and detail responses show follows the calendar
+        if leave.leave_days != len(dates):
+            leave.leave_days = len(dates)
+            changed.append(leave)
+    with transaction.atomic():
+        LeaveDay.objects.filter(leave_request__in=batch).delete()
+        LeaveDay.objects.bulk_create(days)
+        LeaveRequest.objects.bulk_update(changed, ["leave_days"])
+    return batch[-1].pk, len(days)
+
+
+@register("rebuild_leave_days")
+def _rebuild_days_job(day, company_id=None):
+    # The worker's own copy of the holiday cache may predate the change
+    invalidate_holidays()
+    day = date.fromisoformat(day)
+    result = rebuild_batch(day=day, company_id=company_id)
+    while result is not None:
+        result = rebuild_batch(result[0], day=day, company_id=company_id)
+
+
+def schedule_leave_rebuild(day, company_id=None):
+    """Queue a rewrite of the leave days of requests spanning day, e.g. after a holiday on it changed."""
+    enqueue(
+        "rebuild_leave_days",
+        {"day": day.isoformat(), "company_id": company_id},
+        dedupe_key=f"leave_days:{day.isoformat()}:{company_id or ''}",
+    )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from flutter_backend.authapp.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves closed time entries older than TIME_ENTRY_RETENTION_MONTHS (whole months) '
+        'from django_time_entries to django_time_entries_archive'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Months to keep in the hot table (default TIME_ENTRY_RETENTION_MONTHS)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(timezone.now().date(), options['months'])
+        self.stdout.write(f'Archiving closed entries timed in before {cutoff:%Y-%m-%d}')
+        last_pk = 0
+        moved = skipped = 0
+
+        while True:
+            result = archive_batch(cutoff, last_pk, options['batch_size'])
+            if result is None:
+                break
+            last_pk, batch_moved, batch_skipped = result
+            moved += batch_moved
+            skipped += batch_skipped
+            self.stdout.write(f'Processed up to entry {last_pk}: {moved} archived, {skipped} left behind')
+
+        self.stdout.write(self.style.SUCCESS(f'Archive complete: {moved} entries archived'))
+        if moved:
+            # InnoDB keeps the freed pages until the table is rebuilt
+            self.stdout.write('Run OPTIMIZE TABLE django_time_entries to reclaim the freed space')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from flutter_backend.authapp.blobstore import store_image_payload
+from flutter_backend.authapp.models import TimeEntry
+
+
+class Command(BaseCommand):
+    help = 'Moves base64 time-in photos out of TimeEntry.image into the blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        moved = skipped = 0
+
+        while True:
+            batch = list(
+                TimeEntry.objects.filter(pk__gt=last_pk, image_key__isnull=True, image__isnull=False)
+                .exclude(image='')
+                .order_by('pk')
+                .only('id', 'image')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            updated = []
+            for entry in batch:
+                try:
+                    key = store_image_payload(entry.image)
+                except (ValueError, OSError) as e:
+                    self.stderr.write(f'Skipping entry {entry.pk}: {e}')
+                    key = None
+                if key is None:
+                    skipped += 1
+                    continue
+                entry.image_key = key
+                entry.image = None
+                updated.append(entry)
+
+            TimeEntry.objects.bulk_update(updated, ['image_key', 'image'])
+            moved += len(updated)
+            self.stdout.write(f'Processed up to entry {last_pk}: {moved} moved, {skipped} left as is')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfill complete: {moved} images moved to the blob store'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from flutter_backend.authapp.geo import parse_location
+from flutter_backend.authapp.geofence import company_worksites, find_worksite
+from flutter_backend.authapp.models import TimeEntry
+
+
+class Command(BaseCommand):
+    help = 'Parses "lat, lon" strings in TimeEntry.location into the latitude/longitude columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--assign-worksites', action='store_true',
+            help="Also record which of the user's company worksites each point falls in",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        parsed = skipped = 0
+
+        while True:
+            batch = list(
+                TimeEntry.objects.filter(pk__gt=last_pk, latitude__isnull=True, location__isnull=False)
+                .exclude(location='')
+                .order_by('pk')
+                .values_list('id', 'location', 'user__company_id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            updated = []
+            for pk, location, company_id in batch:
+                point = parse_location(location)
+                if point is None:
+                    # Error text such as "Location services disabled"
+                    skipped += 1
+                    continue
+                entry = TimeEntry(id=pk, latitude=point[0], longitude=point[1])
+                if options['assign_worksites'] and company_id:
+                    entry.worksite_id = find_worksite(company_worksites(company_id), *point)
+                updated.append(entry)
+
+            fields = ['latitude', 'longitude', 'worksite'] if options['assign_worksites'] else ['latitude', 'longitude']
+            TimeEntry.objects.bulk_update(updated, fields)
+            parsed += len(updated)
+            self.stdout.write(f'Processed up to entry {last_pk}: {parsed} parsed, {skipped} without coordinates')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfill complete: {parsed} locations parsed'))
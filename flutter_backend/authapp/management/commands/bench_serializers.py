@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from flutter_backend.authapp.benchmarks import BenchmarkError, bench_serializers
+
+
+class Command(BaseCommand):
+    help = 'Measures rows/sec for the attendance and leave list serializers, before and after serializers.py'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the fastest counts')
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        try:
+            results = bench_serializers(options['rows'], options['repeat'])
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{results['rows']} rows, JSON backend: {results['backend']}")
+        for name in ('attendance', 'leave_requests'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:15} before {result['before_rows_per_s']:>9} rows/s  "
+                f"after {result['after_rows_per_s']:>9} rows/s  ({result.get('speedup')}x)"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
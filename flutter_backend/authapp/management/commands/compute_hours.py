@@ -0,0 +1,61 @@
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from flutter_backend.authapp.hours import compute_hours
+
+DAY_COLUMNS = [
+    'employee_id', 'name', 'date', 'entries', 'worked_hours', 'regular_hours',
+    'overtime_hours', 'night_hours', 'missing_time_outs',
+]
+
+
+class Command(BaseCommand):
+    help = 'Computes worked, overtime and night hours per employee for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day (YYYY-MM-DD), defaults to the 1st of this month')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--company', type=int, help='Only this company id')
+        parser.add_argument('--employee', help='Only this employee ID')
+        parser.add_argument('--csv', help='Write the per-day rows to this CSV file')
+        parser.add_argument('--no-numpy', action='store_true', help='Use the plain Python implementation')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        try:
+            start_date = (
+                datetime.strptime(options['start'], '%Y-%m-%d').date()
+                if options['start'] else today.replace(day=1)
+            )
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else today
+        except ValueError:
+            raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end')
+
+        result = compute_hours(
+            start_date,
+            end_date,
+            company_id=options['company'],
+            employee_id=options['employee'],
+            use_numpy=False if options['no_numpy'] else None,
+        )
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=DAY_COLUMNS)
+                writer.writeheader()
+                writer.writerows(result['days'])
+            self.stdout.write(f"Wrote {len(result['days'])} day rows to {options['csv']}")
+
+        for total in result['totals']:
+            self.stdout.write(
+                f"{total['employee_id']:8} {total['name'][:30]:30} {total['days']:3} days  "
+                f"{total['worked_hours']:8.2f}h worked  {total['overtime_hours']:7.2f}h OT  "
+                f"{total['night_hours']:7.2f}h night  {total['missing_time_outs']} missing time outs"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed hours for {len(result['totals'])} employees from {start_date} to {end_date}"
+        ))
@@ -1,5 +1,11 @@
-from django.db import models
+import json
+import os
+import time
+
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.core.management.base import BaseCommand
+from flutter_backend.authapp.auth_cache import invalidate_credentials
 from flutter_backend.authapp.models import CustomerUser, Company, Position
 
 class UsersLegacy(models.Model):  # Class name MUST match the import
@@ -18,37 +24,126 @@ class UsersLegacy(models.Model):  # Class name MUST match the import
         managed = False  # Ensure this line exists
         db_table = 'users'  # Maps to your legacy table
 
+USER_FIELDS = [
+    'first_name', 'surname', 'company', 'position', 'birth_date',
+    'date_hired', 'pin', 'preset_name', 'is_active',
+]
+
+
 class Command(BaseCommand):
     help = 'Migrates users from legacy database to new structure'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, 'migrate_from_legacy.checkpoint.json'),
+            help='File recording the last migrated employee_id',
+        )
+        parser.add_argument('--resume', action='store_true', help='Continue after the last checkpoint')
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Overwrite users that already exist instead of skipping them',
+        )
+
     def handle(self, *args, **options):
-        for legacy_user in UsersLegacy.objects.all():
-            # Create or get company
-            if legacy_user.company:
-                company, _ = Company.objects.get_or_create(name=legacy_user.company)
-            else:
-                company = None
+        batch_size = options['batch_size']
+        checkpoint_path = options['checkpoint']
 
-            # Create or get position
-            if legacy_user.position:
-                position, _ = Position.objects.get_or_create(title=legacy_user.position)
-            else:
-                position = None
-
-            # Create new user
-            CustomerUser.objects.create(
-                employee_id=legacy_user.employee_id,
-                first_name=legacy_user.first_name,
-                surname=legacy_user.surname,
-                company=company,
-                position=position,
-                birth_date=legacy_user.birth_date,
-                date_hired=legacy_user.date_hired,
-                pin=legacy_user.pin,
-                preset_name=legacy_user.preset_name,
-                is_active=bool(legacy_user.status)
+        last_employee_id, migrated = '', 0
+        if options['resume'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            last_employee_id, migrated = checkpoint['last_employee_id'], checkpoint['migrated']
+            self.stdout.write(f'Resuming after employee {last_employee_id} ({migrated} already processed)')
+
+        companies = self.resolve(Company, 'name', 'company')
+        positions = self.resolve(Position, 'title', 'position')
+
+        started = time.monotonic()
+        total = migrated
+        # Keyset pages rather than one big iterator(): mysqlclient buffers a
+        # whole result set client-side, so only bounded queries stay flat.
+        while True:
+            rows = list(
+                UsersLegacy.objects.filter(employee_id__gt=last_employee_id)
+                .order_by('employee_id')
+                .values_list(
+                    'employee_id', 'first_name', 'surname', 'company', 'position',
+                    'birth_date', 'date_hired', 'pin', 'preset_name', 'status',
+                )[:batch_size]
             )
-            
-            self.stdout.write(
-                self.style.SUCCESS(f'Successfully migrated user {legacy_user.employee_id}')
-            )
\ No newline at end of file
+            if not rows:
+                break
+            batch = [
+                CustomerUser(
+                    employee_id=employee_id,
+                    first_name=first_name,
+                    surname=surname,
+                    company_id=companies.get(company),
+                    position_id=positions.get(position),
+                    birth_date=birth_date,
+                    date_hired=date_hired,
+                    pin=pin,
+                    preset_name=preset_name,
+                    is_active=bool(status),
+                )
+                for (employee_id, first_name, surname, company, position,
+                     birth_date, date_hired, pin, preset_name, status) in rows
+            ]
+            total = self.flush(batch, checkpoint_path, total, options['update'])
+            self.report(total, total - migrated, started)
+            last_employee_id = batch[-1].employee_id
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully processed {total - migrated} legacy users in {elapsed:.1f}s')
+        )
+
+    def resolve(self, model, field, legacy_field):
+        """Create any missing companies/positions up front and return a name -> id map."""
+        names = set(
+            UsersLegacy.objects.exclude(**{f'{legacy_field}__isnull': True})
+            .exclude(**{legacy_field: ''})
+            .values_list(legacy_field, flat=True)
+            .distinct()
+        )
+        existing = self.name_map(model, field)
+        missing = names - existing.keys()
+        if missing:
+            model.objects.bulk_create([model(**{field: name}) for name in sorted(missing)])
+            existing = self.name_map(model, field)
+        return existing
+
+    def name_map(self, model, field):
+        # Walk newest first so the oldest row wins, like get_or_create's first match
+        return {name: pk for pk, name in model.objects.order_by('-pk').values_list('pk', field)}
+
+    def flush(self, batch, checkpoint_path, total, update):
+        with transaction.atomic():
+            if update:
+                CustomerUser.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=(
+                        ['employee_id'] if connection.features.supports_update_conflicts_with_target else None
+                    ),
+                    update_fields=USER_FIELDS,
+                )
+            else:
+                CustomerUser.objects.bulk_create(batch, ignore_conflicts=True)
+        if update:
+            # The upsert sends no post_save, so a changed PIN or is_active would stay cached
+            invalidate_credentials(*(user.employee_id for user in batch))
+
+        total += len(batch)
+        with open(checkpoint_path, 'w') as f:
+            json.dump({'last_employee_id': batch[-1].employee_id, 'migrated': total}, f)
+        return total
+
+    def report(self, total, this_run, started):
+        elapsed = time.monotonic() - started
+        rate = this_run / elapsed if elapsed else 0
+        self.stdout.write(f'Processed {total} legacy users, {rate:.0f} rows/sec')
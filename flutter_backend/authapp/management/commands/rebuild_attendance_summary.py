@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from flutter_backend.authapp.summaries import rebuild_daily_attendance
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily attendance summary table from time entries for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), defaults to today')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end_date = (
+                datetime.strptime(options['end'], '%Y-%m-%d').date()
+                if options['end'] else timezone.now().date()
+            )
+        except ValueError:
+            raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end')
+
+        total = 0
+        for day, count in rebuild_daily_attendance(start_date, end_date):
+            total += count
+            self.stdout.write(f'{day}: {count} summaries')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} daily summaries'))
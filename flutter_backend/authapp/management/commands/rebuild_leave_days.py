@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from flutter_backend.authapp.leave_calendar import rebuild_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrites the per-day leave calendar (django_leave_days) and leave_days count of every '
+        'Pending and Approved leave request, e.g. after changing LEAVE_NON_WORKING_WEEKDAYS. '
+        'Holiday changes queue their own rebuild'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        last_pk = 0
+        total = 0
+
+        while True:
+            result = rebuild_batch(last_pk, options['batch_size'])
+            if result is None:
+                break
+            last_pk, written = result
+            total += written
+            self.stdout.write(f'Processed up to request {last_pk}: {total} days written')
+
+        self.stdout.write(self.style.SUCCESS(f'Leave calendar rebuilt: {total} days'))
@@ -0,0 +1,105 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from flutter_backend.authapp.benchmarks import BenchmarkError, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the API benchmarks against a throwaway test database and writes the results as JSON. '
+        'With --baseline, fails if any endpoint needs more queries or got slower than the tolerance.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=5)
+        parser.add_argument('--users-per-company', type=int, default=100)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--leaves-per-user', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per endpoint')
+        parser.add_argument('--rush-users', type=int, default=200, help='Users in the morning rush, 0 to skip it')
+        parser.add_argument('--concurrency', type=int, default=20, help='Concurrent devices in the morning rush')
+        parser.add_argument(
+            '--hours', action='store_true',
+            help='Also time compute_hours against a naive ORM loop over the seeded history',
+        )
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help='Earlier results file to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, 0.25 = 25%%')
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=5.0,
+            help='Ignore median slowdowns smaller than this, which are timer noise',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline: {e}")
+
+        seed_options = {
+            'companies': options['companies'],
+            'users_per_company': options['users_per_company'],
+            'days': options['days'],
+            'leaves_per_user': options['leaves_per_user'],
+            'seed': options['seed'],
+        }
+        if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+            # SQLite locks the whole table per writer; concurrent clock-ins just fail
+            self.stderr.write('SQLite test database: running the morning rush with --concurrency 1')
+            options['concurrency'] = 1
+
+        # One log line per benchmarked request would drown the report
+        logging.getLogger('flutter_backend.authapp.metrics').setLevel(logging.WARNING)
+
+        # Never touch real data: build a test database and drop it afterwards
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Every simulated device shares one IP, which the clock_ip limit would throttle
+            with override_settings(THROTTLE_RATES={}):
+                results = run_benchmarks(
+                    seed_options,
+                    repeat=options['repeat'],
+                    rush_users=options['rush_users'],
+                    concurrency=options['concurrency'],
+                    hours=options['hours'],
+                )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:20} {result['queries']:3} queries  "
+                f"median {result['median_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms"
+            )
+        hours = results.get('hours')
+        if hours:
+            line = f"hours over {hours['entries']} entries: naive ORM loop {hours['naive_orm_s']}s, python {hours['python_s']}s"
+            if 'numpy_s' in hours:
+                line += f", numpy {hours['numpy_s']}s ({hours['numpy_speedup']}x)"
+            self.stdout.write(line)
+        rush = results.get('rush')
+        if rush:
+            self.stdout.write(
+                f"morning rush: {rush['users']} users x{rush['concurrency']}  "
+                f"{rush['clock_ins_per_s']} clock-ins/s  p95 {rush['p95_ms']}ms  {rush['errors']} errors"
+            )
+        self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,44 @@
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from flutter_backend.authapp.jobs import work
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (thumbnails, attendance summaries) on a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help='Worker threads (default JOB_WORKERS)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to wait when no job is due (default JOB_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        threads = options['threads'] or getattr(settings, 'JOB_WORKERS', 2)
+        poll_interval = options['poll_interval'] or getattr(settings, 'JOB_POLL_INTERVAL', 1.0)
+        stop = threading.Event()
+
+        def shut_down(signum, frame):
+            # Let running jobs finish; anything unfinished is retried after its visibility timeout
+            self.stdout.write('Stopping after the current jobs...')
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shut_down)
+        signal.signal(signal.SIGINT, shut_down)
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'{name}: {threads} worker threads')
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as pool:
+            futures = [
+                pool.submit(work, f'{name}:{n}', stop, poll_interval, options['once'])
+                for n in range(threads)
+            ]
+            results = [future.result() for future in futures]
+
+        succeeded = sum(ok for ok, _ in results)
+        failed = sum(failed for _, failed in results)
+        self.stdout.write(self.style.SUCCESS(f'Workers stopped: {succeeded} jobs done, {failed} failed'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from flutter_backend.authapp.benchmarks import EMPLOYEE_PREFIX, BenchmarkError, seed_data
+from flutter_backend.authapp.models import CustomerUser
+
+
+class Command(BaseCommand):
+    help = 'Seeds reproducible benchmark data (companies, users, time entries, leave requests) for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=5)
+        parser.add_argument('--users-per-company', type=int, default=200)
+        parser.add_argument('--days', type=int, default=30, help='Days of time entry history per user')
+        parser.add_argument('--leaves-per-user', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, so runs are repeatable')
+
+    def handle(self, *args, **options):
+        if CustomerUser.objects.filter(employee_id__startswith=EMPLOYEE_PREFIX).exists():
+            raise CommandError(f'Employee IDs starting with {EMPLOYEE_PREFIX} already exist; seed an empty database')
+        try:
+            with transaction.atomic():
+                seeded = seed_data(
+                    companies=options['companies'],
+                    users_per_company=options['users_per_company'],
+                    days=options['days'],
+                    leaves_per_user=options['leaves_per_user'],
+                    seed=options['seed'],
+                )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {seeded['users']} users, {seeded['time_entries']} time entries "
+            f"and {seeded['leave_requests']} leave requests (PIN 1234)"
+        ))
@@ -0,0 +1,237 @@
+# authapp/metrics.py
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """What one request spent, filled in by the query wrapper and timed()."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases = {}
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection; only counts queries made for a request.
+    # The stats object is shared with sync_to_async threads through the context.
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's duration to the current request's Server-Timing as ``phase``."""
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.phases[phase] = stats.phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+def server_timing(stats, elapsed):
+    parts = [
+        f"total;dur={elapsed * 1000:.1f}",
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+    ]
+    for phase, seconds in stats.phases.items():
+        parts.append(f"{phase};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# Any other method counts as "OTHER", so made-up methods can't add endpoints
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class EndpointMetrics:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint request metrics kept in process memory. Quantiles come
+    from the last METRICS_WINDOW requests to each endpoint; the totals
+    count every request since the process started. Each worker process
+    reports only its own requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._throttled = {}
+
+    def count_throttled(self, path, reason):
+        """A request refused by ThrottleMiddleware; reason is the rate scope or "concurrency"."""
+        with self._lock:
+            self._throttled[(path, reason)] = self._throttled.get((path, reason), 0) + 1
+
+    def observe(self, method, endpoint, stats, elapsed, request_bytes, response_bytes):
+        key = (method if method in HTTP_METHODS else "OTHER", endpoint)
+        with self._lock:
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = EndpointMetrics(getattr(settings, "METRICS_WINDOW", 1024))
+            metrics.samples.append(elapsed)
+            metrics.count += 1
+            metrics.seconds += elapsed
+            metrics.queries += stats.queries
+            metrics.db_seconds += stats.db_seconds
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes or 0
+
+    def quantiles(self, method, endpoint):
+        with self._lock:
+            samples = sorted(self._endpoints[(method, endpoint)].samples)
+        return _quantiles(samples)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._throttled = {}
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            snapshot = {
+                key: (sorted(m.samples), m.count, m.seconds, m.queries, m.db_seconds, m.request_bytes, m.response_bytes)
+                for key, m in self._endpoints.items()
+            }
+            throttled = dict(self._throttled)
+        lines = [
+            "# HELP api_request_duration_seconds Request wall time by endpoint.",
+            "# TYPE api_request_duration_seconds summary",
+        ]
+        for (method, endpoint), (samples, count, seconds, *_) in sorted(snapshot.items()):
+            labels = f'method="{method}",endpoint="{_escape(endpoint)}"'
+            for q, value in _quantiles(samples).items():
+                lines.append(f'api_request_duration_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"api_request_duration_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"api_request_duration_seconds_count{{{labels}}} {count}")
+        counters = (
+            ("api_request_db_queries_total", "Database queries run by requests.", 3, "{}"),
+            ("api_request_db_seconds_total", "Time requests spent in the database.", 4, "{:.6f}"),
+            ("api_request_bytes_total", "Request body bytes received.", 5, "{}"),
+            ("api_response_bytes_total", "Response body bytes sent (non-streaming).", 6, "{}"),
+        )
+        for name, help_text, index, fmt in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, endpoint), values in sorted(snapshot.items()):
+                labels = f'method="{method}",endpoint="{_escape(endpoint)}"'
+                lines.append(f"{name}{{{labels}}} {fmt.format(values[index])}")
+        lines.append("# HELP api_throttled_requests_total Requests refused with 429, by path and limit.")
+        lines.append("# TYPE api_throttled_requests_total counter")
+        for (path, reason), count in sorted(throttled.items()):
+            lines.append(f'api_throttled_requests_total{{path="{_escape(path)}",reason="{reason}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _quantiles(samples):
+    # Nearest rank over the already sorted window
+    return {q: samples[min(int(len(samples) * q), len(samples) - 1)] for q in QUANTILES}
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def log_request(method, endpoint, status, stats, elapsed, request_bytes, response_bytes):
+    # logfmt, so log pipelines can pick the fields apart
+    logger.info(
+        f"request method={method} endpoint={endpoint} status={status} "
+        f"duration_ms={elapsed * 1000:.1f} queries={stats.queries} db_ms={stats.db_seconds * 1000:.1f} "
+        f"request_bytes={request_bytes} response_bytes={response_bytes if response_bytes is not None else '-'}"
+    )
+
+
+class SampledProfiler:
+    """
+    Profile a METRICS_PROFILE_SAMPLE_RATE fraction of requests with
+    cProfile and keep the .prof file of those slower than
+    METRICS_PROFILE_SLOW_MS in METRICS_PROFILE_DIR. One profile runs at a
+    time per process. For async views the profile covers the event loop
+    thread only: other requests it ran meanwhile show up, and ORM work done
+    in sync_to_async threads shows up as waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def start(self):
+        rate = getattr(settings, "METRICS_PROFILE_SAMPLE_RATE", 0)
+        if not rate or random.random() >= rate or not self._lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler is active (Python 3.12+)
+            self._lock.release()
+            return None
+        return profile
+
+    def stop(self, profile, method, endpoint, elapsed):
+        try:
+            profile.disable()
+            if elapsed * 1000 < getattr(settings, "METRICS_PROFILE_SLOW_MS", 500):
+                return
+            directory = getattr(settings, "METRICS_PROFILE_DIR", "profiles")
+            os.makedirs(directory, exist_ok=True)
+            slug = endpoint.strip("/").replace("/", "_") or "root"
+            path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{elapsed * 1000:.0f}ms.prof")
+            profile.dump_stats(path)
+            logger.warning(f"Slow request profiled: {method} {endpoint} took {elapsed * 1000:.0f}ms, see {path}")
+        except OSError as e:
+            logger.error(f"Error writing request profile: {e}")
+        finally:
+            self._lock.release()
+
+
+profiler = SampledProfiler()
@@ -0,0 +1,222 @@
+# authapp/middleware.py
+import math
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from .metrics import end_request, log_request, profiler, registry, server_timing, start_request
+from .routers import pin_to_primary
+from .throttling import THROTTLED_PATHS, WRITE_PATHS, check_rate, write_limit
+from .tokens import InvalidToken, verify_token
+
+
+class TokenAuthenticationMiddleware:
+    """
+    Resolve ``Authorization: Bearer <token>`` into ``request.token_user``
+    without touching the database. Requests without the header pass
+    through with ``token_user = None``; a bad token is rejected with 401.
+
+    Works in both sync and async stacks, so async views under ASGI are
+    not pushed through a thread by this middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _authenticate(self, request):
+        request.token_user = None
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            try:
+                request.token_user = verify_token(header[len("Bearer "):].strip())
+            except InvalidToken as e:
+                return JsonResponse({"success": False, "message": str(e)}, status=401)
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        error = self._authenticate(request)
+        return error or self.get_response(request)
+
+    async def __acall__(self, request):
+        if "Authorization" in request.headers:
+            # verify_token may reload the revocation list from the database
+            error = await sync_to_async(self._authenticate)(request)
+        else:
+            error = self._authenticate(request)
+        return error or await self.get_response(request)
+
+
+class ReadAfterWriteMiddleware:
+    """
+    After a token-authenticated POST (or other unsafe method), pin that
+    user's reads to the primary for REPLICA_PIN_SECONDS so the replica's
+    lag can't hide the write from the client that made it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _wrote(self, request):
+        return (
+            getattr(settings, "REPLICA_DATABASE", None)
+            and request.method not in ("GET", "HEAD", "OPTIONS")
+            and getattr(request, "token_user", None) is not None
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._wrote(request):
+            pin_to_primary(request.token_user.id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._wrote(request):
+            await sync_to_async(pin_to_primary)(request.token_user.id)
+        return response
+
+
+def _too_many_requests(message, retry_after):
+    response = JsonResponse({"success": False, "message": message}, status=429)
+    response["Retry-After"] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+class ThrottleMiddleware:
+    """
+    Token-bucket limits on login and clock-in/out per client IP and per
+    employee ID (THROTTLE_RATES), then a cap of WRITE_CONCURRENCY_LIMIT
+    write requests in flight per process. Refused requests get a 429 with
+    Retry-After at once instead of queueing for a worker or a database
+    connection, and are counted in /api/_metrics/. Goes after
+    TokenAuthenticationMiddleware, whose token_user names the employee.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _check_rate(self, request):
+        if request.method != "POST" or request.path not in THROTTLED_PATHS:
+            return None
+        wait, scope = check_rate(request)
+        if not wait:
+            return None
+        registry.count_throttled(request.path, scope)
+        return _too_many_requests("Too many attempts, please wait and try again", wait)
+
+    def _write_limit(self, request):
+        if request.method != "POST" or request.path not in WRITE_PATHS:
+            return None
+        return getattr(settings, "WRITE_CONCURRENCY_LIMIT", None)
+
+    def _busy(self, request):
+        registry.count_throttled(request.path, "concurrency")
+        return _too_many_requests("The server is busy, please retry", 1)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        refused = self._check_rate(request)
+        if refused:
+            return refused
+        limit = self._write_limit(request)
+        if not limit:
+            return self.get_response(request)
+        if not write_limit.acquire(limit):
+            return self._busy(request)
+        try:
+            return self.get_response(request)
+        finally:
+            write_limit.release()
+
+    async def __acall__(self, request):
+        if getattr(settings, "THROTTLE_CACHE_ALIAS", None):
+            # A shared cache backend does network I/O
+            refused = await sync_to_async(self._check_rate)(request)
+        else:
+            refused = self._check_rate(request)
+        if refused:
+            return refused
+        limit = self._write_limit(request)
+        if not limit:
+            return await self.get_response(request)
+        if not write_limit.acquire(limit):
+            return self._busy(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            write_limit.release()
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and count its queries. Adds a Server-Timing header
+    (total, db and any timed() phases), logs one logfmt line and feeds
+    the per-endpoint metrics served at /api/_metrics/. Goes first in
+    MIDDLEWARE so the other middleware is included in the total.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = start_request()
+        profile = profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        self._finish(request, response, stats, profile)
+        return response
+
+    async def __acall__(self, request):
+        stats, token = start_request()
+        profile = profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        self._finish(request, response, stats, profile)
+        return response
+
+    def _finish(self, request, response, stats, profile):
+        # Streaming responses are timed up to their headers
+        elapsed = stats.elapsed
+        endpoint = request.resolver_match.route if request.resolver_match else "unmatched"
+        if profile is not None:
+            profiler.stop(profile, request.method, endpoint, elapsed)
+        try:
+            request_bytes = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            request_bytes = 0
+        response_bytes = None if response.streaming else len(response.content)
+        response["Server-Timing"] = server_timing(stats, elapsed)
+        registry.observe(request.method, endpoint, stats, elapsed, request_bytes, response_bytes)
+        log_request(request.method, endpoint, response.status_code, stats, elapsed, request_bytes, response_bytes)
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0002_leaverequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customeruser',
+            name='leave_credits',
+            field=models.IntegerField(default=16),
+        ),
+        migrations.AddField(
+            model_name='customeruser',
+            name='sick_leave_credits',
+            field=models.IntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='leaverequest',
+            name='payment_option',
+            field=models.CharField(choices=[('with pay', 'With Pay'), ('w/o pay', 'Without Pay')], default='with pay', max_length=20),
+        ),
+    ]
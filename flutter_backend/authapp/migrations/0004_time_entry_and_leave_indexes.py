@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0003_leave_credits_and_payment_option'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['user', 'submitted_at'], name='leave_user_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['submitted_at'], name='leave_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'time_in'], name='time_entry_user_time_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['time_in'], name='time_entry_time_in_idx'),
+        ),
+    ]
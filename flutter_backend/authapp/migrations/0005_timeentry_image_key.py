@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0004_time_entry_and_leave_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='image_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
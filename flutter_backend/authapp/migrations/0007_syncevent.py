@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0006_timeentry_thumbnail_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentry',
+            name='time_in',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='SyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('event_type', models.CharField(choices=[('time_in', 'Time In'), ('time_out', 'Time Out')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='authapp.timeentry')),
+            ],
+            options={
+                'db_table': 'django_sync_events',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0008_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('first_in', models.DateTimeField()),
+                ('last_out', models.DateTimeField(blank=True, null=True)),
+                ('total_seconds', models.IntegerField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('is_late', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapp.customeruser')),
+            ],
+            options={
+                'db_table': 'django_daily_attendance',
+                'indexes': [models.Index(fields=['date'], name='daily_attendance_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='daily_attendance_user_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0009_dailyattendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveCreditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credit_type', models.CharField(choices=[('leave', 'Leave'), ('sick', 'Sick Leave')], max_length=10)),
+                ('kind', models.CharField(choices=[('grant', 'Grant'), ('deduct', 'Deduct'), ('refund', 'Refund')], max_length=10)),
+                ('amount', models.IntegerField()),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('leave_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='authapp.leaverequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapp.customeruser')),
+            ],
+            options={
+                'db_table': 'django_leave_credit_ledger',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='leave_ledger_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0010_leavecreditentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0011_leaverequest_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaverequest',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], default='Pending', max_length=20),
+        ),
+    ]
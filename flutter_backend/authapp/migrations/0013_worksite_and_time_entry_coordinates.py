@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0012_leaverequest_status_choices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.CreateModel(
+            name='Worksite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('center_latitude', models.FloatField(blank=True, null=True)),
+                ('center_longitude', models.FloatField(blank=True, null=True)),
+                ('radius_m', models.FloatField(blank=True, null=True)),
+                ('polygon', models.JSONField(blank=True, null=True)),
+                ('min_latitude', models.FloatField(editable=False)),
+                ('max_latitude', models.FloatField(editable=False)),
+                ('min_longitude', models.FloatField(editable=False)),
+                ('max_longitude', models.FloatField(editable=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='worksites', to='authapp.company')),
+            ],
+            options={
+                'db_table': 'django_worksites',
+            },
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='worksite',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='authapp.worksite'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['latitude', 'longitude'], name='time_entry_lat_lon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worksite',
+            index=models.Index(fields=['company', 'is_active'], name='worksite_company_active_idx'),
+        ),
+    ]
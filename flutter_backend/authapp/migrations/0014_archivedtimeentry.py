@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0013_worksite_and_time_entry_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTimeEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('time_in', models.DateTimeField()),
+                ('time_out', models.DateTimeField()),
+                ('image_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('thumbnail_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('location', models.CharField(blank=True, max_length=255, null=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapp.customeruser')),
+                ('worksite', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='authapp.worksite')),
+            ],
+            options={
+                'db_table': 'django_time_entries_archive',
+                'indexes': [models.Index(fields=['user', 'time_in'], name='archived_entry_user_time_idx'), models.Index(fields=['time_in'], name='archived_entry_time_in_idx')],
+            },
+        ),
+    ]
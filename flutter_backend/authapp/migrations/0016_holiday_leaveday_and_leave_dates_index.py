@@ -0,0 +1,63 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0015_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('name', models.CharField(max_length=255)),
+            ],
+            options={
+                'db_table': 'django_holidays',
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+            ],
+            options={
+                'db_table': 'django_leave_days',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='leave_user_dates_idx'),
+        ),
+        migrations.AddField(
+            model_name='holiday',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='authapp.company'),
+        ),
+        migrations.AddField(
+            model_name='leaveday',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='authapp.company'),
+        ),
+        migrations.AddField(
+            model_name='leaveday',
+            name='leave_request',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='authapp.leaverequest'),
+        ),
+        migrations.AddField(
+            model_name='leaveday',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='authapp.customeruser'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveday',
+            index=models.Index(fields=['company', 'date'], name='leave_day_company_date_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user(apps, schema_editor):
+    # Existing events belong to the user of the entry they wrote
+    SyncEvent = apps.get_model('authapp', 'SyncEvent')
+    TimeEntry = apps.get_model('authapp', 'TimeEntry')
+    SyncEvent.objects.filter(entry__isnull=False).update(
+        user_id=Subquery(TimeEntry.objects.filter(pk=OuterRef('entry_id')).values('user_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0016_holiday_leaveday_and_leave_dates_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncevent',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='authapp.customeruser'),
+        ),
+        migrations.RunPython(backfill_user, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='syncevent',
+            name='key',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='syncevent',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='sync_event_user_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.5 on 2026-10-18 19:40
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_leave_days(apps, schema_editor):
+    # What leave_calendar.rebuild_batch does, with the historical models, so
+    # requests filed before 0016 count in overlap checks and the calendar
+    Holiday = apps.get_model('authapp', 'Holiday')
+    LeaveDay = apps.get_model('authapp', 'LeaveDay')
+    LeaveRequest = apps.get_model('authapp', 'LeaveRequest')
+
+    weekend = set(getattr(settings, 'LEAVE_NON_WORKING_WEEKDAYS', (5, 6)))
+    holidays = defaultdict(set)
+    for day, company_id in Holiday.objects.values_list('date', 'company_id'):
+        holidays[company_id].add(day)
+
+    last_pk = 0
+    while True:
+        batch = list(
+            LeaveRequest.objects.filter(pk__gt=last_pk, status__in=('Pending', 'Approved'))
+            .select_related('user')
+            .order_by('pk')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        days, changed = [], []
+        for leave in batch:
+            company_id = leave.user.company_id
+            off = holidays[None] | holidays[company_id]
+            dates = [
+                leave.start_date + timedelta(days=n)
+                for n in range((leave.end_date - leave.start_date).days + 1)
+            ]
+            dates = [day for day in dates if day.weekday() not in weekend and day not in off]
+            days.extend(
+                LeaveDay(leave_request_id=leave.pk, user_id=leave.user_id, company_id=company_id, date=day)
+                for day in dates
+            )
+            if leave.leave_days != len(dates):
+                leave.leave_days = len(dates)
+                changed.append(leave)
+        LeaveDay.objects.filter(leave_request__in=batch).delete()
+        LeaveDay.objects.bulk_create(days)
+        LeaveRequest.objects.bulk_update(changed, ['leave_days'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0017_sync_event_per_user_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_leave_days, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
 # authapp/models.py
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.core.validators import MinLengthValidator
 from django.utils import timezone
 
+from .geo import is_coordinate, polygon_bounds, radius_bounds
+
 
 class Company(models.Model):
     name = models.CharField(max_length=255)
@@ -46,6 +49,13 @@ class CustomerUser(models.Model):
     def __str__(self):
         return self.employee_id
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the credential cache drop the old key when employee_id changes
+        instance._loaded_employee_id = instance.__dict__.get("employee_id")
+        return instance
+
     @classmethod
     def authenticate_by_pin(cls, employee_id, pin):
         try:
@@ -60,40 +70,301 @@ class CustomerUser(models.Model):
     class Meta:
         db_table = "django_users"
 
+# A geofence is either a circle (center + radius_m) or a polygon of
+# [lat, lon] points. The bounding box columns are derived on save so a
+# time-in can rule most worksites out before the exact test.
+class Worksite(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="worksites")
+    name = models.CharField(max_length=255)
+    center_latitude = models.FloatField(null=True, blank=True)
+    center_longitude = models.FloatField(null=True, blank=True)
+    radius_m = models.FloatField(null=True, blank=True)
+    polygon = models.JSONField(null=True, blank=True)
+    min_latitude = models.FloatField(editable=False)
+    max_latitude = models.FloatField(editable=False)
+    min_longitude = models.FloatField(editable=False)
+    max_longitude = models.FloatField(editable=False)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = "django_worksites"
+        indexes = [
+            models.Index(fields=["company", "is_active"], name="worksite_company_active_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.polygon:
+            # The geofence does arithmetic on every point at each time-in
+            if not isinstance(self.polygon, list) or len(self.polygon) < 3 or not all(
+                isinstance(point, list) and len(point) == 2 and is_coordinate(*point) for point in self.polygon
+            ):
+                raise ValidationError("polygon needs at least three [lat, lon] points of numbers in range")
+        elif self.center_latitude is None or self.center_longitude is None or not self.radius_m:
+            raise ValidationError("Set either a polygon or a center and radius_m")
+        elif not is_coordinate(self.center_latitude, self.center_longitude) or self.radius_m < 0:
+            raise ValidationError("The center must be a valid latitude and longitude, with a positive radius_m")
+
+    def save(self, *args, **kwargs):
+        self.clean()  # The bounds below need a polygon or a full center and radius
+        if self.polygon:
+            bounds = polygon_bounds(self.polygon)
+        else:
+            bounds = radius_bounds(self.center_latitude, self.center_longitude, self.radius_m)
+        self.min_latitude, self.max_latitude, self.min_longitude, self.max_longitude = bounds
+        super().save(*args, **kwargs)
+
+
 class TimeEntry(models.Model):
     user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)  # This is the correct field name
-    time_in = models.DateTimeField(auto_now_add=True)
+    time_in = models.DateTimeField(default=timezone.now)  # Offline sync supplies the device's clock-in time
     time_out = models.DateTimeField(null=True, blank=True)
     image = models.TextField(null=True, blank=True)  # For storing image path or base64
+    image_key = models.CharField(max_length=64, null=True, blank=True)  # SHA-256 key in the blob store
+    thumbnail_key = models.CharField(max_length=64, null=True, blank=True)  # Filled in by the thumbnail workers
     location = models.CharField(max_length=255, null=True, blank=True)  # New field for location
+    # Parsed from location; null when the device sent no usable fix
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    worksite = models.ForeignKey(Worksite, on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
         db_table = 'django_time_entries'
+        indexes = [
+            models.Index(fields=["user", "time_in"], name="time_entry_user_time_in_idx"),
+            models.Index(fields=["time_in"], name="time_entry_time_in_idx"),
+            models.Index(fields=["latitude", "longitude"], name="time_entry_lat_lon_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.surname} - {self.time_in}"
 
 
+# Closed TimeEntry rows older than TIME_ENTRY_RETENTION_MONTHS, moved here
+# by the archive_time_entries command so django_time_entries only holds
+# recent history. Rows keep their TimeEntry id; photos live in the blob
+# store, so there is no inline image column. Read through archive.py.
+class ArchivedTimeEntry(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)
+    time_in = models.DateTimeField()
+    time_out = models.DateTimeField()
+    image_key = models.CharField(max_length=64, null=True, blank=True)
+    thumbnail_key = models.CharField(max_length=64, null=True, blank=True)
+    location = models.CharField(max_length=255, null=True, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    worksite = models.ForeignKey(Worksite, on_delete=models.SET_NULL, null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "django_time_entries_archive"
+        indexes = [
+            models.Index(fields=["user", "time_in"], name="archived_entry_user_time_idx"),
+            models.Index(fields=["time_in"], name="archived_entry_time_in_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.time_in} (archived)"
+
+
+# Per user per day rollup of TimeEntry, kept current by summaries.py
+class DailyAttendance(models.Model):
+    user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)
+    date = models.DateField()
+    first_in = models.DateTimeField()
+    last_out = models.DateTimeField(null=True, blank=True)
+    total_seconds = models.IntegerField(default=0)  # Closed entries only
+    entry_count = models.IntegerField(default=0)
+    is_late = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = "django_daily_attendance"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="daily_attendance_user_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="daily_attendance_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}"
+
+
 class LeaveRequest(models.Model):
     PAYMENT_CHOICES = (
     ("with pay", "With Pay"),
     ("w/o pay", "Without Pay"),
     )
+    STATUS_CHOICES = (
+        ("Pending", "Pending"),
+        ("Approved", "Approved"),
+        ("Rejected", "Rejected"),
+    )
     user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)
     leave_type = models.CharField(max_length=50)
     start_date = models.DateField()
     end_date = models.DateField()
     leave_days = models.IntegerField()
     reason = models.TextField(null=True, blank=True)
-    status = models.CharField(max_length=20, default="Pending")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     payment_option = models.CharField(
         max_length=20,
         choices=PAYMENT_CHOICES,
         default="with pay"
     )
     submitted_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Bulk update() callers must set this themselves
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "submitted_at"], name="leave_user_submitted_idx"),
+            models.Index(fields=["submitted_at"], name="leave_submitted_idx"),
+            # Overlap check at submit: this user's requests with start <= new end and end >= new start
+            models.Index(fields=["user", "start_date", "end_date"], name="leave_user_dates_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.surname} - {self.leave_type} ({self.status})"
-    
 
+
+# Non-working dates for leave day counts. A holiday without a company
+# applies to every company.
+class Holiday(models.Model):
+    date = models.DateField(db_index=True)
+    name = models.CharField(max_length=255)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        db_table = "django_holidays"
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a moved holiday also rebuild the leave days of its old date
+        instance._loaded_day = (instance.__dict__.get("date"), instance.__dict__.get("company_id"))
+        return instance
+
+
+# One row per working day of each Pending or Approved leave request, so
+# "who is on leave at company X between two dates" is an index range scan.
+# Written with the request, removed when it is rejected (leave_calendar.py).
+class LeaveDay(models.Model):
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name="days")
+    user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True)  # The user's, when filed
+    date = models.DateField()
+
+    class Meta:
+        db_table = "django_leave_days"
+        indexes = [
+            models.Index(fields=["company", "date"], name="leave_day_company_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date}"
+
+
+# Append-only history of leave credit movements. CustomerUser.leave_credits
+# and sick_leave_credits are the cached balances, updated in the same
+# transaction as each row written here.
+class LeaveCreditEntry(models.Model):
+    CREDIT_CHOICES = (
+        ("leave", "Leave"),
+        ("sick", "Sick Leave"),
+    )
+    KIND_CHOICES = (
+        ("grant", "Grant"),
+        ("deduct", "Deduct"),
+        ("refund", "Refund"),
+    )
+    user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE)
+    credit_type = models.CharField(max_length=10, choices=CREDIT_CHOICES)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.IntegerField()  # Signed: deductions are negative
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True)
+    note = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "django_leave_credit_ledger"
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="leave_ledger_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.amount} {self.credit_type}"
+
+
+# Idempotency record for clock-ins/outs replayed through /api/time-entries/sync/
+class SyncEvent(models.Model):
+    EVENT_CHOICES = (
+        ("time_in", "Time In"),
+        ("time_out", "Time Out"),
+    )
+    # Keys are the device's, so they are only unique per employee. Rows
+    # written before user existed whose entry is gone keep user null
+    user = models.ForeignKey(CustomerUser, on_delete=models.CASCADE, null=True, blank=True)
+    key = models.CharField(max_length=64)
+    event_type = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    entry = models.ForeignKey(TimeEntry, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "django_sync_events"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="sync_event_user_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.key}"
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)  # Rows can be purged once the token would have expired anyway
+
+    class Meta:
+        db_table = "django_revoked_tokens"
+
+    def __str__(self):
+        return self.jti
+
+
+# Deferred work, claimed and run by "manage.py run_workers" (see jobs.py).
+# A claimed job's run_at is pushed out by the visibility timeout, so it
+# comes back on its own if the worker dies; finished jobs are deleted.
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FAILED, "Failed"),
+    )
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # Unique while the job waits to start, then cleared (MySQL has no partial unique indexes)
+    dedupe_key = models.CharField(max_length=191, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "django_jobs"
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,94 @@
+# authapp/pagination.py
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def parse_page_size(raw):
+    if raw in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid page_size")
+    if page_size < 1:
+        raise InvalidCursor("Invalid page_size")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def _seek(queryset, field, cursor):
+    queryset = queryset.order_by(f"-{field}", "-id")
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+        )
+    return queryset
+
+
+def _split_page(rows, field, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return rows, next_cursor
+
+
+def keyset_page(queryset, field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for the queryset ordered newest first on
+    (field, id). Seeks past the cursor instead of using OFFSET, so every
+    page costs the same no matter how deep the client has scrolled.
+    """
+    rows = list(_seek(queryset, field, cursor)[:page_size + 1])
+    return _split_page(rows, field, page_size)
+
+
+async def akeyset_page(queryset, field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Async version of keyset_page for async views."""
+    rows = [row async for row in _seek(queryset, field, cursor)[:page_size + 1]]
+    return _split_page(rows, field, page_size)
+
+
+def keyset_chunks(queryset, field, chunk_size=2000):
+    """
+    Yield every row of the queryset oldest first on (field, id), one bounded
+    query per chunk. Unlike iterator(), this keeps memory flat on MySQL,
+    where mysqlclient buffers a whole result set client-side.
+    """
+    queryset = queryset.order_by(field, "id")
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            value = getattr(last, field)
+            chunk = chunk.filter(Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": last.pk}))
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
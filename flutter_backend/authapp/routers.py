@@ -0,0 +1,101 @@
+# authapp/routers.py
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+class ReplicaRouter:
+    """
+    Send reads made inside a read_from_replica view to REPLICA_DATABASE.
+    Everything else, and every write, stays on the primary, so a view
+    that reads what it just wrote never sees replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(settings, "REPLICA_DATABASE", None)
+        if replica and _replica_reads.get():
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def _pin_key(user_id):
+    return f"db:primary:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Keep this user's reads on the primary until the replica has caught up."""
+    _cache().set(_pin_key(user_id), True, getattr(settings, "REPLICA_PIN_SECONDS", 10))
+
+
+def _pinned(request):
+    token_user = getattr(request, "token_user", None)
+    return token_user is not None and _cache().get(_pin_key(token_user.id)) is not None
+
+
+async def _apinned(request):
+    token_user = getattr(request, "token_user", None)
+    return token_user is not None and await _cache().aget(_pin_key(token_user.id)) is not None
+
+
+def _on_replica(iterable):
+    # Streaming bodies are read after the view returns, so route each step
+    # separately rather than leaking the flag between yields
+    iterator = iter(iterable)
+    while True:
+        token = _replica_reads.set(True)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _replica_reads.reset(token)
+        yield item
+
+
+def read_from_replica(view):
+    """
+    Run the view's queries, including a streaming response body, on the
+    replica when one is configured and the client has not written recently.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not getattr(settings, "REPLICA_DATABASE", None) or await _apinned(request):
+                return await view(request, *args, **kwargs)
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not getattr(settings, "REPLICA_DATABASE", None) or _pinned(request):
+            return view(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+        if response.streaming:
+            response.streaming_content = _on_replica(response.streaming_content)
+        return response
+    return wrapper
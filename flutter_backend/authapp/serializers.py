@@ -0,0 +1,121 @@
+# authapp/serializers.py
+import json
+from functools import lru_cache
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+NOT_YET_OUT = "Not Yet Out"
+STREAM_CHUNK_ROWS = 500
+
+# "%H" -> "%I" and "%M"/"%S" without going through strftime per field
+_TWO_DIGITS = tuple(f"{n:02d}" for n in range(60))
+_HOUR_12 = tuple(_TWO_DIGITS[hour % 12 or 12] for hour in range(24))
+_MERIDIEM = tuple(" AM" if hour < 12 else " PM" for hour in range(24))
+
+
+@lru_cache(maxsize=1024)
+def format_date(day):
+    """``day.strftime("%Y-%m-%d")``, cached: list rows share a handful of days."""
+    return day.strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=1024)
+def _day_prefix(day):
+    return format_date(day) + " "
+
+
+def format_datetime(value):
+    """``value.strftime("%Y-%m-%d %I:%M:%S %p")``, the display format the app shows."""
+    return (
+        _day_prefix(value.date()) + _HOUR_12[value.hour] + ":" + _TWO_DIGITS[value.minute]
+        + ":" + _TWO_DIGITS[value.second] + _MERIDIEM[value.hour]
+    )
+
+
+# Output schemas, one per model, shared by every view that lists them
+
+def attendance_row(entry, user):
+    # Same shape for attendance_list_view items and stream events, so clients can merge them
+    return {
+        "id": entry.pk,
+        "name": f"{user.first_name} {user.surname}",
+        "time_in": format_datetime(entry.time_in),
+        "time_out": format_datetime(entry.time_out) if entry.time_out else NOT_YET_OUT,
+        "location": entry.location if entry.location else "N/A",
+    }
+
+
+def leave_row(leave):
+    return {
+        "id": leave.id,
+        "leaveType": leave.leave_type,
+        "startDate": format_date(leave.start_date),
+        "endDate": format_date(leave.end_date),
+        "leaveDays": leave.leave_days,
+        "reason": leave.reason,
+        "status": leave.status,
+    }
+
+
+def daily_summary_row(summary):
+    return {
+        "employee_id": summary.user.employee_id,
+        "name": f"{summary.user.first_name} {summary.user.surname}",
+        "date": format_date(summary.date),
+        "first_in": format_datetime(summary.first_in),
+        "last_out": format_datetime(summary.last_out) if summary.last_out else NOT_YET_OUT,
+        "hours": round(summary.total_seconds / 3600, 2),
+        "entries": summary.entry_count,
+        "late": summary.is_late,
+    }
+
+
+def _encode_default(value):
+    return DjangoJSONEncoder().default(value)
+
+
+if orjson is not None:
+    def dumps(data):
+        # Dates and datetimes go through DjangoJSONEncoder too, so both backends agree
+        return orjson.dumps(data, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+else:
+    def dumps(data):
+        return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def json_response(data, **kwargs):
+    """JsonResponse, encoded with orjson when it is installed."""
+    kwargs.setdefault("content_type", "application/json")
+    return HttpResponse(dumps(data), **kwargs)
+
+
+def _json_stream(data, key, rows, chunk_size):
+    head = dumps({**{k: v for k, v in data.items() if k != key}, key: []})
+    # Reopen the empty array at the end so the rows can be written into it
+    yield head[:-2]
+    chunk, first = [], True
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            encoded = dumps(chunk)[1:-1]
+            yield encoded if first else b"," + encoded
+            chunk, first = [], False
+    if chunk:
+        encoded = dumps(chunk)[1:-1]
+        yield encoded if first else b"," + encoded
+    yield b"]}"
+
+
+def streaming_json_response(data, key, rows, chunk_size=STREAM_CHUNK_ROWS):
+    """
+    Like json_response({**data, key: list(rows)}), but sent with chunked
+    encoding, ``chunk_size`` rows at a time, so a large array never exists
+    as one encoded body. The array goes last in the object.
+    """
+    return StreamingHttpResponse(_json_stream(data, key, rows, chunk_size), content_type="application/json")
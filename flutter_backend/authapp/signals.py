@@ -0,0 +1,57 @@
+# authapp/signals.py
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_cache import CREDENTIAL_FIELDS, invalidate_credentials
+from .geofence import invalidate_worksites
+from .leave_calendar import invalidate_holidays, schedule_leave_rebuild
+from .metrics import record_query
+from .models import CustomerUser, Holiday, Worksite
+
+
+@receiver(post_save, sender=CustomerUser)
+def invalidate_credentials_on_save(sender, instance, update_fields=None, **kwargs):
+    # Saves that only touch other columns (e.g. last_login on every login) keep the entry
+    if update_fields is not None and not set(update_fields) & set(CREDENTIAL_FIELDS):
+        return
+    # After commit: a login racing the save would otherwise re-cache the old row
+    loaded = getattr(instance, "_loaded_employee_id", None)
+    if loaded and loaded != instance.employee_id:
+        transaction.on_commit(partial(invalidate_credentials, loaded, instance.employee_id))
+    else:
+        transaction.on_commit(partial(invalidate_credentials, instance.employee_id))
+    instance._loaded_employee_id = instance.employee_id
+
+
+@receiver(post_delete, sender=CustomerUser)
+def invalidate_credentials_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_credentials, instance.employee_id))
+
+
+@receiver(post_save, sender=Worksite)
+@receiver(post_delete, sender=Worksite)
+def invalidate_worksites_on_change(sender, instance, **kwargs):
+    invalidate_worksites(instance.company_id)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_holidays_on_change(sender, instance, **kwargs):
+    invalidate_holidays()
+    # Leave already filed across the date gains or loses a working day
+    days = {(instance.date, instance.company_id), getattr(instance, "_loaded_day", (None, None))}
+    for day, company_id in days:
+        if day is not None:
+            schedule_leave_rebuild(day, company_id)
+    instance._loaded_day = (instance.date, instance.company_id)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # The same wrapper object survives reconnects, so only add the wrapper once
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
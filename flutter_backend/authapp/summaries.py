@@ -0,0 +1,103 @@
+# authapp/summaries.py
+from datetime import date, datetime, timedelta
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .archive import time_entry_sources
+from .jobs import enqueue, register
+from .models import DailyAttendance
+from .utils import day_range
+
+
+def _late_after(day):
+    start = datetime.strptime(getattr(settings, "ATTENDANCE_SHIFT_START", "08:00"), "%H:%M").time()
+    grace = timedelta(minutes=getattr(settings, "ATTENDANCE_GRACE_MINUTES", 15))
+    return datetime.combine(day, start) + grace
+
+
+def summarize(rows):
+    """Fold (user_id, time_in, time_out) rows into unsaved DailyAttendance rows."""
+    summaries = {}
+    for user_id, time_in, time_out in rows:
+        key = (user_id, time_in.date())
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = DailyAttendance(
+                user_id=user_id, date=key[1], first_in=time_in, entry_count=0
+            )
+        summary.first_in = min(summary.first_in, time_in)
+        summary.entry_count += 1
+        if time_out:
+            summary.total_seconds += max(int((time_out - time_in).total_seconds()), 0)
+            summary.last_out = max(summary.last_out, time_out) if summary.last_out else time_out
+    for summary in summaries.values():
+        summary.is_late = summary.first_in > _late_after(summary.date)
+    return summaries
+
+
+def refresh_daily_attendance(pairs):
+    """
+    Recompute the summary rows for the given (user_id, date) pairs. Each
+    pair only reads that user's entries for that day, which the
+    (user, time_in) index serves directly.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    conditions = []
+    for user_id, day in pairs:
+        start, end = day_range(day)
+        conditions.append(Q(user_id=user_id, time_in__gte=start, time_in__lt=end))
+    condition = reduce(or_, conditions)
+    sources = time_entry_sources(day_range(min(day for _, day in pairs))[0])
+    summaries = summarize(chain.from_iterable(
+        entries.filter(condition).values_list("user_id", "time_in", "time_out") for entries in sources
+    ))
+
+    with transaction.atomic():
+        DailyAttendance.objects.filter(
+            reduce(or_, (Q(user_id=user_id, date=day) for user_id, day in pairs))
+        ).delete()
+        DailyAttendance.objects.bulk_create(summaries.values())
+
+
+@register("refresh_daily_attendance")
+def _refresh_job(pairs):
+    refresh_daily_attendance((user_id, date.fromisoformat(day)) for user_id, day in pairs)
+
+
+def schedule_refresh(pairs):
+    """Queue a refresh of the pairs' summary rows, to run once the surrounding transaction commits."""
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return
+    # Clock events for one user and day share a job until it starts
+    dedupe_key = f"summary:{pairs[0][0]}:{pairs[0][1]}" if len(pairs) == 1 else None
+    enqueue(
+        "refresh_daily_attendance",
+        {"pairs": [[user_id, day.isoformat()] for user_id, day in pairs]},
+        dedupe_key=dedupe_key,
+    )
+
+
+def rebuild_daily_attendance(start_date, end_date):
+    """Rebuild every summary row from start_date to end_date inclusive, one day at a time."""
+    sources = time_entry_sources(day_range(start_date)[0])
+    day = start_date
+    while day <= end_date:
+        start, end = day_range(day)
+        summaries = summarize(chain.from_iterable(
+            entries.filter(time_in__gte=start, time_in__lt=end).values_list("user_id", "time_in", "time_out")
+            for entries in sources
+        ))
+        with transaction.atomic():
+            DailyAttendance.objects.filter(date=day).delete()
+            DailyAttendance.objects.bulk_create(summaries.values(), batch_size=1000)
+        yield day, len(summaries)
+        day += timedelta(days=1)
+
@@ -0,0 +1,209 @@
+# authapp/sync.py
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .blobstore import store_image_payload
+from .events import publish_on_commit
+from .geofence import OutsideGeofence, locate_time_in
+from .models import CustomerUser, SyncEvent, TimeEntry
+from .serializers import attendance_row
+from .summaries import schedule_refresh
+from .utils import day_range
+
+MAX_SYNC_EVENTS = 500
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+@dataclass
+class ClockEvent:
+    index: int
+    key: str
+    event_type: str
+    employee_id: str
+    timestamp: object
+    location: str = None
+    image: str = None
+    image_key: str = None
+
+
+def parse_event(index, event, token_employee_id=None):
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+    key = event.get("key")
+    if not key or not isinstance(key, str) or len(key) > 64:
+        raise ValueError("Missing or invalid idempotency key")
+    event_type = event.get("type")
+    if event_type not in ("time_in", "time_out"):
+        raise ValueError("Event type must be time_in or time_out")
+    employee_id = event.get("employee_id")
+    if token_employee_id:
+        # A token holder may only clock themselves
+        if employee_id and str(employee_id) != token_employee_id:
+            raise ValueError("Event is for another employee")
+        employee_id = token_employee_id
+    if not employee_id:
+        raise ValueError("Employee ID is required")
+
+    timestamp = parse_datetime(str(event.get("timestamp") or ""))
+    if timestamp is None:
+        raise ValueError("Invalid timestamp. Use ISO 8601.")
+    if timezone.is_aware(timestamp):
+        timestamp = timezone.make_naive(timestamp)
+    if timestamp > timezone.now() + MAX_CLOCK_SKEW:
+        raise ValueError("Timestamp is in the future")
+    max_days = getattr(settings, "SYNC_MAX_OFFLINE_DAYS", 7)
+    if timestamp < timezone.now() - timedelta(days=max_days):
+        raise ValueError(f"Timestamp is more than {max_days} days old")
+
+    parsed = ClockEvent(index, key, event_type, str(employee_id), timestamp)
+    if event_type == "time_in":
+        parsed.location = event.get("location")
+        parsed.image = event.get("image")
+        try:
+            parsed.image_key = store_image_payload(parsed.image)
+        except (ValueError, OSError):
+            raise ValueError("Invalid image")
+        if parsed.image_key:
+            parsed.image = None
+    return parsed
+
+
+def _fill_pks(entries):
+    # Backends without RETURNING (MySQL) leave bulk-created pks unset
+    lookup = {}
+    rows = TimeEntry.objects.filter(
+        user_id__in={entry.user_id for entry in entries},
+        time_in__in={entry.time_in for entry in entries},
+    ).order_by("id").values_list("user_id", "time_in", "id")
+    for user_id, time_in, pk in rows:
+        lookup[user_id, time_in] = pk
+    for entry in entries:
+        entry.pk = lookup.get((entry.user_id, entry.time_in))
+
+
+def sync_time_entries(events, token_employee_id=None):
+    """
+    Apply a batch of client-timestamped clock-in/clock-out events in one
+    transaction and return one result per event, in request order.
+
+    Events whose idempotency key the same employee already applied are
+    reported as duplicates instead of being written again, so a device can
+    safely resend its whole queue after a dropped connection. With a
+    token_employee_id, events for any other employee are rejected.
+    """
+    results = [None] * len(events)
+    pending = []
+    seen = set()
+    for index, event in enumerate(events):
+        key = event.get("key") if isinstance(event, dict) else None
+        try:
+            parsed = parse_event(index, event, token_employee_id)
+            if (parsed.employee_id, parsed.key) in seen:
+                raise ValueError("Duplicate key in batch")
+        except ValueError as e:
+            results[index] = {"key": key, "status": "error", "message": str(e)}
+            continue
+        seen.add((parsed.employee_id, parsed.key))
+        pending.append(parsed)
+
+    if not pending:
+        return results
+
+    with transaction.atomic():
+        names = {}
+        users = {}
+        companies = {}
+        for employee_id, user_id, first_name, surname, company_id in (
+            CustomerUser.objects.filter(employee_id__in={event.employee_id for event in pending})
+            .values_list("employee_id", "id", "first_name", "surname", "company_id")
+        ):
+            users[employee_id] = user_id
+            companies[user_id] = company_id
+            names[user_id] = CustomerUser(id=user_id, first_name=first_name, surname=surname)
+        applied = {
+            (user_id, key): entry_id
+            for user_id, key, entry_id in SyncEvent.objects.filter(
+                user_id__in=users.values(), key__in=[event.key for event in pending]
+            ).values_list("user_id", "key", "entry_id")
+        }
+
+        # Latest open entry per user, starting from the earliest day in the batch
+        earliest, _ = day_range(min(event.timestamp for event in pending).date())
+        open_entries = {}
+        for entry in (
+            TimeEntry.objects.filter(user_id__in=users.values(), time_in__gte=earliest, time_out__isnull=True)
+            .only("id", "user_id", "time_in", "time_out")
+            .order_by("time_in")
+        ):
+            open_entries[entry.user_id] = entry
+
+        created, closed, applied_now = [], [], []
+        for event in sorted(pending, key=lambda event: event.timestamp):
+            user_id = users.get(event.employee_id)
+            if user_id is None:
+                results[event.index] = {"key": event.key, "status": "error", "message": "User not found"}
+                continue
+            if (user_id, event.key) in applied:
+                results[event.index] = {
+                    "key": event.key, "status": "duplicate", "entry_id": applied[user_id, event.key]
+                }
+                continue
+
+            if event.event_type == "time_in":
+                try:
+                    latitude, longitude, worksite_id = locate_time_in(companies[user_id], event.location)
+                except OutsideGeofence as e:
+                    results[event.index] = {"key": event.key, "status": "error", "message": str(e)}
+                    continue
+                entry = TimeEntry(
+                    user_id=user_id,
+                    time_in=event.timestamp,
+                    image=event.image,
+                    image_key=event.image_key,
+                    location=event.location,
+                    latitude=latitude,
+                    longitude=longitude,
+                    worksite_id=worksite_id,
+                )
+                created.append(entry)
+                open_entries[user_id] = entry
+            else:
+                entry = open_entries.get(user_id)
+                if entry is None or entry.time_in.date() != event.timestamp.date() or entry.time_in > event.timestamp:
+                    results[event.index] = {
+                        "key": event.key, "status": "error", "message": "No active time entry found for that day"
+                    }
+                    continue
+                entry.time_out = event.timestamp
+                del open_entries[user_id]
+                if entry.pk:
+                    closed.append(entry)
+            applied_now.append((event, entry))
+
+        TimeEntry.objects.bulk_create(created)
+        if created and not connection.features.can_return_rows_from_bulk_insert:
+            _fill_pks(created)
+        TimeEntry.objects.bulk_update(closed, ["time_out"])
+        SyncEvent.objects.bulk_create([
+            SyncEvent(user_id=entry.user_id, key=event.key, event_type=event.event_type, entry_id=entry.pk)
+            for event, entry in applied_now
+        ])
+        schedule_refresh({(entry.user_id, entry.time_in.date()) for _, entry in applied_now})
+        for event, entry in applied_now:
+            if event.event_type == "time_in":
+                publish_on_commit("time_in", attendance_row(entry, names[entry.user_id]))
+            else:
+                publish_on_commit("time_out", attendance_row(entry, names[entry.user_id]))
+
+    for event, entry in applied_now:
+        results[event.index] = {
+            "key": event.key,
+            "status": "created" if event.event_type == "time_in" else "closed",
+            "entry_id": entry.pk,
+        }
+    return results
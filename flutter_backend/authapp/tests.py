@@ -1,3 +1,1229 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .archive import archive_batch, archive_cutoff
+from .auth_cache import credentials_cache_key, get_login_user
+from .benchmarks import bench_serializers, compare_results, employee_id, endpoint_scenarios, run_endpoints, seed_data
+from .blobstore import get_blob_store
+from .credits import InsufficientCredits, adjust_credits, refund_leave_requests
+from .decisions import decide_leave_requests
+from .events import AttendanceBroker
+from .exports import attendance_rows
+from .geo import parse_location
+from .geofence import company_worksites, find_worksite
+from .hours import compute_hours, load_arrays, naive_hours, np
+from .jobs import claim, enqueue, register, run_job
+from .leave_calendar import company_holidays, working_days
+from .management.commands.migrate_from_legacy import UsersLegacy
+from .metrics import registry
+from .models import (
+    ArchivedTimeEntry, Company, CustomerUser, DailyAttendance, Holiday, Job, LeaveCreditEntry, LeaveDay, LeaveRequest,
+    RevokedToken, SyncEvent, TimeEntry, Worksite,
+)
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .routers import pin_to_primary, read_from_replica
+from .serializers import _json_stream, dumps, format_datetime
+from .summaries import refresh_daily_attendance
+from .throttling import CacheBuckets, _memory_buckets, body_employee_id, write_limit
+from .thumbnails import Image
+from .tokens import REFRESH, InvalidToken, TokenUser, issue_tokens, revocation_list, revoke, verify_token
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the SQL the hot views actually run and check an index is used."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234"
+        )
+        TimeEntry.objects.create(user=cls.user, time_in=timezone.now())
+        LeaveRequest.objects.create(
+            user=cls.user,
+            leave_type="Vacation Leave",
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date(),
+            leave_days=1,
+        )
+
+    def setUp(self):
+        _memory_buckets.reset()
+
+    def explain_view_queries(self, method, path, table, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            getattr(self.client, method)(path, **kwargs)
+        plans = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.upper().startswith("SELECT") or table not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+                plans.append(" ".join(str(col) for row in cursor.fetchall() for col in row))
+        self.assertTrue(plans, f"{path} ran no SELECT against {table}")
+        return plans
+
+    def assertPlanUsesIndex(self, plans, index_name):
+        self.assertTrue(
+            any(index_name in plan for plan in plans),
+            f"{index_name} not used by any plan: {plans}",
+        )
+
+    def test_attendance_list_uses_time_in_index(self):
+        plans = self.explain_view_queries("get", "/api/attendance/", "django_time_entries")
+        self.assertPlanUsesIndex(plans, "time_entry_time_in_idx")
+
+    def test_time_out_uses_user_time_in_index(self):
+        plans = self.explain_view_queries(
+            "post",
+            "/api/time-out/",
+            "django_time_entries",
+            data={"employee_id": self.user.employee_id},
+            content_type="application/json",
+        )
+        self.assertPlanUsesIndex(plans, "time_entry_user_time_in_idx")
+
+    def test_leave_requests_uses_user_submitted_index(self):
+        plans = self.explain_view_queries(
+            "get",
+            "/api/leave-requests/",
+            "authapp_leaverequest",
+            data={"employee_id": self.user.employee_id},
+        )
+        self.assertPlanUsesIndex(plans, "leave_user_submitted_idx")
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        # Three entries share a time_in, so only the id can order them
+        TimeEntry.objects.bulk_create(
+            [TimeEntry(user=user, time_in=datetime(2025, 3, 3, 8)) for _ in range(3)]
+            + [TimeEntry(user=user, time_in=datetime(2025, 3, 3, 9))]
+        )
+
+    def test_cursor_round_trip(self):
+        value = datetime(2025, 3, 3, 8, 0, 0, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(value, 42)), (value, 42))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("bm90IGEgY3Vyc29y")
+
+    def test_pages_break_ties_on_id(self):
+        expected = list(TimeEntry.objects.order_by("-time_in", "-id").values_list("pk", flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(TimeEntry.objects.all(), "time_in", cursor, page_size=1)
+            seen.extend(row.pk for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(52))
+
+
+def use_temp_blob_store(test):
+    """Point the blob store at a directory removed when the test ends."""
+    root = tempfile.TemporaryDirectory()
+    test.addCleanup(root.cleanup)
+    overridden = override_settings(BLOB_STORE={"OPTIONS": {"root": root.name}})
+    overridden.enable()
+    test.addCleanup(overridden.disable)
+    get_blob_store.cache_clear()
+    test.addCleanup(get_blob_store.cache_clear)
+    return get_blob_store()
+
+
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        _memory_buckets.reset()
+        self.store = use_temp_blob_store(self)
+
+    def test_same_bytes_are_stored_once(self):
+        key = self.store.save([PNG[:10], PNG[10:]])
+        self.assertEqual(self.store.save([PNG]), key)
+        files = [name for _, _, names in os.walk(self.store.root) for name in names]
+        self.assertEqual(files, [key])
+
+    def test_etag_not_modified_and_range(self):
+        key = self.store.save([PNG])
+        url = f"/api/time-in/images/{key}/"
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "image/png"))
+        self.assertEqual(b"".join(response.streaming_content), PNG)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        partial = self.client.get(url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual((partial.status_code, partial["Content-Range"]), (206, f"bytes 2-5/{len(PNG)}"))
+        self.assertEqual(b"".join(partial.streaming_content), PNG[2:6])
+        suffix = self.client.get(url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(suffix.streaming_content), PNG[-3:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(PNG)}-").status_code, 416)
+
+    def test_malformed_photo_is_rejected(self):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        # Valid for the sniffed first 64 characters, not after
+        image = base64.b64encode(PNG).decode() + "\u00e9AAA"
+        response = self.client.post(
+            "/api/time-in/", {"employee_id": "100001", "image": image}, content_type="application/json"
+        )
+        self.assertEqual(response.json()["message"], "Invalid image")
+        self.assertFalse(TimeEntry.objects.exists())
+
+
+class TimeInUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+
+    def setUp(self):
+        _memory_buckets.reset()
+        self.store = use_temp_blob_store(self)
+
+    def upload(self, content):
+        return self.client.post("/api/time-in/upload/", {
+            "employee_id": "100001", "location": "14.5, 121.0", "image": SimpleUploadedFile("photo.png", content),
+        }).json()
+
+    def test_photo_is_stored_and_thumbnail_queued(self):
+        self.assertTrue(self.upload(PNG)["success"])
+        entry = TimeEntry.objects.get()
+        self.assertIsNone(entry.image)
+        with self.store.open(entry.image_key) as blob:
+            self.assertEqual(blob.read(), PNG)
+        if Image is not None:
+            self.assertTrue(Job.objects.filter(dedupe_key=f"thumbnail:{entry.pk}").exists())
+
+    def test_non_image_upload_is_rejected(self):
+        self.assertEqual(self.upload(b"not an image at all")["message"], "Invalid image")
+        self.assertFalse(TimeEntry.objects.exists())
+
+
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+
+    def sync(self, events):
+        return self.client.post("/api/time-entries/sync/", {"events": events}, content_type="application/json").json()
+
+    def test_replayed_batch_is_reported_as_duplicates(self):
+        day = timezone.now().date() - timedelta(days=1)
+        events = [
+            {"key": "in-1", "type": "time_in", "employee_id": "100001", "timestamp": f"{day}T08:00:00"},
+            {"key": "out-1", "type": "time_out", "employee_id": "100001", "timestamp": f"{day}T17:00:00"},
+        ]
+        first = self.sync(events)["results"]
+        self.assertEqual([result["status"] for result in first], ["created", "closed"])
+        replay = self.sync(events)["results"]
+        self.assertEqual([result["status"] for result in replay], ["duplicate", "duplicate"])
+        entry = TimeEntry.objects.get()
+        self.assertEqual({result["entry_id"] for result in first + replay}, {entry.pk})
+        self.assertEqual(entry.time_out, datetime(day.year, day.month, day.day, 17))
+
+    @override_settings(SYNC_MAX_OFFLINE_DAYS=7)
+    def test_events_older_than_the_offline_limit_are_refused(self):
+        day = timezone.now().date() - timedelta(days=30)
+        result = self.sync([
+            {"key": "in-old", "type": "time_in", "employee_id": "100001", "timestamp": f"{day}T08:00:00"},
+        ])["results"][0]
+        self.assertEqual((result["status"], result["message"]), ("error", "Timestamp is more than 7 days old"))
+        self.assertFalse(TimeEntry.objects.exists())
+
+    def test_keys_are_scoped_to_the_employee(self):
+        CustomerUser.objects.create(employee_id="100002", first_name="Maria", surname="Santos", pin="1234")
+        stamp = f"{timezone.now().date() - timedelta(days=1)}T08:00:00"
+        first = self.sync([{"key": "in-1", "type": "time_in", "employee_id": "100001", "timestamp": stamp}])
+        # The same key from another employee is their own event, not the first one's duplicate
+        other = self.sync([{"key": "in-1", "type": "time_in", "employee_id": "100002", "timestamp": stamp}])
+        self.assertEqual(other["results"][0]["status"], "created")
+        self.assertNotEqual(other["results"][0]["entry_id"], first["results"][0]["entry_id"])
+        self.assertEqual(TimeEntry.objects.filter(user__employee_id="100002").count(), 1)
+
+
+class LegacyImportTests(TransactionTestCase):
+    # The legacy table is unmanaged, so it is created here; DDL needs a real transaction
+    def setUp(self):
+        cache.clear()
+        with connection.schema_editor() as editor:
+            editor.create_model(UsersLegacy)
+        self.addCleanup(self.drop_legacy_table)
+        UsersLegacy.objects.bulk_create([
+            UsersLegacy(employee_id=f"00000{n}", first_name=f"User {n}", company="Agridom", pin="1234", status=1)
+            for n in range(1, 4)
+        ])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, "checkpoint.json")
+
+    def drop_legacy_table(self):
+        with connection.schema_editor() as editor:
+            editor.delete_model(UsersLegacy)
+
+    def test_resume_continues_after_checkpoint(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump({"last_employee_id": "000002", "migrated": 2}, f)
+        out = io.StringIO()
+        call_command("migrate_from_legacy", batch_size=2, checkpoint=self.checkpoint, resume=True, stdout=out)
+        self.assertIn("Resuming after employee 000002", out.getvalue())
+        self.assertEqual(list(CustomerUser.objects.values_list("employee_id", "company__name")), [("000003", "Agridom")])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    @override_settings(AUTH_CACHE_TIMEOUT=300)
+    def test_update_drops_cached_credentials(self):
+        call_command("migrate_from_legacy", checkpoint=self.checkpoint, stdout=io.StringIO())
+        self.assertTrue(get_login_user("000001").is_active)
+        UsersLegacy.objects.filter(employee_id="000001").update(status=0)
+        call_command("migrate_from_legacy", checkpoint=self.checkpoint, update=True, stdout=io.StringIO())
+        self.assertFalse(get_login_user("000001").is_active)
+
+
+@override_settings(AUTH_CACHE_TIMEOUT=300)
+class CredentialCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_save_refreshes_cached_pin(self):
+        self.assertEqual(get_login_user("100001").pin, "1234")
+        user = CustomerUser.objects.get(employee_id="100001")
+        user.pin = "4321"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_login_user("100001").pin, "4321")
+        with self.assertNumQueries(0):
+            get_login_user("100001")
+
+    def test_renaming_drops_the_old_key(self):
+        get_login_user("100001")
+        user = CustomerUser.objects.get(employee_id="100001")
+        user.employee_id = "100009"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertIsNone(get_login_user("100001"))
+        self.assertEqual(get_login_user("100009").pk, user.pk)
+
+    def test_entry_is_dropped_only_after_commit(self):
+        get_login_user("100001")
+        user = CustomerUser.objects.get(employee_id="100001")
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                user.save()
+                # A login inside the transaction's window still sees the committed row
+                self.assertTrue(cache.get(credentials_cache_key("100001")))
+            self.assertTrue(cache.get(credentials_cache_key("100001")))
+        self.assertIsNone(cache.get(credentials_cache_key("100001")))
+        self.assertFalse(get_login_user("100001").is_active)
+
+
+class TokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        CustomerUser.objects.create(employee_id="100002", first_name="Maria", surname="Santos", pin="1234")
+
+    def setUp(self):
+        cache.clear()
+        revocation_list.clear()
+        self.addCleanup(revocation_list.clear)
+        self.tokens = issue_tokens(self.user)
+
+    def refresh(self, refresh_token):
+        return self.client.post("/api/token/refresh/", {"refresh_token": refresh_token}, content_type="application/json")
+
+    def test_issued_token_verifies(self):
+        token_user = verify_token(self.tokens["token"])
+        self.assertEqual((token_user.id, token_user.employee_id), (self.user.pk, "100001"))
+        with self.assertRaisesMessage(InvalidToken, "Invalid token"):
+            verify_token(self.tokens["token"], REFRESH)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = self.tokens["token"]
+        tampered = token[:-1] + ("A" if token[-1] != "A" else "B")
+        with self.assertRaisesMessage(InvalidToken, "Invalid token"):
+            verify_token(tampered)
+        response = self.client.get("/api/attendance/", HTTP_AUTHORIZATION=f"Bearer {tampered}")
+        self.assertEqual(response.status_code, 401)
+        with override_settings(AUTH_ACCESS_TOKEN_TTL=-1):
+            with self.assertRaisesMessage(InvalidToken, "Token has expired"):
+                verify_token(token)
+
+    def test_refresh_token_is_single_use(self):
+        response = self.refresh(self.tokens["refresh_token"])
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(verify_token(response.json()["token"]).employee_id, "100001")
+        self.assertEqual(self.refresh(self.tokens["refresh_token"]).status_code, 401)
+
+    def test_only_one_concurrent_revoke_wins(self):
+        # Both refreshes verified the token before either revoked it
+        token_user = verify_token(self.tokens["refresh_token"], REFRESH)
+        self.assertTrue(revoke(token_user))
+        self.assertFalse(revoke(token_user))
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_logout_revokes_the_access_token(self):
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {self.tokens['token']}"}
+        self.assertTrue(self.client.post("/api/logout/", {}, content_type="application/json", **auth).json()["success"])
+        self.assertEqual(self.client.get("/api/attendance/", **auth).status_code, 401)
+
+    @override_settings(AUTH_REVOCATION_REFRESH=3600)
+    def test_revocations_from_other_processes_load_on_refresh(self):
+        token_user = verify_token(self.tokens["token"])
+        RevokedToken.objects.create(jti=token_user.jti, expires_at=timezone.now() + timedelta(hours=1))
+        verify_token(self.tokens["token"])  # The loaded list predates the row
+        with override_settings(AUTH_REVOCATION_REFRESH=0):
+            with self.assertRaisesMessage(InvalidToken, "Token has been revoked"):
+                verify_token(self.tokens["token"])
+
+    def test_sync_events_must_be_for_the_token_holder(self):
+        day = timezone.now().date() - timedelta(days=1)
+        events = [
+            {"key": "k1", "type": "time_in", "employee_id": "100002", "timestamp": f"{day}T08:00:00"},
+            {"key": "k2", "type": "time_in", "timestamp": f"{day}T08:00:00"},
+        ]
+        results = self.client.post(
+            "/api/time-entries/sync/", {"events": events}, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['token']}",
+        ).json()["results"]
+        self.assertEqual(results[0]["message"], "Event is for another employee")
+        self.assertEqual(results[1]["status"], "created")
+        self.assertEqual(TimeEntry.objects.get().user, self.user)
+
+
+class DailySummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        cls.day = date(2025, 3, 3)
+        TimeEntry.objects.bulk_create([
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 3, 8, 30), time_out=datetime(2025, 3, 3, 12)),
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 3, 13), time_out=datetime(2025, 3, 3, 17)),
+        ])
+
+    def test_refresh_recomputes_only_the_given_day(self):
+        refresh_daily_attendance({(self.user.pk, self.day)})
+        summary = DailyAttendance.objects.get()
+        self.assertEqual((summary.entry_count, summary.total_seconds, summary.is_late), (2, 7.5 * 3600, True))
+        self.assertEqual(summary.last_out, datetime(2025, 3, 3, 17))
+
+        # A later entry that day replaces the row rather than adding one
+        TimeEntry.objects.create(user=self.user, time_in=datetime(2025, 3, 3, 18))
+        refresh_daily_attendance({(self.user.pk, self.day)})
+        self.assertEqual(DailyAttendance.objects.get().entry_count, 3)
+
+    def test_summary_endpoint_reads_the_rows(self):
+        refresh_daily_attendance({(self.user.pk, self.day)})
+        response = self.client.get("/api/attendance/summary/", {"start": "2025-03-01", "end": "2025-03-31"}).json()
+        self.assertEqual(response["summary"][0]["hours"], 7.5)
+
+    def test_summary_range_is_checked_and_capped(self):
+        def message(**params):
+            return self.client.get("/api/attendance/summary/", params).json().get("message")
+
+        self.assertEqual(message(start="2025-03-31", end="2025-03-01"), "start must not be after end")
+        self.assertEqual(message(start="2025-01-01", end="2025-12-31"), "At most 93 days per request")
+        self.assertIsNone(message(start="2025-01-01", end="2025-12-31", group="month"))
+        self.assertEqual(message(start="2020-01-01", end="2025-12-31", group="month"), "At most 366 days per request")
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name="Agridom")
+        user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234", company=company
+        )
+        TimeEntry.objects.bulk_create([
+            TimeEntry(user=user, time_in=datetime(2025, 3, day, 8), time_out=datetime(2025, 3, day, 17))
+            for day in (3, 4, 5)
+        ])
+        LeaveRequest.objects.create(
+            user=user, leave_type="Sick Leave", start_date=date(2025, 2, 27), end_date=date(2025, 3, 3), leave_days=3,
+        )
+        cls.user = user
+        cls.staff = CustomerUser.objects.create(employee_id="900001", first_name="Ana", surname="Reyes", is_staff=True)
+
+    def auth(self, user):
+        return {"Authorization": f"Bearer {issue_tokens(user)['token']}"}
+
+    def test_rows_are_the_same_across_chunk_sizes(self):
+        rows = list(attendance_rows(date(2025, 3, 1), date(2025, 3, 31), chunk_size=1))
+        self.assertEqual(rows, list(attendance_rows(date(2025, 3, 1), date(2025, 3, 31))))
+        self.assertEqual([row[4] for row in rows[1:]], ["2025-03-03", "2025-03-04", "2025-03-05"])
+        self.assertEqual(rows[1][7], 9.0)
+
+    def test_csv_and_gzip_downloads_stream(self):
+        params = {"start": "2025-03-01", "end": "2025-03-31"}
+        response = self.client.get("/api/export/leave/", params, headers=self.auth(self.staff))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="leave_20250301_20250331.csv"')
+        body = b"".join(response.streaming_content)
+        # The request started in February but overlaps March
+        self.assertEqual(body.decode().splitlines()[1].split(",")[:5], ["100001", "Juan Cruz", "Agridom", "", "Sick Leave"])
+        compressed = self.client.get("/api/export/leave/", {**params, "gzip": "1"}, headers=self.auth(self.staff))
+        self.assertEqual(gzip.decompress(b"".join(compressed.streaming_content)), body)
+
+    def test_exports_need_a_staff_token(self):
+        self.assertEqual(self.client.get("/api/export/leave/").status_code, 401)
+        self.assertEqual(self.client.get("/api/export/attendance/", headers=self.auth(self.user)).status_code, 403)
+
+    def test_formula_cells_are_neutralised(self):
+        LeaveRequest.objects.filter(user=self.user).update(reason='=HYPERLINK("http://x","y")')
+        CustomerUser.objects.filter(pk=self.user.pk).update(first_name="@SUM(A1)")
+        response = self.client.get(
+            "/api/export/leave/", {"start": "2025-03-01", "end": "2025-03-31"}, headers=self.auth(self.staff)
+        )
+        row = next(csv.reader(b"".join(response.streaming_content).decode().splitlines()[1:]))
+        self.assertEqual(row[1], "'@SUM(A1) Cruz")
+        self.assertEqual(row[-1], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(row[7], "3")
+
+
+class LeaveCreditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234", leave_credits=1
+        )
+
+    def file_leave(self):
+        with transaction.atomic():
+            leave = LeaveRequest.objects.create(
+                user=self.user, leave_type="Vacation Leave", start_date=date(2030, 1, 7), end_date=date(2030, 1, 7),
+                leave_days=1,
+            )
+            adjust_credits(self.user.pk, "leave", -1, "deduct", leave_request=leave)
+        return leave
+
+    def balance(self):
+        return CustomerUser.objects.values_list("leave_credits", flat=True).get(pk=self.user.pk)
+
+    def test_last_credit_can_only_be_spent_once(self):
+        leave = self.file_leave()
+        # The balance check is part of the UPDATE, so a stale read can't overspend
+        with self.assertRaises(InsufficientCredits):
+            self.file_leave()
+        self.assertEqual(self.balance(), 0)
+        self.assertEqual(list(LeaveCreditEntry.objects.values_list("leave_request", "amount")), [(leave.pk, -1)])
+
+    def test_refund_returns_what_the_ledger_charged(self):
+        leave = self.file_leave()
+        legacy = LeaveRequest.objects.create(
+            user=self.user, leave_type="Sick Leave", start_date=date(2030, 1, 8), end_date=date(2030, 1, 8), leave_days=1,
+        )
+        refund_leave_requests([(leave.pk, self.user.pk, leave.leave_type), (legacy.pk, self.user.pk, legacy.leave_type)])
+        user = CustomerUser.objects.get(pk=self.user.pk)
+        self.assertEqual((user.leave_credits, user.sick_leave_credits), (1, 11))
+        self.assertEqual(LeaveCreditEntry.objects.filter(kind="refund").count(), 2)
+
+
+class LeaveListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        cls.leave = LeaveRequest.objects.create(
+            user=user, leave_type="Vacation Leave", start_date=date(2030, 1, 7), end_date=date(2030, 1, 7), leave_days=1,
+        )
+
+    def get(self, **headers):
+        return self.client.get("/api/leave-requests/", {"employee_id": "100001"}, **headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.get()
+        self.assertEqual(len(first.json()["leaveRequests"]), 1)
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        decide_leave_requests([self.leave.pk], "Approved")
+        changed = self.get(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+
+class LeaveDecisionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.supervisor = CustomerUser.objects.create(employee_id="900001", pin="1234", is_staff=True)
+        cls.user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        cls.pending, cls.approved = (
+            LeaveRequest.objects.create(
+                user=cls.user, leave_type="Vacation Leave", start_date=date(2030, 1, day), end_date=date(2030, 1, day),
+                leave_days=1, status=status,
+            )
+            for day, status in ((7, "Pending"), (8, "Approved"))
+        )
+
+    def decide(self, user, ids, decision="reject"):
+        return self.client.post(
+            "/api/leave-requests/decide/", {"decision": decision, "ids": ids}, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {issue_tokens(user)['token']}",
+        )
+
+    def test_only_pending_requests_are_decided(self):
+        results = self.decide(self.supervisor, [self.pending.pk, self.approved.pk, 999999]).json()["results"]
+        self.assertEqual([result["outcome"] for result in results], ["updated", "skipped", "not_found"])
+        self.assertEqual(results[1]["status"], "Approved")
+        self.assertEqual(LeaveRequest.objects.get(pk=self.approved.pk).status, "Approved")
+        # Only the rejected request is refunded
+        self.assertEqual(CustomerUser.objects.get(pk=self.user.pk).leave_credits, 17)
+
+    def test_employees_cannot_decide(self):
+        self.assertEqual(self.decide(self.user, [self.pending.pk]).status_code, 403)
+        self.assertEqual(LeaveRequest.objects.get(pk=self.pending.pk).status, "Pending")
+
+
+class AttendanceStreamTests(TestCase):
+    async def test_subscribers_get_published_events_and_backlog(self):
+        events = AttendanceBroker(history_size=2)
+        subscription, backlog, gap = events.subscribe()
+        self.assertEqual((backlog, gap), ([], False))
+        # Published from a view's worker thread, delivered on the subscriber's loop
+        await sync_to_async(events.publish)("time_in", {"id": 1})
+        self.assertEqual(await asyncio.wait_for(subscription.queue.get(), 1), (1, "time_in", {"id": 1}))
+
+        events.publish("time_out", {"id": 1})
+        events.publish("time_in", {"id": 2})
+        _, backlog, gap = events.subscribe(last_event_id=2)
+        self.assertEqual((backlog, gap), ([(3, "time_in", {"id": 2})], False))
+        _, backlog, gap = events.subscribe(last_event_id=0)
+        self.assertTrue(gap)  # Event 1 fell out of the history
+
+    def test_stream_needs_asgi(self):
+        self.assertEqual(self.client.get("/api/attendance/stream/").status_code, 501)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        _memory_buckets.reset()
+
+    async def test_login_clock_and_leave_through_asgi(self):
+        await CustomerUser.objects.acreate(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        login = await self.async_client.post(
+            "/api/login/", {"username": "100001", "password": "1234"}, content_type="application/json"
+        )
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        async def post(path, data):
+            response = await self.async_client.post(path, data, content_type="application/json", headers=headers)
+            return response.json()
+
+        self.assertTrue((await post("/api/time-in/", {"location": "14.5, 121.0"}))["success"])
+        self.assertTrue((await post("/api/time-out/", {}))["success"])
+        leave = await post("/api/submit-leave/", {
+            "leaveType": "Vacation Leave", "startDate": "2030-01-07", "endDate": "2030-01-07", "reason": "Trip",
+        })
+        self.assertEqual(leave["leaveRequest"]["leaveDays"], 1)
+        entry = await TimeEntry.objects.select_related("user").aget()
+        self.assertEqual((entry.user.employee_id, entry.time_out is not None), ("100001", True))
+
+
+def _replica_view(request):
+    return HttpResponse(TimeEntry.objects.all().db)
+
+
+def _replica_stream_view(request):
+    return StreamingHttpResponse(TimeEntry.objects.all().db for _ in range(2))
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.request.token_user = None
+
+    def test_reads_go_to_replica_inside_view(self):
+        response = read_from_replica(_replica_view)(self.request)
+        self.assertEqual(response.content, b"replica")
+        self.assertEqual(TimeEntry.objects.all().db, "default")
+
+    def test_writes_stay_on_primary(self):
+        self.assertEqual(router.db_for_write(TimeEntry), "default")
+
+    def test_streaming_body_reads_from_replica(self):
+        response = read_from_replica(_replica_stream_view)(self.request)
+        self.assertEqual(b"".join(response.streaming_content), b"replicareplica")
+
+    def test_recent_writer_reads_from_primary(self):
+        self.request.token_user = TokenUser(7, "100001", "jti", "a", 0)
+        pin_to_primary(7)
+        self.addCleanup(cache.clear)
+        response = read_from_replica(_replica_view)(self.request)
+        self.assertEqual(response.content, b"default")
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        response = read_from_replica(_replica_view)(self.request)
+        self.assertEqual(response.content, b"default")
+
+
+class BenchmarkTests(TestCase):
+    def test_every_endpoint_is_measured(self):
+        seeded = seed_data(companies=1, users_per_company=3, days=2, leaves_per_user=1)
+        results = run_endpoints([employee_id(n) for n in range(seeded["users"])], repeat=2)
+        self.assertEqual(set(results), {name for name, _ in endpoint_scenarios([])})
+        for name, result in results.items():
+            self.assertGreater(result["queries"], 0, name)
+
+    def test_extra_query_is_a_regression(self):
+        baseline = {"endpoints": {"login": {"queries": 2, "median_ms": 4.0}}}
+        same = {"endpoints": {"login": {"queries": 2, "median_ms": 4.5}}}
+        worse = {"endpoints": {"login": {"queries": 3, "median_ms": 4.0}}}
+        self.assertEqual(compare_results(baseline, same), [])
+        self.assertEqual(compare_results(baseline, worse), ["login: 2 -> 3 queries"])
+
+    def test_slowdown_beyond_tolerance_is_a_regression(self):
+        baseline = {"endpoints": {"attendance": {"queries": 1, "median_ms": 20.0}}}
+        slower = {"endpoints": {"attendance": {"queries": 1, "median_ms": 40.0}}}
+        self.assertEqual(len(compare_results(baseline, slower, tolerance=0.25)), 1)
+        self.assertEqual(compare_results(baseline, slower, tolerance=1.5), [])
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234"
+        )
+
+    def setUp(self):
+        _memory_buckets.reset()
+        registry.reset()
+
+    def test_server_timing_counts_queries_of_async_views(self):
+        response = self.client.post(
+            "/api/time-in/", {"employee_id": "100001"}, content_type="application/json"
+        )
+        timing = response["Server-Timing"]
+        self.assertIn("total;dur=", timing)
+        self.assertIn("parse;dur=", timing)
+        self.assertNotIn('desc="0 queries"', timing)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_metrics_endpoint_reports_each_route(self):
+        self.client.get("/api/attendance/")
+        self.client.get("/api/attendance/")
+        body = self.client.get("/api/_metrics/").content.decode()
+        self.assertIn(
+            'api_request_duration_seconds_count{method="GET",endpoint="api/attendance/"} 2', body
+        )
+        self.assertIn('quantile="0.99"', body)
+        self.assertEqual(set(registry.quantiles("GET", "api/attendance/")), {0.5, 0.95, 0.99})
+
+    def test_metrics_need_a_staff_token_or_allowed_ip(self):
+        self.assertEqual(self.client.get("/api/_metrics/").status_code, 401)
+        worker = {"Authorization": f"Bearer {issue_tokens(self.user)['token']}"}
+        self.assertEqual(self.client.get("/api/_metrics/", headers=worker).status_code, 403)
+        staff = CustomerUser.objects.create(employee_id="900001", first_name="Ana", surname="Reyes", is_staff=True)
+        supervisor = {"Authorization": f"Bearer {issue_tokens(staff)['token']}"}
+        self.assertEqual(self.client.get("/api/_metrics/", headers=supervisor).status_code, 200)
+
+    def test_unknown_methods_share_one_series(self):
+        for method in ("FOO1", "FOO2"):
+            self.client.generic(method, "/api/attendance/")
+        body = registry.render()
+        self.assertIn('api_request_duration_seconds_count{method="OTHER",endpoint="api/attendance/"} 2', body)
+        self.assertNotIn('method="FOO1"', body)
+
+
+class GeofenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Agridom")
+        cls.user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234", company=cls.company
+        )
+        cls.farm = Worksite.objects.create(
+            company=cls.company, name="Farm", center_latitude=14.5995, center_longitude=120.9842, radius_m=200
+        )
+        cls.warehouse = Worksite.objects.create(
+            company=cls.company,
+            name="Warehouse",
+            polygon=[[14.60, 121.00], [14.60, 121.01], [14.61, 121.01], [14.61, 121.00]],
+        )
+
+    def setUp(self):
+        _memory_buckets.reset()
+        cache.clear()
+
+    def time_in(self, location):
+        return self.client.post(
+            "/api/time-in/", {"employee_id": "100001", "location": location}, content_type="application/json"
+        ).json()
+
+    def test_parse_location(self):
+        self.assertEqual(parse_location("14.5995, 120.9842"), (Decimal("14.599500"), Decimal("120.984200")))
+        self.assertIsNone(parse_location("Location services disabled"))
+        self.assertIsNone(parse_location("95.0, 10.0"))
+
+    def test_time_in_inside_radius_records_coordinates(self):
+        self.assertTrue(self.time_in("14.5996, 120.9843")["success"])
+        entry = TimeEntry.objects.get()
+        self.assertEqual(entry.latitude, Decimal("14.599600"))
+        self.assertEqual(entry.worksite, self.farm)
+
+    def test_time_in_inside_polygon(self):
+        self.assertTrue(self.time_in("14.605, 121.005")["success"])
+        self.assertEqual(TimeEntry.objects.get().worksite, self.warehouse)
+
+    def test_time_in_outside_every_worksite_is_rejected(self):
+        self.assertEqual(self.time_in("14.700, 121.100")["message"], "You are outside your worksite")
+        self.assertEqual(self.time_in("Location services disabled")["message"], "A location fix is required to time in")
+        self.assertFalse(TimeEntry.objects.exists())
+
+    def test_bounding_box_rules_out_before_exact_test(self):
+        # Inside the farm's box but outside its circle (the box corner)
+        fences = company_worksites(self.company.pk)
+        box = next(fence for fence in fences if fence[0] == self.farm.pk)
+        self.assertIsNone(find_worksite(fences, box[2] - 0.00001, box[4] + 0.00001))
+
+    def test_worksite_change_invalidates_cache(self):
+        company_worksites(self.company.pk)
+        self.farm.is_active = False
+        self.farm.save()
+        self.assertNotIn(self.farm.pk, [fence[0] for fence in company_worksites(self.company.pk)])
+
+    def test_company_without_worksites_accepts_any_location(self):
+        CustomerUser.objects.filter(pk=self.user.pk).update(company=None)
+        self.assertTrue(self.time_in("Location services disabled")["success"])
+
+    def test_worksite_without_shape_is_refused(self):
+        with self.assertRaises(ValidationError):
+            Worksite.objects.create(company=self.company, name="Office")
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        response = self.client.post("/admin/authapp/worksite/add/", {
+            "company": self.company.pk, "name": "Office", "is_active": "on", "polygon": "null",
+        })
+        self.assertContains(response, "Set either a polygon or a center and radius_m")
+        self.assertFalse(Worksite.objects.filter(name="Office").exists())
+
+    def test_polygon_points_must_be_coordinates(self):
+        square = [[14.60, 121.00], [14.60, 121.01], [14.61, 121.01]]
+        for polygon in ([1, 2, 3], [["14.5", "121"], *square[1:]], [[95.0, 121.0], *square[1:]], [*square, [14.6]]):
+            with self.subTest(polygon=polygon), self.assertRaises(ValidationError):
+                Worksite.objects.create(company=self.company, name="Office", polygon=polygon)
+        with self.assertRaises(ValidationError):
+            Worksite.objects.create(company=self.company, name="Office", center_latitude=14.6, center_longitude=181.0, radius_m=50)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        response = self.client.post("/admin/authapp/worksite/add/", {
+            "company": self.company.pk, "name": "Office", "is_active": "on", "polygon": "[1, 2, 3]",
+        })
+        self.assertContains(response, "polygon needs at least three")
+
+
+class HoursTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        TimeEntry.objects.bulk_create([
+            # 20:00-08:00 crosses midnight: 12h worked, 4h overtime, 8h night
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 3, 20), time_out=datetime(2025, 3, 4, 8)),
+            # Two day shifts on the 4th add up to 9h; the second never timed out
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 4, 9), time_out=datetime(2025, 3, 4, 13)),
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 4, 14), time_out=datetime(2025, 3, 4, 19)),
+            TimeEntry(user=cls.user, time_in=datetime(2025, 3, 4, 20)),
+        ])
+
+    def test_daily_hours_overtime_and_night(self):
+        days = compute_hours(date(2025, 3, 3), date(2025, 3, 4))["days"]
+        self.assertEqual(
+            [(d["date"], d["entries"], d["worked_hours"], d["overtime_hours"], d["night_hours"], d["missing_time_outs"])
+             for d in days],
+            [("2025-03-03", 1, 12.0, 4.0, 8.0, 0), ("2025-03-04", 3, 9.0, 1.0, 0.0, 1)],
+        )
+
+    def test_numpy_and_python_agree_with_naive_loop(self):
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        python = compute_hours(date(2025, 3, 1), date(2025, 3, 31), use_numpy=False)
+        self.assertEqual(compute_hours(date(2025, 3, 1), date(2025, 3, 31), use_numpy=True), python)
+        naive = naive_hours(date(2025, 3, 1), date(2025, 3, 31))
+        self.assertEqual(naive[("100001", date(2025, 3, 3))], (12 * 3600, 4 * 3600, 8 * 3600, 0))
+
+    def test_fractional_seconds_are_dropped_the_same_everywhere(self):
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        # Both times floor to the whole second, so the shift is exactly an hour
+        TimeEntry.objects.create(
+            user=self.user, time_in=datetime(2025, 3, 10, 8, 0, 0, 600000), time_out=datetime(2025, 3, 10, 9, 0, 0, 400000)
+        )
+        _, time_in, time_out = load_arrays(date(2025, 3, 10), date(2025, 3, 10))
+        self.assertEqual((time_out - time_in).tolist(), [3600])
+        self.assertEqual(naive_hours(date(2025, 3, 10), date(2025, 3, 10))[("100001", date(2025, 3, 10))][0], 3600)
+
+    def test_one_query_per_source_whatever_the_range(self):
+        if np is None:
+            self.skipTest("NumPy is not installed")
+        for end in (date(2025, 3, 4), date(2025, 5, 31)):
+            with CaptureQueriesContext(connection) as ctx:
+                compute_hours(date(2025, 3, 1), end)
+            entry_queries = [q["sql"] for q in ctx.captured_queries if 'FROM "django_time_entries" ' in q["sql"]]
+            self.assertEqual(len(entry_queries), 1, entry_queries)
+
+    def test_hours_endpoint_totals(self):
+        response = self.client.get("/api/attendance/hours/", {"start": "2025-03-01", "end": "2025-03-31"})
+        response = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(response["totals"][0]["worked_hours"], 21.0)
+        self.assertEqual(response["totals"][0]["overtime_hours"], 5.0)
+        self.assertFalse(self.client.get("/api/attendance/hours/", {"start": "2025-01-01", "end": "2025-12-31"}).json()["success"])
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        cls.old = TimeEntry.objects.create(
+            user=cls.user, time_in=datetime(2024, 1, 15, 8), time_out=datetime(2024, 1, 15, 17), image_key="a" * 64
+        )
+        cls.open = TimeEntry.objects.create(user=cls.user, time_in=datetime(2024, 1, 16, 8))
+        cls.recent = TimeEntry.objects.create(user=cls.user, time_in=datetime(2025, 3, 3, 8), time_out=datetime(2025, 3, 3, 17))
+        SyncEvent.objects.create(key="k1", event_type="time_in", entry=cls.old)
+
+    def test_cutoff_is_start_of_month(self):
+        self.assertEqual(archive_cutoff(date(2025, 3, 20), 12), date(2024, 3, 1))
+        self.assertEqual(archive_cutoff(date(2025, 1, 5), 1), date(2024, 12, 1))
+
+    def test_archive_moves_only_closed_old_entries(self):
+        self.assertEqual(archive_batch(date(2024, 3, 1)), (self.old.pk, 1, 0))
+        self.assertIsNone(archive_batch(date(2024, 3, 1), after_pk=self.old.pk))
+        archived = ArchivedTimeEntry.objects.get()
+        self.assertEqual((archived.pk, archived.image_key), (self.old.pk, "a" * 64))
+        self.assertEqual(set(TimeEntry.objects.values_list("pk", flat=True)), {self.open.pk, self.recent.pk})
+        self.assertIsNone(SyncEvent.objects.get().entry_id)
+
+    def test_edits_made_during_the_batch_are_kept(self):
+        photo = TimeEntry.objects.create(
+            user=self.user, time_in=datetime(2024, 1, 17, 8), time_out=datetime(2024, 1, 17, 17),
+            image=base64.b64encode(PNG).decode(),
+        )
+
+        def store_while_admin_edits(image):
+            # An admin corrects one entry and reopens another while the photo is being stored
+            TimeEntry.objects.filter(pk=self.old.pk).update(time_out=datetime(2024, 1, 15, 18))
+            TimeEntry.objects.filter(pk=photo.pk).update(time_out=None)
+            return "b" * 64
+
+        with mock.patch("flutter_backend.authapp.archive.store_image_payload", side_effect=store_while_admin_edits):
+            self.assertEqual(archive_batch(date(2024, 3, 1)), (photo.pk, 1, 1))
+        self.assertEqual(ArchivedTimeEntry.objects.get().time_out, datetime(2024, 1, 15, 18))
+        self.assertIsNone(TimeEntry.objects.get(pk=photo.pk).time_out)
+
+    def test_reads_include_archived_entries(self):
+        archive_batch(date(2024, 3, 1))
+        hours = compute_hours(date(2024, 1, 1), date(2024, 1, 31))["days"]
+        self.assertEqual([(d["date"], d["worked_hours"], d["missing_time_outs"]) for d in hours],
+                         [("2024-01-15", 9.0, 0), ("2024-01-16", 0.0, 1)])
+        staff = CustomerUser.objects.create(employee_id="900001", first_name="Ana", surname="Reyes", is_staff=True)
+        response = self.client.get(
+            "/api/export/attendance/", {"start": "2024-01-01", "end": "2025-03-31"},
+            headers={"Authorization": f"Bearer {issue_tokens(staff)['token']}"},
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(",")[4] for line in lines[1:]], ["2024-01-15", "2024-01-16", "2025-03-03"])
+
+
+class SerializerTests(TestCase):
+    def test_format_datetime_matches_strftime(self):
+        value = datetime(2025, 3, 3)
+        for _ in range(48):
+            self.assertEqual(format_datetime(value), value.strftime("%Y-%m-%d %I:%M:%S %p"))
+            value += timedelta(minutes=31, seconds=7)
+
+    def test_streamed_array_matches_one_shot_encoding(self):
+        rows = [{"id": n, "reason": f"row \"{n}\""} for n in range(7)]
+        for chunk_size in (1, 3, 7, 10):
+            body = b"".join(_json_stream({"success": True}, "rows", rows, chunk_size))
+            self.assertEqual(json.loads(body), {"success": True, "rows": rows})
+        self.assertEqual(json.loads(b"".join(_json_stream({"success": True}, "rows", [], 3))), {"success": True, "rows": []})
+
+    def test_microbenchmark_checks_output_matches(self):
+        results = bench_serializers(rows=50, repeat=1)
+        self.assertEqual(set(results["attendance"]) - {"speedup"}, {"before_rows_per_s", "after_rows_per_s"})
+
+    def test_dumps_handles_decimals_and_dates_like_jsonresponse(self):
+        data = {"amount": Decimal("1.50"), "day": date(2025, 3, 3), "at": datetime(2025, 3, 3, 8, 30)}
+        self.assertEqual(json.loads(dumps(data)), {"amount": "1.50", "day": "2025-03-03", "at": "2025-03-03T08:30:00"})
+
+
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        CustomerUser.objects.create(employee_id="100002", first_name="Maria", surname="Santos", pin="1234")
+
+    def setUp(self):
+        _memory_buckets.reset()
+        registry.reset()
+        self.addCleanup(_memory_buckets.reset)
+
+    def login(self, employee_id, pin="0000"):
+        return self.client.post(
+            "/api/login/", {"username": employee_id, "password": pin}, content_type="application/json"
+        )
+
+    def test_pin_guessing_is_throttled_per_employee(self):
+        for _ in range(5):
+            self.assertEqual(self.login("100001").json()["message"], "Incorrect PIN")
+        response = self.login("100001", "1234")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertTrue(self.login("100002", "1234").json()["success"])
+        self.assertIn(
+            'api_throttled_requests_total{path="/api/login/",reason="login_employee"} 1', registry.render()
+        )
+
+    def test_employee_lockout_is_per_ip(self):
+        for _ in range(6):
+            self.login("100001")
+        response = self.client.post(
+            "/api/login/", {"username": "100001", "password": "1234"}, content_type="application/json",
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertTrue(response.json()["success"])
+
+    @override_settings(THROTTLE_RATES={"login_ip": "6/min", "login_employee": "5/min"})
+    def test_refused_requests_take_no_ip_tokens(self):
+        for _ in range(5):
+            self.login("100001")
+        for _ in range(10):
+            self.assertEqual(self.login("100001").status_code, 429)
+        # The refusals above left the sixth IP token in place
+        self.assertTrue(self.login("100002", "1234").json()["success"])
+        self.assertEqual(self.login("100002", "1234").status_code, 429)
+
+    @override_settings(WRITE_CONCURRENCY_LIMIT=1)
+    def test_write_cap_sheds_load(self):
+        self.assertTrue(write_limit.acquire(1))  # A write already in flight
+        try:
+            response = self.client.post("/api/time-out/", {"employee_id": "100001"}, content_type="application/json")
+        finally:
+            write_limit.release()
+        self.assertEqual((response.status_code, response["Retry-After"]), (429, "1"))
+        self.assertEqual(write_limit.active, 0)
+
+    def test_employee_id_read_from_body(self):
+        request = RequestFactory().post(
+            "/api/time-in/", '{"image": "aGk=", "employee_id": "100001"}', content_type="application/json"
+        )
+        self.assertEqual(body_employee_id(request, "employee_id"), "100001")
+
+    def test_body_spellings_of_an_employee_share_a_bucket(self):
+        for _ in range(5):
+            self.login("100001")
+        # Each of these logs in as 100001 once json.loads has read it
+        for body, content_type in (
+            ('{"username": "\\u0031\\u00300001", "password": "1234"}', "application/json"),
+            ('{"username": "100002", "username": "100001", "password": "1234"}', "application/json"),
+            ('{"username": "100001", "password": "1234"}', "text/plain"),
+        ):
+            with self.subTest(body=body):
+                response = self.client.post("/api/login/", body, content_type=content_type)
+                self.assertEqual(response.status_code, 429)
+
+    def test_cache_buckets_refuse_once_empty(self):
+        cache.clear()
+        buckets = CacheBuckets("default")
+        self.assertEqual([buckets.take("k", 2, 1 / 60) for _ in range(2)], [0, 0])
+        self.assertGreater(buckets.take("k", 2, 1 / 60), 50)
+        waits = buckets.take_all([("other", 2, 1 / 60), ("k", 2, 1 / 60)])
+        self.assertEqual(waits[0], 0)
+        self.assertGreater(waits[1], 50)
+        # The refusal took nothing from "other"
+        self.assertEqual([buckets.take("other", 2, 1 / 60) for _ in range(2)], [0, 0])
+
+
+calls = []
+
+
+@register("test_flaky")
+def flaky_job(fail):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError("boom")
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        _memory_buckets.reset()
+        calls.clear()
+
+    def test_dedupe_key_only_matches_waiting_jobs(self):
+        enqueue("test_flaky", {"fail": False}, dedupe_key="k")
+        enqueue("test_flaky", {"fail": False}, dedupe_key="k")
+        self.assertEqual(Job.objects.count(), 1)
+        claim("w1")
+        enqueue("test_flaky", {"fail": False}, dedupe_key="k")
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_success_deletes_the_job(self):
+        enqueue("test_flaky", {"fail": False})
+        [job] = claim("w1")
+        self.assertTrue(run_job(job))
+        self.assertEqual(calls, [False])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_BACKOFF=60)
+    def test_failures_back_off_then_fail(self):
+        enqueue("test_flaky", {"fail": True})
+        [job] = claim("w1")
+        self.assertFalse(run_job(job))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.QUEUED, 1, "RuntimeError: boom"))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=29))
+        self.assertEqual(claim("w1"), [])  # Not due yet
+
+        Job.objects.update(run_at=timezone.now())
+        [job] = claim("w1")
+        run_job(job)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_expired_claim_goes_to_another_worker(self):
+        enqueue("test_flaky", {"fail": False})
+        [first] = claim("w1")
+        self.assertEqual(claim("w2"), [])
+        Job.objects.update(run_at=timezone.now())  # Visibility timeout over
+        [second] = claim("w2")
+        run_job(first)  # The first worker finishes late; its claim no longer owns the row
+        self.assertTrue(Job.objects.filter(locked_by="w2").exists())
+        self.assertTrue(run_job(second))
+        self.assertFalse(Job.objects.exists())
+
+    def test_time_in_queues_summary_refresh(self):
+        CustomerUser.objects.create(employee_id="100001", first_name="Juan", surname="Cruz", pin="1234")
+        self.client.post("/api/time-in/", {"employee_id": "100001"}, content_type="application/json")
+        self.assertFalse(DailyAttendance.objects.exists())
+        [job] = claim("w1")
+        self.assertEqual(job.name, "refresh_daily_attendance")
+        run_job(job)
+        self.assertEqual(DailyAttendance.objects.get().entry_count, 1)
+
+
+class LeaveCalendarTests(TestCase):
+    # 2030-01-07 is a Monday
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Agridom")
+        cls.other = Company.objects.create(name="Other")
+        cls.user = CustomerUser.objects.create(
+            employee_id="100001", first_name="Juan", surname="Cruz", pin="1234", company=cls.company
+        )
+        Holiday.objects.create(date=date(2030, 1, 9), name="Founding Day", company=cls.company)
+        Holiday.objects.create(date=date(2030, 1, 10), name="Other's Day", company=cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def submit(self, start, end):
+        return self.client.post("/api/submit-leave/", {
+            "employee_id": "100001", "leaveType": "Vacation Leave",
+            "startDate": start, "endDate": end, "leaveDays": 99, "reason": "Trip",
+        }, content_type="application/json").json()
+
+    def test_working_days_skip_weekends_and_company_holidays(self):
+        days = working_days(date(2030, 1, 7), date(2030, 1, 14), self.company.pk)
+        self.assertEqual([day.day for day in days], [7, 8, 10, 11, 14])
+
+    def test_submit_counts_working_days_and_fills_calendar(self):
+        response = self.submit("2030-01-08", "2030-01-14")
+        self.assertTrue(response["success"], response)
+        self.assertEqual(response["leaveRequest"]["leaveDays"], 4)
+        self.assertEqual(
+            list(LeaveDay.objects.order_by("date").values_list("date", flat=True)),
+            [date(2030, 1, 8), date(2030, 1, 10), date(2030, 1, 11), date(2030, 1, 14)],
+        )
+
+    def test_overlapping_and_empty_requests_are_rejected(self):
+        self.assertTrue(self.submit("2030-01-07", "2030-01-08")["success"])
+        self.assertIn("Overlaps", self.submit("2030-01-08", "2030-01-10")["message"])
+        self.assertEqual(self.submit("2030-01-12", "2030-01-13")["message"], "No working days between those dates")
+        self.assertEqual(self.submit("2030-01-14", "2030-01-11")["message"], "End date must not be before start date")
+        self.assertEqual(LeaveRequest.objects.count(), 1)
+        self.assertEqual(CustomerUser.objects.get(pk=self.user.pk).leave_credits, 15)
+
+    def test_rejection_frees_the_dates(self):
+        self.submit("2030-01-07", "2030-01-08")
+        decide_leave_requests([LeaveRequest.objects.get().pk], "Rejected")
+        self.assertFalse(LeaveDay.objects.exists())
+        self.assertTrue(self.submit("2030-01-08", "2030-01-08")["success"])
+
+    def test_calendar_lists_who_is_on_leave(self):
+        self.submit("2030-01-08", "2030-01-08")
+        response = self.client.get(
+            "/api/leave-calendar/", {"company_id": self.company.pk, "start": "2030-01-07", "end": "2030-01-09"}
+        ).json()
+        self.assertEqual([day["count"] for day in response["days"]], [0, 1, 0])
+        self.assertEqual(response["days"][1]["onLeave"][0]["employee_id"], "100001")
+        self.assertFalse(response["days"][2]["workingDay"])
+        approved = self.client.get("/api/leave-calendar/", {
+            "company_id": self.company.pk, "start": "2030-01-08", "end": "2030-01-08", "status": "Approved",
+        }).json()
+        self.assertEqual(approved["days"][0]["count"], 0)
+
+    def test_holiday_change_invalidates_cache(self):
+        self.assertIn(date(2030, 1, 9), company_holidays(self.company.pk))
+        Holiday.objects.create(date=date(2030, 1, 15), name="New Year Break")
+        self.assertIn(date(2030, 1, 15), company_holidays(self.company.pk))
+
+    def test_calendar_range_has_its_own_limit(self):
+        params = {"company_id": self.company.pk, "start": "2030-01-01"}
+        self.assertEqual(len(self.client.get("/api/leave-calendar/", {**params, "end": "2030-06-30"}).json()["days"]), 181)
+        self.assertFalse(self.client.get("/api/leave-calendar/", {**params, "end": "2031-06-30"}).json()["success"])
+
+    def test_holiday_changes_rebuild_filed_leave_days(self):
+        def leave_days():
+            for job in claim("test", limit=10):
+                run_job(job)
+            return [day.day for day in LeaveDay.objects.order_by("date").values_list("date", flat=True)]
+
+        self.submit("2030-01-14", "2030-01-16")
+        Job.objects.all().delete()
+        holiday = Holiday.objects.create(date=date(2030, 1, 15), name="New Year Break")
+        self.assertEqual(leave_days(), [14, 16])
+        self.assertEqual(LeaveRequest.objects.get().leave_days, 2)
+        holiday.date = date(2030, 1, 16)
+        holiday.save()
+        self.assertEqual(leave_days(), [14, 15])
+        holiday.delete()
+        self.assertEqual(leave_days(), [14, 15, 16])
+        self.assertEqual(LeaveRequest.objects.get().leave_days, 3)
+        # Another company's holiday leaves this one's leave alone
+        Holiday.objects.create(date=date(2030, 1, 14), name="Other's Break", company=self.other)
+        self.assertEqual(leave_days(), [14, 15, 16])
+
+    def test_migration_fills_in_requests_filed_before_the_calendar(self):
+        leave = LeaveRequest.objects.create(
+            user=self.user, leave_type="Vacation Leave", start_date=date(2030, 1, 7), end_date=date(2030, 1, 11),
+            leave_days=99, status="Approved",
+        )
+        import_module("flutter_backend.authapp.migrations.0018_backfill_leave_days").backfill_leave_days(apps, None)
+        self.assertEqual(list(leave.days.order_by("date").values_list("date__day", flat=True)), [7, 8, 10, 11])
+        leave.refresh_from_db()
+        self.assertEqual(leave.leave_days, 4)
@@ -0,0 +1,206 @@
+# authapp/throttling.py
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .utils import json_body
+
+# Throttled paths: (rate scope, JSON body field holding the employee ID)
+THROTTLED_PATHS = {
+    "/api/login/": ("login", "username"),
+    "/api/time-in/": ("clock", "employee_id"),
+    "/api/time-in/upload/": ("clock", None),  # Multipart; the view picks the upload handler, so only the token counts
+    "/api/time-out/": ("clock", "employee_id"),
+}
+
+# POST endpoints under the write concurrency cap
+WRITE_PATHS = frozenset({
+    "/api/login/",
+    "/api/token/refresh/",
+    "/api/logout/",
+    "/api/time-in/",
+    "/api/time-in/upload/",
+    "/api/time-out/",
+    "/api/time-entries/sync/",
+    "/api/submit-leave/",
+    "/api/leave-requests/decide/",
+})
+
+PERIODS = {"s": 1, "sec": 1, "min": 60, "hour": 3600}
+MAX_MEMORY_BUCKETS = 100000
+
+
+def parse_rate(rate):
+    """
+    "10/min" -> (capacity, tokens per second): a bucket holding 10 requests
+    that refills evenly over a minute.
+    """
+    count, period = rate.split("/")
+    return int(count), int(count) / PERIODS[period]
+
+
+class MemoryBuckets:
+    """Token buckets in process memory; the least recently used are dropped past max_keys."""
+
+    def __init__(self, max_keys=MAX_MEMORY_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.max_keys = max_keys
+
+    def take(self, key, capacity, refill):
+        """Take one token. Returns 0 if there was one, else seconds until there will be."""
+        return self.take_all([(key, capacity, refill)])[0]
+
+    def take_all(self, limits):
+        """
+        Take one token from each (key, capacity, refill) bucket, or none if
+        any is empty. Returns each bucket's wait, all 0 when the tokens were taken.
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = [self._buckets.pop(key, (capacity, now)) for key, capacity, _ in limits]
+            tokens, waits = _take_all(states, now, limits)
+            for (key, _, _), left in zip(limits, tokens):
+                self._buckets[key] = (left, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # A dropped bucket just starts over full
+        return waits
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """
+    Token buckets in a Django cache shared by every worker. The read and
+    write aren't atomic, so requests racing on one key can each get the
+    same token; good enough to cap bursts.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, capacity, refill):
+        return self.take_all([(key, capacity, refill)])[0]
+
+    def take_all(self, limits):
+        cache = caches[self.alias]
+        now = time.time()
+        stored = cache.get_many([f"throttle:{key}" for key, _, _ in limits])
+        states = [stored.get(f"throttle:{key}") or (capacity, now) for key, capacity, _ in limits]
+        tokens, waits = _take_all(states, now, limits)
+        for (key, capacity, refill), left in zip(limits, tokens):
+            # Past this, the bucket would be full again anyway
+            cache.set(f"throttle:{key}", (left, now), math.ceil(capacity / refill))
+        return waits
+
+
+def _take_all(states, now, limits):
+    # Refill every bucket first, then take from all of them only if none is empty
+    tokens = [
+        min(capacity, left + (now - updated) * refill)
+        for (left, updated), (_, capacity, refill) in zip(states, limits)
+    ]
+    waits = [0 if left >= 1 else (1 - left) / refill for left, (_, _, refill) in zip(tokens, limits)]
+    if any(waits):
+        return tokens, waits
+    return [left - 1 for left in tokens], waits
+
+
+_memory_buckets = MemoryBuckets()
+
+
+def get_buckets():
+    alias = getattr(settings, "THROTTLE_CACHE_ALIAS", None)
+    return CacheBuckets(alias) if alias else _memory_buckets
+
+
+def client_ip(request):
+    # Behind THROTTLE_PROXY_COUNT reverse proxies, the client is that many
+    # entries from the end of X-Forwarded-For
+    proxies = getattr(settings, "THROTTLE_PROXY_COUNT", 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def body_employee_id(request, field):
+    """
+    The employee ID a JSON body claims, from the same parse the view uses,
+    so escapes and repeated keys name the employee the view will act on.
+    Bodies are parsed whatever their Content-Type, as the views do.
+    """
+    if not field:
+        return None
+    try:
+        data = json_body(request)
+    except (json.JSONDecodeError, UnicodeDecodeError):  # The view refuses it too
+        return None
+    value = data.get(field) if isinstance(data, dict) else None
+    if value is None or value == "":
+        return None
+    # MySQL ignores trailing spaces when comparing; the cut bounds the bucket key
+    return str(value).rstrip()[:64]
+
+
+def throttle_keys(request):
+    """
+    (rate scope, bucket key) pairs a request draws a token from. An
+    employee ID only claimed in the body is counted per client IP too, so
+    anyone who knows it can't drain that employee's bucket for everyone.
+    """
+    scope, field = THROTTLED_PATHS[request.path]
+    ip = client_ip(request)
+    keys = [(f"{scope}_ip", f"{scope}:ip:{ip}")]
+    token_user = getattr(request, "token_user", None)
+    if token_user:
+        keys.append((f"{scope}_employee", f"{scope}:employee:{token_user.employee_id}"))
+    else:
+        employee_id = body_employee_id(request, field)
+        if employee_id:
+            keys.append((f"{scope}_employee", f"{scope}:employee:{ip}:{employee_id}"))
+    return keys
+
+
+def check_rate(request):
+    """
+    Seconds the client should wait before retrying, 0 if it may go ahead,
+    plus the limiting scope. A refused request takes no token from any bucket.
+    """
+    rates = getattr(settings, "THROTTLE_RATES", {})
+    limited = [(scope, key) for scope, key in throttle_keys(request) if rates.get(scope)]
+    if not limited:
+        return 0, None
+    waits = get_buckets().take_all([(key, *parse_rate(rates[scope])) for scope, key in limited])
+    wait, scope = max(zip(waits, [scope for scope, _ in limited]))
+    return (wait, scope) if wait else (0, None)
+
+
+class ConcurrencyLimit:
+    """Counts in-flight requests across this process's threads and event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+write_limit = ConcurrencyLimit()
@@ -0,0 +1,46 @@
+# authapp/thumbnails.py
+import io
+import logging
+
+from django.conf import settings
+
+from .blobstore import get_blob_store
+from .jobs import enqueue, register
+from .models import TimeEntry
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; uploads still work without thumbnails
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+def make_thumbnail(image_key, size=None, quality=None):
+    """Render a JPEG thumbnail of a stored image and store it, returning its key."""
+    size = size or getattr(settings, "THUMBNAIL_SIZE", (320, 320))
+    quality = quality or getattr(settings, "THUMBNAIL_QUALITY", 70)
+    store = get_blob_store()
+    with store.open(image_key) as source:
+        with Image.open(source) as image:
+            # draft() lets the JPEG decoder downscale while decoding
+            image.draft("RGB", size)
+            image = image.convert("RGB")
+            image.thumbnail(size)
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+    return store.save([output.getvalue()])
+
+
+@register("thumbnail")
+def thumbnail_entry(entry_id, image_key):
+    thumbnail_key = make_thumbnail(image_key)
+    TimeEntry.objects.filter(pk=entry_id).update(thumbnail_key=thumbnail_key)
+
+
+def schedule_thumbnail(entry_id, image_key):
+    """Queue the entry's thumbnail; the job is part of the caller's transaction."""
+    if Image is None:
+        logger.warning("Pillow is not installed; skipping thumbnail generation")
+        return
+    enqueue("thumbnail", {"entry_id": entry_id, "image_key": image_key}, dedupe_key=f"thumbnail:{entry_id}")
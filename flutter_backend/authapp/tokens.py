@@ -0,0 +1,132 @@
+# authapp/tokens.py
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+SALT = "flutter_backend.authapp.tokens"
+ACCESS = "a"
+REFRESH = "r"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+@dataclass
+class TokenUser:
+    id: int
+    employee_id: str
+    jti: str
+    token_type: str
+    issued_at: float
+
+    @property
+    def expires_at(self):
+        return self.issued_at + token_ttl(self.token_type)
+
+
+def token_ttl(token_type):
+    if token_type == REFRESH:
+        return getattr(settings, "AUTH_REFRESH_TOKEN_TTL", 30 * 24 * 3600)
+    return getattr(settings, "AUTH_ACCESS_TOKEN_TTL", 12 * 3600)
+
+
+def _sign(user_id, employee_id, token_type):
+    payload = {"u": user_id, "e": employee_id, "j": secrets.token_hex(8), "t": token_type, "i": int(time.time())}
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def issue_tokens(user):
+    return {
+        "token": _sign(user.pk, user.employee_id, ACCESS),
+        "refresh_token": _sign(user.pk, user.employee_id, REFRESH),
+        "expires_in": token_ttl(ACCESS),
+    }
+
+
+def verify_token(token, token_type=ACCESS):
+    """
+    Check the HMAC signature, expiry and revocation list of a token and
+    return the TokenUser it was issued to. Never queries the users table.
+    """
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=token_ttl(token_type))
+    except signing.SignatureExpired:
+        raise InvalidToken("Token has expired")
+    except signing.BadSignature:
+        raise InvalidToken("Invalid token")
+    if payload.get("t") != token_type:
+        raise InvalidToken("Invalid token")
+    if revocation_list.is_revoked(payload["j"]):
+        raise InvalidToken("Token has been revoked")
+    return TokenUser(payload["u"], payload["e"], payload["j"], payload["t"], payload["i"])
+
+
+def revoke(token_user):
+    """
+    Revoke a token. Returns False if it was already revoked: the unique jti
+    lets only one of several concurrent calls insert the row, which is how
+    a refresh token is spent exactly once.
+    """
+    expires_at = timezone.now() + timedelta(seconds=max(token_user.expires_at - time.time(), 0))
+    RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=token_user.jti, expires_at=expires_at)
+        revoked = True
+    except IntegrityError:
+        revoked = False
+    revocation_list.add(token_user.jti)
+    return revoked
+
+
+class RevocationList:
+    """
+    In-process copy of the unexpired RevokedToken ids. It is reloaded at
+    most every AUTH_REVOCATION_REFRESH seconds, so verifying a token costs
+    a set lookup rather than a query, and revocations made by other
+    processes take effect within that interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = set()
+        self._loaded_at = None
+
+    def _refresh(self):
+        interval = getattr(settings, "AUTH_REVOCATION_REFRESH", 30)
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < interval:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < interval:
+                return
+            self._revoked = set(
+                RevokedToken.objects.filter(expires_at__gte=timezone.now()).values_list("jti", flat=True)
+            )
+            self._loaded_at = now
+
+    def is_revoked(self, jti):
+        self._refresh()
+        return jti in self._revoked
+
+    def add(self, jti):
+        with self._lock:
+            self._revoked = self._revoked | {jti}
+
+    def clear(self):
+        with self._lock:
+            self._revoked = set()
+            self._loaded_at = None
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,29 @@
+# authapp/utils.py
+import json
+from datetime import datetime, time, timedelta
+
+from .metrics import timed
+
+
+def day_range(day):
+    """
+    Half-open [start, end) datetime bounds for a calendar day. Filtering on
+    these instead of ``__date`` keeps the column bare, so MySQL can use the
+    time_in/submitted_at indexes rather than scanning through DATE().
+    """
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def json_body(request):
+    """
+    The request body decoded as JSON, parsed once and kept on the request so
+    ThrottleMiddleware and the view act on the same values. Raises
+    json.JSONDecodeError like json.loads.
+    """
+    try:
+        return request._json_body
+    except AttributeError:
+        with timed("parse"):
+            request._json_body = json.loads(request.body)
+        return request._json_body
@@ -1,23 +1,62 @@
+import asyncio
+import hashlib
 import json
 import logging
-from datetime import datetime
-from django.http import JsonResponse
+import re
+from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
-from django.contrib.auth import login
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from .models import CustomerUser, LeaveRequest, TimeEntry
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .auth_cache import aget_login_user, get_login_user
+from .blobstore import get_blob_store, is_valid_key, iter_file_range, sniff_content_type, store_image_payload
+from .credits import InsufficientCredits, adjust_credits, credit_type_for
+from .decisions import DECISIONS, MAX_DECISIONS, decide_leave_requests
+from .events import broker, format_event, publish_on_commit
+from .exports import attendance_rows, csv_lines, gzip_stream, leave_rows
+from .geofence import OutsideGeofence, locate_time_in
+from .hours import compute_hours
+from .leave_calendar import ACTIVE_STATUSES, InvalidLeave, calendar_days, check_leave, record_leave_days
+from .metrics import registry, timed
+from .models import CustomerUser, DailyAttendance, LeaveRequest, TimeEntry
+from .pagination import InvalidCursor, akeyset_page, parse_page_size
+from .routers import read_from_replica
+from .serializers import (
+    NOT_YET_OUT, attendance_row, daily_summary_row, format_datetime, json_response, leave_row,
+    streaming_json_response,
+)
+from .summaries import schedule_refresh
+from .sync import MAX_SYNC_EVENTS, sync_time_entries
+from .throttling import client_ip
+from .thumbnails import schedule_thumbnail
+from .tokens import REFRESH, InvalidToken, issue_tokens, revoke, verify_token
+from .utils import day_range, json_body
 
 logger = logging.getLogger(__name__)
 
+STREAM_KEEPALIVE = 15
+HOURS_MAX_DAYS = 93
+LEAVE_CALENDAR_MAX_DAYS = 366
+# Per group: a row per user per day like /api/attendance/hours/, or a year of monthly rollups
+SUMMARY_MAX_DAYS = {"day": HOURS_MAX_DAYS, "month": 366}
+
 @csrf_exempt
 @never_cache
-def login_view(request):
+async def login_view(request):
     if request.method != "POST":
         return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
     
     try:
-        data = json.loads(request.body)
+        data = json_body(request)
     except json.JSONDecodeError:
         return JsonResponse({"success": False, "message": "Invalid JSON"})
     
@@ -27,81 +66,219 @@ def login_view(request):
     if not employee_id or not pin:
         return JsonResponse({"success": False, "message": "Missing credentials"})
     
-    try:
-        user = CustomerUser.objects.get(employee_id=employee_id)
-        if not user.is_active:
-            return JsonResponse({"success": False, "message": "This account is inactive"})
-        
-        auth_result = CustomerUser.authenticate_by_pin(employee_id, pin)
-        if auth_result:
-            user = auth_result if isinstance(auth_result, CustomerUser) else auth_result["user"]
-            login(request, user)
-            return JsonResponse({
-                "success": True,
-                "message": "Login successful",
-                "redirect": "maindash",
-                "first_name": user.first_name,
-                "surname": user.surname,
-            })
-        else:
-            return JsonResponse({"success": False, "message": "Incorrect PIN"})
-    except CustomerUser.DoesNotExist:
+    user = await aget_login_user(employee_id)
+    if user is None:
         return JsonResponse({"success": False, "message": "Employee ID not found"})
+    if not user.is_active:
+        return JsonResponse({"success": False, "message": "This account is inactive"})
+    if user.pin != pin:
+        return JsonResponse({"success": False, "message": "Incorrect PIN"})
+
+    # Stateless tokens replace the session row django.contrib.auth.login wrote
+    await CustomerUser.objects.filter(pk=user.pk).aupdate(last_login=timezone.now())
+    return JsonResponse({
+        "success": True,
+        "message": "Login successful",
+        "redirect": "maindash",
+        "first_name": user.first_name,
+        "surname": user.surname,
+        **issue_tokens(user),
+    })
 
 @csrf_exempt
-def time_in_view(request):
+@never_cache
+def token_refresh_view(request):
     if request.method != "POST":
         return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
-    
+
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
         return JsonResponse({"success": False, "message": "Invalid JSON"})
+
+    try:
+        token_user = verify_token(data.get("refresh_token") or "", REFRESH)
+    except InvalidToken as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=401)
+
+    user = get_login_user(token_user.employee_id)
+    if user is None or user.pk != token_user.id or not user.is_active:
+        return JsonResponse({"success": False, "message": "This account is inactive"}, status=401)
+
+    # Refresh tokens are single use; of two concurrent refreshes only one revokes it
+    if not revoke(token_user):
+        return JsonResponse({"success": False, "message": "Token has been revoked"}, status=401)
+    return JsonResponse({"success": True, **issue_tokens(user)})
+
+@csrf_exempt
+def logout_view(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "message": "Invalid JSON"})
+
+    if request.token_user:
+        revoke(request.token_user)
+    refresh_token = data.get("refresh_token")
+    if refresh_token:
+        try:
+            revoke(verify_token(refresh_token, REFRESH))
+        except InvalidToken:
+            pass
+    return JsonResponse({"success": True, "message": "Logged out"})
+
+def _employee_id(request, data):
+    # A verified token wins over whatever employee_id the body claims. The
+    # body fallback only serves app versions from before tokens and is to
+    # be removed (see README)
+    if getattr(request, "token_user", None):
+        return request.token_user.employee_id
+    return data.get("employee_id")
+
+def _staff_users(token_user):
+    # The token's user if they are an active supervisor or admin
+    return CustomerUser.objects.filter(pk=token_user.id, is_active=True).filter(Q(is_staff=True) | Q(is_superuser=True))
+
+def _record_clock_event(event_type, entry, user, image_key=None):
+    # Queues jobs in the database, so async views call this via sync_to_async
+    schedule_refresh({(user.pk, entry.time_in.date())})
+    if image_key:
+        schedule_thumbnail(entry.pk, image_key)
+    publish_on_commit(event_type, attendance_row(entry, user))
+
+@csrf_exempt
+async def time_in_view(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
     
-    employee_id = data.get("employee_id")
+    try:
+        data = json_body(request)
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "message": "Invalid JSON"})
+    
+    employee_id = _employee_id(request, data)
     image_path = data.get("image")
     location = data.get("location")
 
     try:
-        user = CustomerUser.objects.get(employee_id=employee_id)
-        entry = TimeEntry.objects.create(
+        user = await CustomerUser.objects.aget(employee_id=employee_id)
+        try:
+            latitude, longitude, worksite_id = await sync_to_async(locate_time_in)(user.company_id, location)
+        except OutsideGeofence as e:
+            return JsonResponse({"success": False, "message": str(e)})
+
+        # Base64 photos go to the blob store; the row only keeps the key
+        try:
+            with timed("image"):
+                image_key = await sync_to_async(store_image_payload)(image_path)
+        except (ValueError, OSError) as e:
+            logger.error(f"Error storing time in image: {e}")
+            return JsonResponse({"success": False, "message": "Invalid image"})
+        if image_key:
+            image_path = None
+
+        entry = await TimeEntry.objects.acreate(
             user=user, 
             time_in=timezone.now(), 
             image=image_path,
-            location=location
+            image_key=image_key,
+            location=location,
+            latitude=latitude,
+            longitude=longitude,
+            worksite_id=worksite_id
         )
-        return JsonResponse({
-            "success": True,
-            "message": "Time in recorded",
-            "entry": {
-                "name": f"{user.first_name} {user.surname}",
-                "time_in": entry.time_in.strftime("%Y-%m-%d %I:%M:%S %p"),
-                "time_out": "Not Yet Out",
-                "location": entry.location if entry.location else "N/A"
-            }
-        })
+        await sync_to_async(_record_clock_event)("time_in", entry, user, image_key)
+        return _time_in_response(user, entry)
     except CustomerUser.DoesNotExist:
         return JsonResponse({"success": False, "message": "User not found"})
 
+@csrf_exempt
+def time_in_upload_view(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
+
+    # Spool the photo to a temporary file instead of holding it in memory.
+    # This has to happen before request.POST/FILES are first touched.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+
+    with timed("parse"):
+        employee_id = _employee_id(request, request.POST)
+        location = request.POST.get("location")
+        upload = request.FILES.get("image")
+
+    try:
+        user = CustomerUser.objects.get(employee_id=employee_id)
+    except CustomerUser.DoesNotExist:
+        return JsonResponse({"success": False, "message": "User not found"})
+    try:
+        latitude, longitude, worksite_id = locate_time_in(user.company_id, location)
+    except OutsideGeofence as e:
+        return JsonResponse({"success": False, "message": str(e)})
+
+    image_key = None
+    if upload:
+        try:
+            if sniff_content_type(upload.read(12)) == "application/octet-stream":
+                return JsonResponse({"success": False, "message": "Invalid image"})
+            upload.seek(0)
+            with timed("image"):
+                image_key = get_blob_store().save(upload.chunks())
+        except OSError as e:
+            logger.error(f"Error storing time in image: {e}")
+            return JsonResponse({"success": False, "message": "Error storing image"})
+        finally:
+            upload.close()
+
+    entry = TimeEntry.objects.create(
+        user=user,
+        time_in=timezone.now(),
+        image_key=image_key,
+        location=location,
+        latitude=latitude,
+        longitude=longitude,
+        worksite_id=worksite_id
+    )
+    # Acknowledge the time in now; the thumbnail is rendered by a job worker
+    _record_clock_event("time_in", entry, user, image_key)
+    return _time_in_response(user, entry)
+
+def _time_in_response(user, entry):
+    return JsonResponse({
+        "success": True,
+        "message": "Time in recorded",
+        "entry": {
+            "name": f"{user.first_name} {user.surname}",
+            "time_in": format_datetime(entry.time_in),
+            "time_out": NOT_YET_OUT,
+            "location": entry.location if entry.location else "N/A"
+        }
+    })
+
 @csrf_exempt
 @never_cache
-def time_out_view(request):
+async def time_out_view(request):
     if request.method != "POST":
         return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
     
     try:
-        data = json.loads(request.body)
-        employee_id = data.get("employee_id")
+        data = json_body(request)
+        employee_id = _employee_id(request, data)
         
         if not employee_id:
             return JsonResponse({"success": False, "message": "Employee ID is required"})
 
-        today = timezone.now().date()
-        time_entry = TimeEntry.objects.filter(
+        day_start, day_end = day_range(timezone.now().date())
+        time_entry = await TimeEntry.objects.filter(
             user__employee_id=employee_id,
-            time_in__date=today,
+            time_in__gte=day_start,
+            time_in__lt=day_end,
             time_out__isnull=True
-        ).first()
+        ).select_related("user").only(
+            "id", "time_in", "time_out", "location", "user__first_name", "user__surname"
+        ).afirst()
 
         if not time_entry:
             return JsonResponse({
@@ -110,7 +287,8 @@ def time_out_view(request):
             })
 
         time_entry.time_out = timezone.now()
-        time_entry.save()
+        await time_entry.asave(update_fields=["time_out"])
+        await sync_to_async(_record_clock_event)("time_out", time_entry, time_entry.user)
 
         return JsonResponse({
             "success": True,
@@ -122,25 +300,319 @@ def time_out_view(request):
         logger.error(f"Error in time_out_view: {str(e)}")
         return JsonResponse({"success": False, "message": str(e)})
 
-def attendance_list_view(request):
+@csrf_exempt
+def time_entries_sync_view(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
+
     try:
-        today = timezone.now().date()
-        entries = TimeEntry.objects.filter(time_in__date=today).order_by("-time_in")
-        data = []
-        for entry in entries:
-            data.append({
-                "name": f"{entry.user.first_name} {entry.user.surname}",
-                "time_in": entry.time_in.strftime("%Y-%m-%d %I:%M:%S %p"),
-                "time_out": entry.time_out.strftime("%Y-%m-%d %I:%M:%S %p") if entry.time_out else "Not Yet Out",
-                "location": entry.location if entry.location else "N/A",
-            })
-        return JsonResponse({"success": True, "attendance": data})
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "message": "Invalid JSON"})
+
+    events = data.get("events")
+    if not isinstance(events, list):
+        return JsonResponse({"success": False, "message": "events must be a list"})
+    if len(events) > MAX_SYNC_EVENTS:
+        return JsonResponse({"success": False, "message": f"At most {MAX_SYNC_EVENTS} events per request"})
+
+    token_user = getattr(request, "token_user", None)
+    try:
+        results = sync_time_entries(events, token_user.employee_id if token_user else None)
+    except IntegrityError as e:
+        # Another request applied one of these keys concurrently; a retry sees it as a duplicate
+        logger.error(f"Conflict in time_entries_sync_view: {e}")
+        return JsonResponse({"success": False, "message": "Sync conflict, please retry"})
+    return JsonResponse({"success": True, "results": results})
+
+@read_from_replica
+async def attendance_list_view(request):
+    try:
+        day_start, day_end = day_range(timezone.now().date())
+        entries = (
+            TimeEntry.objects.filter(time_in__gte=day_start, time_in__lt=day_end)
+            .select_related("user")
+            .only("time_in", "time_out", "location", "user__first_name", "user__surname")
+        )
+
+        # Without paging parameters keep the original full-day response
+        paginated = "page_size" in request.GET or "cursor" in request.GET
+        next_cursor = None
+        if paginated:
+            try:
+                page_size = parse_page_size(request.GET.get("page_size"))
+                entries, next_cursor = await akeyset_page(
+                    entries, "time_in", request.GET.get("cursor"), page_size
+                )
+            except InvalidCursor as e:
+                return JsonResponse({"success": False, "message": str(e)})
+        else:
+            entries = [entry async for entry in entries.order_by("-time_in")]
+
+        data = [attendance_row(entry, entry.user) for entry in entries]
+        if paginated:
+            return json_response({"success": True, "attendance": data, "next_cursor": next_cursor})
+        return json_response({"success": True, "attendance": data})
     except Exception as e:
         logger.error(f"Error fetching attendance: {e}")
         return JsonResponse({"success": False, "message": "Error fetching attendance"})
 
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def time_entry_image_view(request, key):
+    if request.method not in ("GET", "HEAD"):
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+    if not is_valid_key(key):
+        return JsonResponse({"success": False, "message": "Image not found"}, status=404)
+
+    store = get_blob_store()
+    try:
+        size = store.size(key)
+        blob = store.open(key)
+    except FileNotFoundError:
+        return JsonResponse({"success": False, "message": "Image not found"}, status=404)
+
+    # Blobs are content-addressed, so the key itself is a strong validator
+    etag = f'"{key}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        blob.close()
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    content_type = sniff_content_type(blob.read(12))
+    blob.seek(0)
+
+    match = RANGE_RE.match(request.headers.get("Range", ""))
+    if match and any(match.groups()) and request.headers.get("If-Range", etag) == etag:
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            blob.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        response = StreamingHttpResponse(
+            iter_file_range(blob, start, end - start + 1), status=206, content_type=content_type
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(blob, content_type=content_type)
+        response["Content-Length"] = size
+
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+async def attendance_stream_view(request):
+    """
+    Server-Sent Events feed of time_in/time_out changes, meant to follow an
+    initial /api/attendance/ snapshot. Needs the ASGI server: under WSGI
+    (runserver included) the endless stream would hold a worker thread for
+    as long as each dashboard stays open, so it is refused with a 501.
+    """
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"success": False, "message": "The attendance stream needs the ASGI server"}, status=501
+        )
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    async def stream():
+        subscription, backlog, gap = broker.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if gap:
+                # Events were missed; the client should reload the snapshot
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog:
+                yield format_event(*event)
+            while not subscription.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(*event)
+            yield "event: reset\ndata: {}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+def attendance_summary_view(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+
+    today = timezone.now().date()
+    try:
+        start_date = datetime.strptime(request.GET.get("start", today.replace(day=1).isoformat()), "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.GET.get("end", today.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
+    group = request.GET.get("group", "day")
+    if group not in SUMMARY_MAX_DAYS:
+        return JsonResponse({"success": False, "message": "group must be day or month"})
+    if start_date > end_date:
+        return JsonResponse({"success": False, "message": "start must not be after end"})
+    if (end_date - start_date).days >= SUMMARY_MAX_DAYS[group]:
+        return JsonResponse({"success": False, "message": f"At most {SUMMARY_MAX_DAYS[group]} days per request"})
+
+    summaries = DailyAttendance.objects.filter(date__gte=start_date, date__lte=end_date)
+    if request.GET.get("employee_id"):
+        summaries = summaries.filter(user__employee_id=request.GET["employee_id"])
+    if request.GET.get("company_id"):
+        summaries = summaries.filter(user__company_id=request.GET["company_id"])
+
+    if group == "day":
+        summaries = summaries.select_related("user").only(
+            "date", "first_in", "last_out", "total_seconds", "entry_count", "is_late",
+            "user__employee_id", "user__first_name", "user__surname",
+        ).order_by("date", "user__surname")
+        data = [daily_summary_row(summary) for summary in summaries]
+    else:
+        months = summaries.values(
+            "user__employee_id", "user__first_name", "user__surname", month=TruncMonth("date")
+        ).annotate(
+            days_present=Count("id"),
+            total_seconds=Sum("total_seconds"),
+            late_count=Count("id", filter=Q(is_late=True)),
+        ).order_by("month", "user__surname")
+        data = []
+        for row in months:
+            data.append({
+                "employee_id": row["user__employee_id"],
+                "name": f"{row['user__first_name']} {row['user__surname']}",
+                "month": row["month"].strftime("%Y-%m"),
+                "days_present": row["days_present"],
+                "hours": round(row["total_seconds"] / 3600, 2),
+                "late_count": row["late_count"],
+            })
+    return json_response({"success": True, "summary": data})
+
+@read_from_replica
+def hours_view(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+
+    today = timezone.now().date()
+    try:
+        start_date = datetime.strptime(request.GET.get("start", today.replace(day=1).isoformat()), "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.GET.get("end", today.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
+    if start_date > end_date:
+        return JsonResponse({"success": False, "message": "start must not be after end"})
+    if (end_date - start_date).days >= HOURS_MAX_DAYS:
+        return JsonResponse({"success": False, "message": f"At most {HOURS_MAX_DAYS} days per request"})
+
+    result = compute_hours(
+        start_date,
+        end_date,
+        company_id=request.GET.get("company_id"),
+        employee_id=request.GET.get("employee_id"),
+    )
+    # One row per employee per day adds up quickly over a long range
+    return streaming_json_response({"success": True, "totals": result["totals"]}, "days", result["days"])
+
+@read_from_replica
+def leave_calendar_view(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+
+    try:
+        company_id = int(request.GET["company_id"])
+    except (KeyError, ValueError):
+        return JsonResponse({"success": False, "message": "company_id is required"})
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    try:
+        start_date = datetime.strptime(request.GET.get("start", month_start.isoformat()), "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.GET.get("end", month_end.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
+    if start_date > end_date:
+        return JsonResponse({"success": False, "message": "start must not be after end"})
+    if (end_date - start_date).days >= LEAVE_CALENDAR_MAX_DAYS:
+        return JsonResponse({"success": False, "message": f"At most {LEAVE_CALENDAR_MAX_DAYS} days per request"})
+    statuses = request.GET.getlist("status") or ACTIVE_STATUSES
+    if not set(statuses) <= set(ACTIVE_STATUSES):
+        return JsonResponse({"success": False, "message": f"status must be one of {', '.join(ACTIVE_STATUSES)}"})
+
+    return json_response({
+        "success": True,
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "days": calendar_days(company_id, start_date, end_date, statuses),
+    })
+
+def _export_response(request, name, row_source):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+    if not request.token_user:
+        return JsonResponse({"success": False, "message": "Authentication required"}, status=401)
+    if not _staff_users(request.token_user).exists():
+        return JsonResponse({"success": False, "message": "Not allowed to export"}, status=403)
+
+    today = timezone.now().date()
+    try:
+        start_date = datetime.strptime(request.GET.get("start", today.replace(day=1).isoformat()), "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.GET.get("end", today.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
+    if start_date > end_date:
+        return JsonResponse({"success": False, "message": "start must not be after end"})
+
+    lines = csv_lines(row_source(start_date, end_date, request.GET.get("company_id")))
+    filename = f"{name}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.csv"
+    if request.GET.get("gzip") in ("1", "true"):
+        response = StreamingHttpResponse(gzip_stream(lines), content_type="application/gzip")
+        filename += ".gz"
+    else:
+        response = StreamingHttpResponse(lines, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+@read_from_replica
+def export_attendance_view(request):
+    return _export_response(request, "attendance", attendance_rows)
+
+@read_from_replica
+def export_leave_view(request):
+    return _export_response(request, "leave", leave_rows)
+
+def _file_leave_request(user, credit_type, **fields):
+    # Deduct 1 credit per submission based on the leave type. The
+    # request, its calendar days, the balance update and the ledger row
+    # commit together.
+    with transaction.atomic():
+        # Serializes this user's submissions, so the overlap check holds until commit
+        CustomerUser.objects.select_for_update().filter(pk=user.pk).exists()
+        days = check_leave(user.pk, user.company_id, fields["start_date"], fields["end_date"])
+        # Counted here rather than trusting the client's leaveDays
+        leave_request = LeaveRequest.objects.create(user=user, status="Pending", leave_days=len(days), **fields)
+        record_leave_days(leave_request, user.company_id, days)
+        adjust_credits(user.pk, credit_type, -1, "deduct", leave_request=leave_request)
+    return leave_request
+
 @csrf_exempt
-def submit_leave_request(request):
+async def submit_leave_request(request):
     if request.method != "POST":
         return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
     
@@ -149,15 +621,15 @@ def submit_leave_request(request):
     except json.JSONDecodeError:
         return JsonResponse({"success": False, "message": "Invalid JSON"})
     
-    employee_id = data.get("employee_id")
+    employee_id = _employee_id(request, data)
     leave_type = data.get("leaveType")
     start_date_str = data.get("startDate")
     end_date_str = data.get("endDate")
-    leave_days = data.get("leaveDays")
     reason = data.get("reason")
     payment_option = data.get("payment_option", "with pay")
 
-    if not all([employee_id, leave_type, start_date_str, end_date_str, leave_days]):
+    # leaveDays is still sent by the app, but the server counts the working days itself
+    if not all([employee_id, leave_type, start_date_str, end_date_str]):
         return JsonResponse({"success": False, "message": "Missing required fields"})
     
     try:
@@ -167,31 +639,17 @@ def submit_leave_request(request):
         return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
     
     try:
-        user = CustomerUser.objects.get(employee_id=employee_id)
-        
-        # Check if the user has sufficient credits
-        if leave_type.lower() == "sick leave":
-            if user.sick_leave_credits < 1:
-                return JsonResponse({"success": False, "message": "Insufficient sick leave credits."})
-        else:
-            if user.leave_credits < 1:
-                return JsonResponse({"success": False, "message": "Insufficient leave credits."})
-        
-        # Deduct 1 credit per submission based on the leave type
-        if leave_type.lower() == "sick leave":
-            user.sick_leave_credits -= 1
-        else:
-            user.leave_credits -= 1
-        user.save()
-        
-        leave_request = LeaveRequest.objects.create(
-            user=user,
+        user = await CustomerUser.objects.only("id", "company_id").aget(employee_id=employee_id)
+        credit_type = credit_type_for(leave_type)
+
+        # Atomic blocks need a single thread, so the write runs in one
+        leave_request = await sync_to_async(_file_leave_request)(
+            user,
+            credit_type,
             leave_type=leave_type,
             start_date=start_date_obj,
             end_date=end_date_obj,
-            leave_days=leave_days,
             reason=reason,
-            status="Pending",
             payment_option=payment_option
         )
         return JsonResponse({
@@ -209,29 +667,128 @@ def submit_leave_request(request):
         })
     except CustomerUser.DoesNotExist:
         return JsonResponse({"success": False, "message": "User not found"})
+    except InvalidLeave as e:
+        return JsonResponse({"success": False, "message": str(e)})
+    except InsufficientCredits as e:
+        if e.credit_type == "sick":
+            return JsonResponse({"success": False, "message": "Insufficient sick leave credits."})
+        return JsonResponse({"success": False, "message": "Insufficient leave credits."})
     except Exception as e:
         return JsonResponse({"success": False, "message": str(e)})
 
 @csrf_exempt
-def leave_requests_view(request):
+async def leave_decision_view(request):
+    if request.method != "POST":
+        return JsonResponse({"success": False, "message": "Only POST requests are allowed"})
+
+    # Deciding leave is for supervisors only, identified by their token
+    if not request.token_user:
+        return JsonResponse({"success": False, "message": "Authentication required"}, status=401)
+    if not await _staff_users(request.token_user).aexists():
+        return JsonResponse({"success": False, "message": "Not allowed to decide leave requests"}, status=403)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"success": False, "message": "Invalid JSON"})
+
+    status = DECISIONS.get(str(data.get("decision", "")).lower())
+    if status is None:
+        return JsonResponse({"success": False, "message": "decision must be approve or reject"})
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        return JsonResponse({"success": False, "message": "ids must be a non-empty list"})
+    if len(ids) > MAX_DECISIONS:
+        return JsonResponse({"success": False, "message": f"At most {MAX_DECISIONS} ids per request"})
+    try:
+        ids = list(dict.fromkeys(int(request_id) for request_id in ids))
+    except (TypeError, ValueError):
+        return JsonResponse({"success": False, "message": "ids must be integers"})
+
+    results = await sync_to_async(decide_leave_requests)(ids, status)
+    return JsonResponse({"success": True, "results": results})
+
+@csrf_exempt
+@read_from_replica
+async def leave_requests_view(request):
     if request.method != "GET":
         return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
     try:
+        leave_requests = LeaveRequest.objects.all()
         employee_id = request.GET.get("employee_id")
         if employee_id:
-            leave_requests = LeaveRequest.objects.filter(user__employee_id=employee_id).order_by("-submitted_at")
+            leave_requests = leave_requests.filter(user__employee_id=employee_id)
+        if request.GET.get("status"):
+            leave_requests = leave_requests.filter(status=request.GET["status"])
+        if request.GET.get("leave_type"):
+            leave_requests = leave_requests.filter(leave_type=request.GET["leave_type"])
+        if request.GET.get("company_id"):
+            leave_requests = leave_requests.filter(user__company_id=request.GET["company_id"])
+        try:
+            # Requests overlapping [start, end]
+            if request.GET.get("start"):
+                leave_requests = leave_requests.filter(
+                    end_date__gte=datetime.strptime(request.GET["start"], "%Y-%m-%d").date()
+                )
+            if request.GET.get("end"):
+                leave_requests = leave_requests.filter(
+                    start_date__lte=datetime.strptime(request.GET["end"], "%Y-%m-%d").date()
+                )
+        except ValueError:
+            return JsonResponse({"success": False, "message": "Invalid date format. Use YYYY-MM-DD."})
+
+        # Any insert, status change or delete moves either the newest
+        # updated_at or the row count, so together they version the list
+        version = await leave_requests.aaggregate(last_modified=Max("updated_at"), total=Count("id"))
+        last_modified = version["last_modified"]
+        etag = '"%s"' % hashlib.md5(
+            f"{last_modified}|{version['total']}|{request.GET.urlencode()}".encode()
+        ).hexdigest()
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if not_modified is not None:
+            return not_modified
+
+        leave_requests = leave_requests.only(
+            "id", "leave_type", "start_date", "end_date", "leave_days", "reason", "status", "submitted_at"
+        )
+        paginated = "page_size" in request.GET or "cursor" in request.GET
+        next_cursor = None
+        if paginated:
+            try:
+                page_size = parse_page_size(request.GET.get("page_size"))
+                leave_requests, next_cursor = await akeyset_page(
+                    leave_requests, "submitted_at", request.GET.get("cursor"), page_size
+                )
+            except InvalidCursor as e:
+                return JsonResponse({"success": False, "message": str(e)})
         else:
-            leave_requests = LeaveRequest.objects.all().order_by("-submitted_at")
-        data = []
-        for leave in leave_requests:
-            data.append({
-                "leaveType": leave.leave_type,
-                "startDate": leave.start_date.strftime("%Y-%m-%d"),
-                "endDate": leave.end_date.strftime("%Y-%m-%d"),
-                "leaveDays": leave.leave_days,
-                "reason": leave.reason,
-                "status": leave.status,
-            })
-        return JsonResponse({"success": True, "leaveRequests": data})
+            leave_requests = [leave async for leave in leave_requests.order_by("-submitted_at")]
+
+        payload = {"success": True, "leaveRequests": [leave_row(leave) for leave in leave_requests]}
+        if paginated:
+            payload["next_cursor"] = next_cursor
+        response = json_response(payload)
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        # Let clients keep the copy but always revalidate it
+        response["Cache-Control"] = "private, no-cache"
+        return response
     except Exception as e:
-        return JsonResponse({"success": False, "message": str(e)})
\ No newline at end of file
+        return JsonResponse({"success": False, "message": str(e)})
+
+def metrics_view(request):
+    if request.method != "GET":
+        return JsonResponse({"success": False, "message": "Only GET requests are allowed"})
+
+    # For staff tokens, and for scrapers at METRICS_ALLOWED_IPS
+    if client_ip(request) not in getattr(settings, "METRICS_ALLOWED_IPS", ()):
+        if not request.token_user:
+            return JsonResponse({"success": False, "message": "Authentication required"}, status=401)
+        if not _staff_users(request.token_user).exists():
+            return JsonResponse({"success": False, "message": "Not allowed to read metrics"}, status=403)
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -4,6 +4,7 @@ Django settings for flutter_backend project.
 Generated by 'django-admin startproject' using Django 5.1.5.
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,12 +31,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'flutter_backend.authapp.middleware.InstrumentationMiddleware',  # First, so it times everything below
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be near the top
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'flutter_backend.authapp.middleware.TokenAuthenticationMiddleware',
+    'flutter_backend.authapp.middleware.ThrottleMiddleware',
+    'flutter_backend.authapp.middleware.ReadAfterWriteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +67,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'flutter_backend.wsgi.application'
+ASGI_APPLICATION = 'flutter_backend.asgi.application'
 
 # Database settings (example using MySQL via XAMPP)
 DATABASES = {
@@ -72,9 +78,59 @@ DATABASES = {
         'PASSWORD': "",      # XAMPP default password (empty by default)
         'HOST': "127.0.0.1",
         'PORT': "3306",
+        # Reuse connections across requests instead of a TCP+auth handshake
+        # per request; a dropped connection is noticed before it is reused.
+        # Deliberately WSGI-only (runserver, wsgi.py, management commands):
+        # production serves over ASGI, where each request's sync ORM calls
+        # get a fresh thread-sensitive executor, so a kept connection would
+        # be stranded per thread. Django has no connection pool for MySQL,
+        # so asgi.py defaults DB_CONN_MAX_AGE to 0 and the server connects
+        # per request. To reuse connections there, put a pooler such as
+        # ProxySQL in front of MySQL rather than raising this.
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+# Optional read replica for the read-only endpoints (see authapp/routers.py).
+# Tests mirror it onto default, since there is no replication between them.
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get("DB_REPLICA_NAME", DATABASES['default']['NAME']),
+        'USER': os.environ.get("DB_REPLICA_USER", DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get("DB_REPLICA_PASSWORD", DATABASES['default']['PASSWORD']),
+        'HOST': os.environ["DB_REPLICA_HOST"],
+        'PORT': os.environ.get("DB_REPLICA_PORT", DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['flutter_backend.authapp.routers.ReplicaRouter']
+
+# Alias read_from_replica views read from; None keeps every query on default.
+# A client that wrote something reads from default for REPLICA_PIN_SECONDS
+# afterwards so replication lag can't hide its own write.
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+REPLICA_PIN_SECONDS = 10
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache of the employee_id -> (is_active, PIN, name) records login needs.
+# Set AUTH_CACHE_TIMEOUT to 0 to always read from the database.
+AUTH_CACHE_ALIAS = 'default'
+AUTH_CACHE_TIMEOUT = 300
+
+# Signed bearer tokens issued by the login endpoint (lifetimes in seconds).
+# Revoked token ids are reloaded from the database every
+# AUTH_REVOCATION_REFRESH seconds.
+AUTH_ACCESS_TOKEN_TTL = 12 * 60 * 60
+AUTH_REFRESH_TOKEN_TTL = 30 * 24 * 60 * 60
+AUTH_REVOCATION_REFRESH = 30
+
 # Password vallidation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -97,5 +153,107 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# Content-addressed storage for time-in photos
+BLOB_STORE = {
+    "BACKEND": "flutter_backend.authapp.blobstore.FileSystemBlobStore",
+    "OPTIONS": {"root": BASE_DIR / "blobs"},
+}
+
+# Clock-ins after ATTENDANCE_SHIFT_START plus the grace period count as late
+ATTENDANCE_SHIFT_START = "08:00"
+ATTENDANCE_GRACE_MINUTES = 15
+
+# Payable hours (authapp/hours.py): a day's hours beyond PAYROLL_REGULAR_HOURS
+# are overtime, hours inside the night window earn the night differential
+PAYROLL_REGULAR_HOURS = 8
+PAYROLL_NIGHT_START = "22:00"
+PAYROLL_NIGHT_END = "06:00"
+
+# Time-ins must fall inside one of the company's worksites, when it has any.
+# Set GEOFENCE_ENFORCE = False to only record the matching worksite.
+GEOFENCE_ENFORCE = True
+GEOFENCE_CACHE_TIMEOUT = 300
+
+# Offline clock events (POST /api/time-entries/sync/) timed more than this
+# many days ago are refused, so a device can't backdate into closed payroll
+# periods or archived months
+SYNC_MAX_OFFLINE_DAYS = 7
+
+# Leave requests are charged and shown on /api/leave-calendar/ by working
+# day: these weekdays (Monday = 0) and Holiday dates don't count. The
+# holiday calendar is cached until a Holiday changes.
+LEAVE_NON_WORKING_WEEKDAYS = (5, 6)
+HOLIDAY_CACHE_TIMEOUT = 3600
+
+# Token-bucket limits on login and clock-in/out (authapp/throttling.py),
+# as "requests/period" per client IP and per employee ID. Each bucket holds
+# that many requests and refills evenly over the period; the IP limits are
+# generous because a whole crew can share one NAT. An employee ID that only
+# comes from the request body (login, untokened clock-in) is counted per IP
+# and employee, so a stranger can't lock that employee out. login_employee
+# bounds guessing of the 4-digit PIN. A request is refused without taking a
+# token from any bucket. Drop a scope to disable it.
+THROTTLE_RATES = {
+    "login_ip": "120/min",
+    "login_employee": "5/min",
+    "clock_ip": "300/min",
+    "clock_employee": "10/min",
+}
+# Buckets live in each worker's memory unless this names a shared cache
+THROTTLE_CACHE_ALIAS = None
+# Reverse proxies in front of the app that append to X-Forwarded-For
+THROTTLE_PROXY_COUNT = int(os.environ.get("THROTTLE_PROXY_COUNT", "0"))
+# Write requests in flight per worker process before new ones get a 429;
+# None disables the cap
+WRITE_CONCURRENCY_LIMIT = 32
+
+# Closed time entries timed in before the start of the month this many
+# months back are moved to django_time_entries_archive by
+# "manage.py archive_time_entries" (run it monthly)
+TIME_ENTRY_RETENTION_MONTHS = 12
+
+# Thumbnails for uploaded time-in photos (requires Pillow)
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 70
+
+# Background jobs (authapp/jobs.py), run by "manage.py run_workers".
+# A failed job is retried after JOB_RETRY_BACKOFF seconds, doubling each
+# time, up to JOB_MAX_ATTEMPTS attempts; a claimed job is handed to
+# another worker if it hasn't finished within JOB_VISIBILITY_TIMEOUT.
+JOB_WORKERS = 2
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10
+JOB_VISIBILITY_TIMEOUT = 300
+JOB_POLL_INTERVAL = 1.0
+
+# Per-request timings (Server-Timing header, /api/_metrics/, logfmt lines).
+# Quantiles cover the last METRICS_WINDOW requests per endpoint. Set
+# METRICS_PROFILE_SAMPLE_RATE (e.g. 0.01) to cProfile that fraction of
+# requests and keep profiles of those slower than METRICS_PROFILE_SLOW_MS.
+METRICS_WINDOW = 1024
+METRICS_PROFILE_SAMPLE_RATE = float(os.environ.get("METRICS_PROFILE_SAMPLE_RATE", 0))
+METRICS_PROFILE_SLOW_MS = 500
+METRICS_PROFILE_DIR = BASE_DIR / "profiles"
+# /api/_metrics/ answers staff tokens, and any request from these client
+# addresses (e.g. the Prometheus scraper), as seen through THROTTLE_PROXY_COUNT
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip]
+
+# The metrics logger writes one INFO line per request; it only logs slow
+# profiles and errors unless METRICS_LOG_LEVEL=INFO is set (in production)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'flutter_backend.authapp.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get("METRICS_LOG_LEVEL", "WARNING"),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -11,13 +11,26 @@ urlpatterns = [
     
     # Define the API endpoint for login
     path('api/login/', views.login_view, name='api_login'),
+    path('api/token/refresh/', views.token_refresh_view, name='api_token_refresh'),
+    path('api/logout/', views.logout_view, name='api_logout'),
 
     # New endpoints for attendance
     path('api/time-in/', views.time_in_view, name='api_time_in'),
+    path('api/time-in/upload/', views.time_in_upload_view, name='api_time_in_upload'),
     path('api/attendance/', views.attendance_list_view, name='api_attendance'),
+    path('api/attendance/stream/', views.attendance_stream_view, name='api_attendance_stream'),
+    path('api/attendance/summary/', views.attendance_summary_view, name='api_attendance_summary'),
+    path('api/attendance/hours/', views.hours_view, name='api_attendance_hours'),
     path('api/time-out/', views.time_out_view, name='api_time_out'),
+    path('api/time-entries/sync/', views.time_entries_sync_view, name='api_time_entries_sync'),
+    path('api/time-in/images/<str:key>/', views.time_entry_image_view, name='api_time_entry_image'),
     path('api/submit-leave/', views.submit_leave_request, name='api_submit_leave'),
     path('api/leave-requests/', views.leave_requests_view, name='api_leave_requests'),
+    path('api/leave-requests/decide/', views.leave_decision_view, name='api_leave_decide'),
+    path('api/leave-calendar/', views.leave_calendar_view, name='api_leave_calendar'),
+    path('api/export/attendance/', views.export_attendance_view, name='api_export_attendance'),
+    path('api/export/leave/', views.export_leave_view, name='api_export_leave'),
+    path('api/_metrics/', views.metrics_view, name='api_metrics'),
 
 
     # Admin route
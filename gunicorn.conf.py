@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+#
+# Serves the Django backend through ASGI, with uvicorn's event loop inside
+# each gunicorn worker:
+#
+#     pip install gunicorn "uvicorn[standard]"
+#     gunicorn flutter_backend.asgi:application
+#
+# gunicorn picks this file up from the working directory (the repo root,
+# next to manage.py). For a single process without gunicorn:
+#
+#     uvicorn flutter_backend.asgi:application --host 0.0.0.0 --port 8000 \
+#         --limit-concurrency 1000 --timeout-keep-alive 75
+#
+# The async views (login, time in/out, attendance, leave) wait on MySQL
+# and request bodies without holding a thread, so one worker keeps many
+# slow clients in flight. Sync views still run on a thread pool sized by
+# the ASGI_THREADS environment variable.
+#
+# flutter_backend/asgi.py turns persistent database connections off, for
+# gunicorn and plain uvicorn alike.
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# The attendance stream's broker is per process, so SSE clients only see
+# events published by the worker they are connected to. Keep one worker
+# until the broker is shared, then scale with the cores.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+_max_workers = multiprocessing.cpu_count() * 2 + 1
+workers = max(1, min(workers, _max_workers))
+
+# With UvicornWorker this is only the heartbeat timeout; long-lived SSE
+# responses are not cut off by it
+timeout = 60
+graceful_timeout = 30
+# Passed to uvicorn as timeout_keep_alive; mobile clients reconnect slowly
+keepalive = 75
+
+# Recycle workers now and then so a slow leak can't grow without bound
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
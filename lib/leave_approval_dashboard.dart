@@ -16,6 +16,10 @@ class LeaveApprovalDashboard extends StatefulWidget {
 }
 
 class _LeaveApprovalDashboardState extends State<LeaveApprovalDashboard> {
+  // Last response per employee, kept across opens so the server can answer 304
+  static final Map<String, String> _etags = {};
+  static final Map<String, List<Map<String, dynamic>>> _cachedApplications = {};
+
   List<Map<String, dynamic>> leaveApplications = [];
 
   @override
@@ -32,12 +36,25 @@ class _LeaveApprovalDashboardState extends State<LeaveApprovalDashboard> {
   Future<void> fetchLeaveApplications() async {
     try {
       // Use the employeeId as a query parameter so that only this user's leave requests are returned.
-      final response = await http.get(Uri.parse(
-          "http://127.0.0.1:8000/api/leave-requests/?employee_id=${widget.employeeId}"));
-      if (response.statusCode == 200) {
+      final etag = _etags[widget.employeeId];
+      final response = await http.get(
+        Uri.parse("http://127.0.0.1:8000/api/leave-requests/?employee_id=${widget.employeeId}"),
+        headers: etag != null ? {"If-None-Match": etag} : {},
+      );
+      if (response.statusCode == 304 && _cachedApplications.containsKey(widget.employeeId)) {
+        setState(() {
+          leaveApplications = _cachedApplications[widget.employeeId]!;
+        });
+      } else if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
+        final applications = List<Map<String, dynamic>>.from(data["leaveRequests"]);
+        final newEtag = response.headers["etag"];
+        if (newEtag != null) {
+          _etags[widget.employeeId] = newEtag;
+          _cachedApplications[widget.employeeId] = applications;
+        }
         setState(() {
-          leaveApplications = List<Map<String, dynamic>>.from(data["leaveRequests"]);
+          leaveApplications = applications;
         });
       } else {
         // Optionally handle errors.
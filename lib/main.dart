@@ -64,6 +64,8 @@ Future<void> attemptLogin() async {
         String surname = data["surname"]?.toString() ?? "";
         String fullName = "$firstName $surname".trim();
         String employeeId = employeeIdController.text; // Use the input value
+        String? token = data["token"]?.toString();
+        String? refreshToken = data["refresh_token"]?.toString();
         
         // Debug print
         print("Parsed data - Full Name: $fullName, Employee ID: $employeeId");
@@ -78,6 +80,8 @@ Future<void> attemptLogin() async {
             builder: (context) => MainDash(
               fullName: fullName,
               employeeId: employeeId,
+              token: token,
+              refreshToken: refreshToken,
             ),
           ),
         );
@@ -8,15 +8,20 @@ import 'package:geolocator/geolocator.dart';
 import 'file_leave_screen.dart';
 import 'time_in_handler.dart';
 import 'drawer_widget.dart';
+import 'main.dart';
 
 class MainDash extends StatefulWidget {
   final String fullName;
   final String employeeId;
+  final String? token;
+  final String? refreshToken;
 
   const MainDash({
     super.key,
     required this.fullName,
     required this.employeeId,
+    this.token,
+    this.refreshToken,
   });
 
   @override
@@ -29,13 +34,21 @@ class _MainDashState extends State<MainDash> {
   String currentTime = "";
   String currentDate = "";
   Timer? timer;
+  http.Client? streamClient;
+  String? lastEventId;
+  bool streamConnected = false;
+  String? accessToken;
+  String? refreshToken;
+  Future<bool>? refreshing;
 
   @override
   void initState() {
     super.initState();
+    accessToken = widget.token;
+    refreshToken = widget.refreshToken;
     initializeCamera();
     updateTime();
-    fetchAttendanceList();
+    fetchAttendanceList().then((_) => listenAttendanceStream());
   }
 
   Future<void> initializeCamera() async {
@@ -64,19 +77,156 @@ class _MainDashState extends State<MainDash> {
     });
   }
 
+  Map<String, String> authHeaders() {
+    return accessToken != null ? {"Authorization": "Bearer $accessToken"} : {};
+  }
+
+  // Access tokens expire after 12 hours. Trade the single-use refresh token
+  // for a new pair; 401s arriving together share one refresh.
+  Future<bool> refreshAccessToken() {
+    return refreshing ??= requestNewTokens().whenComplete(() => refreshing = null);
+  }
+
+  Future<bool> requestNewTokens() async {
+    if (refreshToken == null) return false;
+    final response = await http.post(
+      Uri.parse("http://127.0.0.1:8000/api/token/refresh/"),
+      headers: {"Content-Type": "application/json"},
+      body: jsonEncode({"refresh_token": refreshToken}),
+    );
+    if (response.statusCode != 200) return false;
+    final data = jsonDecode(response.body);
+    if (data["success"] != true) return false;
+    accessToken = data["token"]?.toString();
+    refreshToken = data["refresh_token"]?.toString();
+    return true;
+  }
+
+  // Sends the request built by send; on a 401 refreshes the tokens and sends
+  // it once more, or returns to the login page when the refresh is refused.
+  Future<http.Response> sendAuthorized(Future<http.Response> Function() send) async {
+    final response = await send();
+    if (response.statusCode != 401 || accessToken == null) return response;
+    if (await refreshAccessToken()) return send();
+    backToLogin();
+    return response;
+  }
+
+  void backToLogin() {
+    if (!mounted) return;
+    streamClient?.close();
+    streamClient = null;
+    ScaffoldMessenger.of(context).showSnackBar(
+      const SnackBar(content: Text("Your session has expired, please log in again")),
+    );
+    Navigator.pushAndRemoveUntil(
+      context,
+      MaterialPageRoute(builder: (context) => const EmployeeLoginPage()),
+      (Route<dynamic> route) => false,
+    );
+  }
+
+  Map<String, String> attendanceItem(Map<String, dynamic> item) {
+    return {
+      "id": item["id"]?.toString() ?? "",
+      "name": item["name"]?.toString() ?? "",
+      "time_in": item["time_in"]?.toString() ?? "",
+      "time_out": item["time_out"]?.toString() ?? "Not Yet Out",
+      "location": item["location"]?.toString() ?? "",
+    };
+  }
+
+  // Apply time_in/time_out pushes from /api/attendance/stream/ instead of
+  // re-downloading the whole day after every clock-in.
+  Future<void> listenAttendanceStream() async {
+    if (!mounted) return;
+    streamClient?.close();
+    final client = http.Client();
+    streamClient = client;
+    try {
+      final request = http.Request("GET", Uri.parse("http://127.0.0.1:8000/api/attendance/stream/"));
+      request.headers.addAll({"Accept": "text/event-stream", ...authHeaders()});
+      if (lastEventId != null) {
+        request.headers["Last-Event-ID"] = lastEventId!;
+      }
+      final response = await client.send(request);
+      if (response.statusCode == 501) {
+        // Server isn't running under ASGI; keep reloading the list after each action instead
+        client.close();
+        return;
+      }
+      if (response.statusCode == 401 && accessToken != null) {
+        client.close();
+        if (await refreshAccessToken()) {
+          listenAttendanceStream();
+        } else {
+          backToLogin();
+        }
+        return;
+      }
+      if (response.statusCode != 200) {
+        throw Exception("Stream returned status code: ${response.statusCode}");
+      }
+      streamConnected = true;
+
+      String event = "message";
+      String eventData = "";
+      await for (final line in response.stream.transform(utf8.decoder).transform(const LineSplitter())) {
+        if (line.startsWith("id:")) {
+          lastEventId = line.substring(3).trim();
+        } else if (line.startsWith("event:")) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith("data:")) {
+          eventData += line.substring(5).trim();
+        } else if (line.isEmpty) {
+          handleAttendanceEvent(event, eventData);
+          event = "message";
+          eventData = "";
+        }
+      }
+    } catch (e) {
+      print("Attendance stream error: $e");
+    } finally {
+      streamConnected = false;
+    }
+    if (mounted && identical(streamClient, client)) {
+      await Future.delayed(const Duration(seconds: 3));
+      listenAttendanceStream();
+    }
+  }
+
+  void handleAttendanceEvent(String event, String eventData) {
+    if (!mounted) return;
+    if (event == "reset") {
+      fetchAttendanceList();
+      return;
+    }
+    if (event != "time_in" && event != "time_out") return;
+    final item = attendanceItem(jsonDecode(eventData) as Map<String, dynamic>);
+    setState(() {
+      final index = attendanceList.indexWhere((entry) => entry["id"] == item["id"]);
+      if (index >= 0) {
+        attendanceList[index] = item;
+      } else if (event == "time_in") {
+        attendanceList.insert(0, item);
+      }
+    });
+  }
+
   Future<void> fetchAttendanceList() async {
     try {
-      final response = await http.get(Uri.parse("http://127.0.0.1:8000/api/attendance/"));
+      final response = await sendAuthorized(() => http.get(
+        Uri.parse("http://127.0.0.1:8000/api/attendance/"),
+        headers: authHeaders(),
+      ));
+      if (!mounted) return;
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
         if (data["success"]) {
           setState(() {
-            attendanceList = (data["attendance"] as List).map((item) => {
-              "name": item["name"]?.toString() ?? "",
-              "time_in": item["time_in"]?.toString() ?? "",
-              "time_out": item["time_out"]?.toString() ?? "Not Yet Out",
-              "location": item["location"]?.toString() ?? "",
-            }).toList();
+            attendanceList = (data["attendance"] as List)
+                .map((item) => attendanceItem(item as Map<String, dynamic>))
+                .toList();
           });
         }
       } else {
@@ -122,20 +272,32 @@ class _MainDashState extends State<MainDash> {
         print("Error capturing image: $e");
       }
 
-      final requestBody = {
-        "employee_id": widget.employeeId,
-        "location": currentLocation,
-      };
-
-      if (capturedImagePath != null) {
-        requestBody["image"] = capturedImagePath;
+      final http.Response response;
+      if (capturedImagePath != null && capturedImagePath.isNotEmpty) {
+        final imagePath = capturedImagePath;
+        // Stream the photo as a multipart file instead of embedding it in JSON
+        response = await sendAuthorized(() async {
+          final request = http.MultipartRequest(
+            "POST",
+            Uri.parse("http://127.0.0.1:8000/api/time-in/upload/"),
+          );
+          request.headers.addAll(authHeaders());
+          request.fields["employee_id"] = widget.employeeId;
+          request.fields["location"] = currentLocation;
+          request.files.add(await http.MultipartFile.fromPath("image", imagePath));
+          return http.Response.fromStream(await request.send());
+        });
+      } else {
+        response = await sendAuthorized(() => http.post(
+          Uri.parse("http://127.0.0.1:8000/api/time-in/"),
+          headers: {"Content-Type": "application/json", ...authHeaders()},
+          body: jsonEncode({
+            "employee_id": widget.employeeId,
+            "location": currentLocation,
+          }),
+        ));
       }
-
-      final response = await http.post(
-        Uri.parse("http://127.0.0.1:8000/api/time-in/"),
-        headers: {"Content-Type": "application/json"},
-        body: jsonEncode(requestBody),
-      );
+      if (!mounted) return;
 
       print("Response status: ${response.statusCode}");
       print("Response body: ${response.body}");
@@ -143,8 +305,9 @@ class _MainDashState extends State<MainDash> {
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
         if (data["success"]) {
-          await Future.delayed(const Duration(milliseconds: 500));
-          await fetchAttendanceList();
+          if (!streamConnected) {
+            await fetchAttendanceList();
+          }
           ScaffoldMessenger.of(context).showSnackBar(
             const SnackBar(content: Text("Time in recorded successfully")),
           );
@@ -201,21 +364,23 @@ class _MainDashState extends State<MainDash> {
         return;
       }
 
-      final response = await http.post(
+      final response = await sendAuthorized(() => http.post(
         Uri.parse("http://127.0.0.1:8000/api/time-out/"),
-        headers: {"Content-Type": "application/json"},
+        headers: {"Content-Type": "application/json", ...authHeaders()},
         body: jsonEncode({
           "employee_id": widget.employeeId,
         }),
-      );
+      ));
+      if (!mounted) return;
 
       print("Time out response: ${response.body}");
 
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
         if (data["success"]) {
-          await Future.delayed(const Duration(milliseconds: 500));
-          await fetchAttendanceList();
+          if (!streamConnected) {
+            await fetchAttendanceList();
+          }
           ScaffoldMessenger.of(context).showSnackBar(
             const SnackBar(content: Text("Time out recorded successfully")),
           );
@@ -396,6 +561,8 @@ class _MainDashState extends State<MainDash> {
   @override
   void dispose() {
     timer?.cancel();
+    streamClient?.close();
+    streamClient = null;
     timeInHandler.disposeCamera();
     super.dispose();
   }
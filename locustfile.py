@@ -0,0 +1,56 @@
+# locustfile.py
+#
+# Morning-rush load test against a running server. Seed the users first
+# (they all get PIN 1234), then point locust at the server:
+#
+#     python manage.py seed_benchmark_data --companies 5 --users-per-company 200
+#     THROTTLE_PROXY_COUNT=1 python manage.py runserver
+#     BENCHMARK_USERS=1000 locust -f locustfile.py --host http://127.0.0.1:8000 -u 1000 -r 100
+#
+# Every simulated device comes from the one locust IP, which would run into
+# the login_ip and clock_ip limits within seconds. Each device therefore
+# sends its own X-Forwarded-For address, which the server only trusts with
+# THROTTLE_PROXY_COUNT=1. Alternatively set THROTTLE_RATES = {} in the
+# server's settings to turn throttling off for the run.
+#
+# Each simulated device logs in and clocks in once, then polls the
+# attendance list and its leave requests until the run ends.
+import itertools
+import os
+
+from locust import HttpUser, between, task
+
+# Must match the IDs seed_benchmark_data creates ("9" + zero-padded number)
+TOTAL_USERS = int(os.environ.get("BENCHMARK_USERS", 1000))
+PIN = "1234"
+_next_user = itertools.count()
+
+
+class MorningRushUser(HttpUser):
+    wait_time = between(1, 5)
+
+    def on_start(self):
+        number = next(_next_user) % TOTAL_USERS
+        self.employee_id = f"9{number:05d}"
+        self.client.headers["X-Forwarded-For"] = f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+        response = self.client.post("/api/login/", json={"username": self.employee_id, "password": PIN})
+        token = response.json().get("token")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.client.post(
+            "/api/time-in/",
+            json={"employee_id": self.employee_id, "location": "14.5, 121.0"},
+            headers=self.headers,
+        )
+
+    @task(5)
+    def attendance(self):
+        self.client.get("/api/attendance/", params={"page_size": 50}, headers=self.headers)
+
+    @task(1)
+    def leave_requests(self):
+        self.client.get(
+            "/api/leave-requests/",
+            params={"employee_id": self.employee_id},
+            headers=self.headers,
+            name="/api/leave-requests/?employee_id",
+        )